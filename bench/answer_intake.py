@@ -0,0 +1,112 @@
+"""
+answer_intake.py
+----------------
+Stress test of concurrent answer intake: thousands of answers submitted
+from many threads at once, checked for exactly-once acceptance and
+ordering, and timed (intake_sec: the whole burst, duplicates included).
+
+    python -m bench.answer_intake --answers 5000 --threads 50
+
+burst: every player answers once from its own thread and once more from a
+       neighbouring thread (a racing duplicate). Exactly one of the two must
+       be accepted, the round result must list every player once, and each
+       thread's answers must appear in the order that thread sent them.
+close: the round is closed while the burst is still running. Every
+       accepted answer must be in the result, every other one rejected.
+
+Prints one JSON object; exits non-zero on the first violated check.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+
+from bench.engine_compare import _arg
+from server.quiz_logic import QuizGame
+
+
+def new_round():
+    game = QuizGame("server/questions.json")
+    q = game.start_round()
+    return game, q
+
+
+def burst(game, q, players, threads, close_after=None):
+    """Submit from `threads` threads behind a barrier; returns (acks, result, seconds)."""
+    chunks = [players[i::threads] for i in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+    acks = [[] for _ in range(threads)]
+
+    def submit(player):
+        return game.submit_answer(player, q["qid"], q["choices"][1])
+
+    def worker(i):
+        mine, theirs = chunks[i], chunks[(i + 1) % threads]
+        barrier.wait()
+        for own, other in zip(mine, theirs):
+            acks[i].append((own, submit(own)))
+            acks[i].append((other, submit(other)))   # races the owner's answer
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    if close_after is not None:
+        time.sleep(close_after)
+        result = game.end_round_and_score()
+    for t in ts:
+        t.join()
+    spent = time.perf_counter() - t0
+    if close_after is None:
+        result = game.end_round_and_score()
+    return acks, result, spent, chunks
+
+
+def check(acks, result, chunks, expect_all):
+    accepted = Counter(p for thread in acks for p, ack in thread if ack["ok"])
+    listed = [row["player"] for row in result["details"]]
+
+    assert all(n == 1 for n in accepted.values()), "a player was accepted twice"
+    assert Counter(listed) == accepted, "result doesn't match the accepted answers"
+    if expect_all:
+        assert len(accepted) == sum(len(c) for c in chunks), "an answer was lost"
+
+    reasons = Counter(ack.get("reason") for thread in acks for _, ack in thread if not ack["ok"])
+    assert set(reasons) <= {"already_answered", "round_not_active"}, reasons
+
+    position = {p: i for i, p in enumerate(listed)}
+    for thread in acks:
+        order = [position[p] for p, ack in thread if ack["ok"]]
+        assert order == sorted(order), "a thread's answers were reordered"
+    return len(accepted), reasons
+
+
+def main():
+    answers = int(_arg("--answers", 5000))
+    threads = int(_arg("--threads", 50))
+    players = [f"player{i}" for i in range(answers)]
+
+    game, q = new_round()
+    acks, result, spent, chunks = burst(game, q, players, threads)
+    accepted, reasons = check(acks, result, chunks, expect_all=True)
+
+    game, q = new_round()
+    acks, result, _, chunks = burst(game, q, players, threads, close_after=0.005)
+    accepted_before_close, close_reasons = check(acks, result, chunks, expect_all=False)
+
+    print(json.dumps({
+        "answers": answers,
+        "threads": threads,
+        "accepted": accepted,
+        "duplicates_rejected": reasons["already_answered"],
+        "close_race_accepted": accepted_before_close,
+        "close_race_rejected": close_reasons["round_not_active"],
+        "intake_sec": round(spent, 3),
+        "checks": "ok",
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+answer_memory.py
+----------------
+Memory held by per-round answers and player totals after a long game.
+
+    python -m bench.answer_memory --players 10000 --questions 200
+
+before: answers[qid][player] = (answer, elapsed, late) for every round,
+        scoreboard[player] = {"score", "wins", "rounds"} (old QuizGame)
+after:  answer_store: interned player ids, RoundAnswers arrays per round,
+        Scoreboard arrays; kept for all rounds and with the default
+        retention (ANSWER_HISTORY closed rounds)
+
+Every player answers every question. Answer strings are fresh objects per
+message, as they are when parsed off the wire. Prints one JSON object.
+"""
+
+import gc
+import json
+import random
+import tracemalloc
+from collections import deque
+
+from bench.engine_compare import _arg
+from server.answer_store import ANSWER_HISTORY, AnswerIntake, PlayerTable, RoundAnswers, Scoreboard
+
+CHOICES = ["HTTP", "TCP", "ARP", "DNS"]
+
+
+def answer_stream(players, questions):
+    rnd = random.Random(1)
+    names = [f"player{i}" for i in range(players)]
+    for q in range(questions):
+        yield f"q{q}", [
+            (name, rnd.choice(CHOICES).encode().decode(), rnd.uniform(0, 10), False)
+            for name in names
+        ]
+
+
+def before(players, questions):
+    answers, scoreboard = {}, {}
+    for qid, rows in answer_stream(players, questions):
+        answers[qid] = {}
+        for name, ans, elapsed, late in rows:
+            answers[qid][name] = (ans, elapsed, late)
+            if name not in scoreboard:
+                scoreboard[name] = {"score": 0, "wins": 0, "rounds": 0}
+            scoreboard[name]["rounds"] += 1
+    return answers, scoreboard
+
+
+def after(players, questions, keep):
+    table, board, history = PlayerTable(), Scoreboard(), deque(maxlen=keep)
+    for qid, rows in answer_stream(players, questions):
+        intake = AnswerIntake(qid, 0.0, 10)
+        for name, ans, elapsed, late in rows:
+            intake.submit(name, ans, elapsed, late)
+        round_answers = RoundAnswers(qid, intake.texts, intake.choice_of)
+        for name, text, choice, elapsed, late in intake.close():
+            pid = table.id(name)
+            board.ensure(pid)
+            round_answers.add(pid, text, choice, elapsed, late)
+            board.rounds[pid] += 1
+        round_answers.close()
+        history.append(round_answers)
+    return table, board, history
+
+
+def retained_mb(fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    kept = fn(*args)
+    gc.collect()
+    mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return round(mem / 2**20, 1)
+
+
+def main():
+    players = int(_arg("--players", 10000))
+    questions = int(_arg("--questions", 200))
+
+    old = retained_mb(before, players, questions)
+    all_rounds = retained_mb(after, players, questions, None)
+    default = retained_mb(after, players, questions, ANSWER_HISTORY)
+    print(json.dumps({
+        "players": players,
+        "questions": questions,
+        "before_mb": old,
+        "after_all_rounds_mb": all_rounds,
+        f"after_keep_{ANSWER_HISTORY}_mb": default,
+        "ratio_all_rounds": round(old / all_rounds, 1) if all_rounds else None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+bank_rss.py
+-----------
+Load time and resident memory of N processes serving the same question
+bank: plain JSON vs the compiled, mmap'ed .qbank file.
+
+    python -m bench.bank_rss --questions 200000 --procs 4
+
+json:     every process json.load()s the bank into Question objects (old path)
+indexed:  QuizGame over questions.json (.idx sidecar, bodies read per round)
+compiled: QuizGame over questions.qbank (mmap, pages shared by all processes)
+
+Each process loads the bank, then reads every question once (a long game).
+While all of them are alive we sample RSS and PSS (shared pages divided
+among the processes that map them) from /proc. Linux only. Prints one JSON
+object per format.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.engine_compare import _arg
+from bench.question_bank import load_all, write_bank
+from server.compiled_bank import compile_bank
+
+
+def _mem_kb(pid):
+    rss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+def child(fmt, path):
+    t0 = time.perf_counter()
+    if fmt == "json":
+        questions = load_all(path)
+        load_sec = time.perf_counter() - t0
+        for q in questions:
+            q.answer
+    else:
+        from server.quiz_logic import QuizGame
+        game = QuizGame(path)
+        load_sec = time.perf_counter() - t0
+        for pos in game.order:
+            game.bank_index.question(pos).answer
+
+    print(json.dumps({"load_sec": round(load_sec, 3)}), flush=True)
+    sys.stdin.read()     # stay alive until the parent has measured
+
+
+def run(fmt, path, procs):
+    children = [
+        subprocess.Popen([sys.executable, "-m", "bench.bank_rss", "--child", fmt, path],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(procs)
+    ]
+    loads = [json.loads(c.stdout.readline())["load_sec"] for c in children]
+    mems = [_mem_kb(c.pid) for c in children]
+    for c in children:
+        c.stdin.close()
+        c.wait()
+
+    return {
+        "format": fmt,
+        "procs": procs,
+        "load_sec_max": max(loads),
+        "rss_mb_total": round(sum(m[0] for m in mems) / 1024, 1),
+        "pss_mb_total": round(sum(m[1] for m in mems) / 1024, 1),
+    }
+
+
+def main():
+    if "--child" in sys.argv:
+        i = sys.argv.index("--child")
+        child(sys.argv[i + 1], sys.argv[i + 2])
+        return
+
+    count = int(_arg("--questions", 200000))
+    procs = int(_arg("--procs", 4))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "questions.json")
+        write_bank(path, count)
+        compiled = compile_bank(path)
+
+        run("indexed", path, 1)     # build the .idx sidecar outside the timing
+        for fmt, p in (("json", path), ("indexed", path), ("compiled", compiled)):
+            row = run(fmt, p, procs)
+            row["questions"] = count
+            row["file_mb"] = round(os.path.getsize(p) / 2**20, 1)
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+broadcast_encode.py
+-------------------
+Per-round CPU cost of serializing broadcasts vs. player count.
+
+    python -m bench.broadcast_encode --players 10,100,500,1000
+
+before: validate + json.dumps + encode once per recipient (old send())
+after:  P.encode() once per broadcast, same bytes queued for everyone
+
+A "round" is one question frame plus one round_result frame built by a real
+QuizGame where every player answered. No sockets involved.
+"""
+
+import json
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from server.quiz_logic import QuizGame
+
+
+def play_round(players):
+    game = QuizGame("server/questions.json")
+    names = [f"player{i}" for i in range(players)]
+    q = game.start_round(names)
+    for i, name in enumerate(names):
+        game.submit_answer(name, q["qid"], q["choices"][i % len(q["choices"])])
+    return q, game.end_round_and_score()
+
+
+def per_recipient(msgs, players):
+    for msg in msgs:
+        for _ in range(players):
+            P.validate(msg)
+            (json.dumps(msg) + "\n").encode()
+
+
+def serialize_once(msgs, players):
+    for msg in msgs:
+        frame = P.encode(msg)
+        for _ in range(players):
+            _ = frame
+
+
+def cpu_ms(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn(*args)
+        spent = (time.process_time() - t0) * 1000
+        best = spent if best is None else min(best, spent)
+    return round(best, 3)
+
+
+def main():
+    counts = [int(x) for x in _arg("--players", "10,100,500,1000").split(",")]
+
+    for players in counts:
+        msgs = play_round(players)
+        before = cpu_ms(per_recipient, msgs, players, repeat=1)
+        after = cpu_ms(serialize_once, msgs, players)
+        print(json.dumps({
+            "players": players,
+            "frame_bytes": sum(len(P.encode(m)) for m in msgs),
+            "before_ms_per_round": before,
+            "after_ms_per_round": after,
+            "speedup": round(before / after, 1) if after else None,
+        }))
+
+
+if __name__ == "__main__":
+    main()
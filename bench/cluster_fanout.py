@@ -0,0 +1,112 @@
+"""
+cluster_fanout.py
+-----------------
+One room's players spread over several cluster nodes: how many bus messages
+a round costs and whether every player on every node still sees every
+question, ack and result.
+
+    python -m bench.cluster_fanout --players 1000 --nodes 1,2,4 --rounds 5
+
+All nodes run in this process on the in-process bus ("local"), each with its
+own RoomManager and Scheduler; node n0 owns the room. Fake members answer
+as soon as a question arrives. `fanout_per_round` counts question and
+round_result messages on the bus (one per other node, whatever the player
+count); answers and their acks cross it once per remote player. Prints one
+JSON object per node count.
+"""
+
+import json
+import threading
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from server import cluster, metrics
+from server.latency import RttEstimator
+from server.rooms import RoomManager, RoomSettings
+from server.scheduler import Scheduler
+
+ROOM = "bench"
+
+
+class Member:
+    """Outbox stand-in: answers on its own node's scheduler, counts frames."""
+
+    def __init__(self, name, node, state):
+        self.name = name
+        self.binary = False
+        self.room = None
+        self.rtt = RttEstimator()
+        self.node = node          # (scheduler, rooms) it is connected to
+        self.state = state
+        self.seen = {P.QUESTION: 0, P.ANSWER_ACK: 0, P.ROUND_RESULT: 0}
+
+    def put(self, frame):
+        msg = P.decode(frame.rstrip(b"\n"))
+        t = msg["type"]
+        if t in self.seen:
+            self.seen[t] += 1
+        if t == P.QUESTION and self.seen[t] <= self.state["rounds"]:
+            scheduler, rooms = self.node
+            scheduler.call_soon(rooms.handle, self, P.answer(msg["qid"], msg["choices"][0]))
+        elif t == P.ROUND_RESULT and self.seen[t] == self.state["rounds"]:
+            with self.state["lock"]:
+                self.state["finished"] += 1
+                if self.state["finished"] == self.state["players"]:
+                    self.state["done"].set()
+        return True
+
+
+def run(players, nodes, rounds):
+    bus = f"local://bench{nodes}"
+    state = {"players": players, "rounds": rounds, "finished": 0,
+             "lock": threading.Lock(), "done": threading.Event()}
+    managers = []
+    for i in range(nodes):
+        scheduler = Scheduler().start()
+        settings = RoomSettings(test_mode=True, cluster=bus, node_id=f"n{i}")
+        managers.append((scheduler, RoomManager(settings, scheduler)))
+
+    members = [Member(f"bot{i}", managers[i % nodes], state) for i in range(players)]
+    managers[0][1].create(ROOM)           # n0 owns the room
+    for out in members:
+        out.node[1].join(out, ROOM)
+    time.sleep(0.2)                        # remote joins reach the owner
+
+    before = dict(metrics.cluster_out.values)
+    t0 = time.perf_counter()
+    managers[0][1].handle(members[0], P.start())
+    finished = state["done"].wait(60)
+    spent = time.perf_counter() - t0
+    after = dict(metrics.cluster_out.values)
+    sent = {op: after.get(op, 0) - before.get(op, 0) for op in after}
+
+    for out in members:
+        out.node[1].leave(out)
+    for _, rooms in managers:
+        rooms.bus.close()
+
+    complete = all(out.seen[P.ROUND_RESULT] >= rounds and out.seen[P.ANSWER_ACK] >= rounds
+                   for out in members)
+    return {
+        "players": players,
+        "nodes": nodes,
+        "rounds": rounds,
+        "finished": finished,
+        "round_ms": round(spent / rounds * 1000, 1),
+        "fanout_per_round": round((sent.get(cluster.FANOUT, 0) + sent.get(cluster.RESULT, 0)) / rounds, 1),
+        "answers_forwarded": sent.get(cluster.ANSWER, 0),
+        "everyone_got_everything": complete,
+    }
+
+
+def main():
+    players = int(_arg("--players", 1000))
+    rounds = int(_arg("--rounds", 5))
+    metrics.configure_log(0)      # no per-join lines
+    for nodes in [int(n) for n in _arg("--nodes", "1,2,4").split(",")]:
+        print(json.dumps(run(players, nodes, rounds)))
+
+
+if __name__ == "__main__":
+    main()
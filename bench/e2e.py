@@ -0,0 +1,86 @@
+"""
+e2e.py
+------
+End-to-end scenarios: a real `server.server` subprocess on loopback driven
+by client.load_test, once per engine.
+
+    python -m bench.e2e [--scenarios small,rooms] [--engines threads,asyncio]
+
+small   200 bots, one room, instant answers
+rooms   2000 bots over 20 rooms, instant answers
+burst   5000 bots, one room, answers spread over 0-0.3 s, binary frames
+
+The server runs in test mode, so a round closes as soon as everyone has
+answered; round_ms is then mostly the server's own turnaround. Prints one
+JSON object per (scenario, engine) with the load_test report in it.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.engine_compare import _arg
+
+SCENARIOS = {
+    "small": ["--bots", "200", "--rooms", "1", "--rounds", "5", "--delay", "fixed:0"],
+    "rooms": ["--bots", "2000", "--procs", "2", "--rooms", "20", "--rounds", "5",
+              "--delay", "fixed:0"],
+    "burst": ["--bots", "5000", "--procs", "2", "--rooms", "1", "--rounds", "3",
+              "--delay", "uniform:0,0.3", "--binary"],
+}
+
+# report fields worth comparing across commits
+KEEP = ("connected", "connect_per_sec", "acks", "ack_ms", "rounds", "round_ms",
+        "result_skew_ms", "errors", "total_sec")
+
+
+def run(scenario, engine, port):
+    server = subprocess.Popen(
+        [sys.executable, "-u", "-m", "server.server", "--test",
+         "--engine", engine, "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    fd, out = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        time.sleep(1.0)
+        subprocess.run(
+            [sys.executable, "-m", "client.load_test", "--port", str(port),
+             "--out", out] + SCENARIOS[scenario],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(out) as f:
+            report = json.load(f)
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(out)
+
+    row = {"scenario": scenario, "engine": engine}
+    row.update((k, report.get(k)) for k in KEEP)
+    return row
+
+
+def run_all(scenarios, engines, port=5700):
+    rows = []
+    for scenario in scenarios:
+        for engine in engines:
+            rows.append(run(scenario, engine, port))
+            port += 1
+    return rows
+
+
+def main():
+    scenarios = _arg("--scenarios", ",".join(SCENARIOS)).split(",")
+    engines = _arg("--engines", "threads,asyncio").split(",")
+    for row in run_all(scenarios, engines, int(_arg("--port", 5700))):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+engine_compare.py
+-----------------
+Threaded vs asyncio server engine: how many connections are held and the
+answer -> answer_ack latency (p50/p99) under a burst of bots.
+
+    python -m bench.engine_compare --players 2000 --rounds 3
+
+Each engine is started as a subprocess in test mode on its own port.
+Prints one JSON object per engine.
+"""
+
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import protocol_message as P
+
+HOST = "127.0.0.1"
+
+
+def _arg(flag, default):
+    if flag in sys.argv:
+        i = sys.argv.index(flag)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return round(values[k], 3)
+
+
+# ------------------ bot ------------------
+
+async def bot(name, port, leader, state):
+    try:
+        reader, writer = await asyncio.open_connection(HOST, port)
+    except OSError:
+        state["connect_errors"] += 1
+        return
+
+    writer.write((name + "\n").encode())
+    sent_at = 0.0
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            t = msg["type"]
+
+            if t == P.WELCOME:
+                state["held"] += 1
+                if state["held"] == state["players"]:
+                    state["all_in"].set()
+                if leader:
+                    await state["all_in"].wait()
+                    writer.write((json.dumps(P.start()) + "\n").encode())
+
+            elif t == P.QUESTION:
+                sent_at = time.perf_counter()
+                ans = P.answer(msg["qid"], msg["choices"][0])
+                writer.write((json.dumps(ans) + "\n").encode())
+
+            elif t == P.ANSWER_ACK:
+                state["ack_ms"].append((time.perf_counter() - sent_at) * 1000)
+
+            elif t == P.ROUND_RESULT:
+                if leader:
+                    state["rounds"] += 1
+                    if state["rounds"] >= state["max_rounds"]:
+                        state["done"].set()
+
+            elif t == P.GAME_OVER:
+                state["done"].set()
+    except (ConnectionError, OSError):
+        state["drop_errors"] += 1
+    finally:
+        writer.close()
+
+
+async def drive(port, players, max_rounds):
+    state = {
+        "players": players,
+        "max_rounds": max_rounds,
+        "held": 0,
+        "rounds": 0,
+        "connect_errors": 0,
+        "drop_errors": 0,
+        "ack_ms": [],
+        "all_in": asyncio.Event(),
+        "done": asyncio.Event(),
+    }
+
+    t0 = time.perf_counter()
+    tasks = []
+    for i in range(players):
+        tasks.append(asyncio.create_task(bot(f"bench{i}", port, i == 0, state)))
+        if i % 200 == 199:
+            await asyncio.sleep(0)  # let the accept backlog drain
+
+    try:
+        await asyncio.wait_for(state["all_in"].wait(), timeout=60)
+    except asyncio.TimeoutError:
+        pass
+    connect_sec = time.perf_counter() - t0
+
+    try:
+        await asyncio.wait_for(state["done"].wait(), timeout=60 + 5 * max_rounds)
+    except asyncio.TimeoutError:
+        pass
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    acks = state["ack_ms"]
+    return {
+        "players": players,
+        "held": state["held"],
+        "connect_sec": round(connect_sec, 3),
+        "rounds": state["rounds"],
+        "acks": len(acks),
+        "ack_p50_ms": percentile(acks, 50),
+        "ack_p99_ms": percentile(acks, 99),
+        "connect_errors": state["connect_errors"],
+        "drop_errors": state["drop_errors"],
+    }
+
+
+# ------------------ runner ------------------
+
+def run_engine(engine, port, players, rounds):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "server.server", "--test",
+         "--engine", engine, "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        time.sleep(1.0)
+        result = asyncio.run(drive(port, players, rounds))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    result["engine"] = engine
+    return result
+
+
+def main():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    players = int(_arg("--players", 500))
+    rounds = int(_arg("--rounds", 3))
+    port = int(_arg("--port", 5600))
+    engines = _arg("--engines", "threads,asyncio").split(",")
+
+    for i, engine in enumerate(engines):
+        print(json.dumps(run_engine(engine, port + i, players, rounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+micro.py
+--------
+Micro-benchmarks of the server hot paths at several player counts, for
+comparing commits rather than before/after of one change.
+
+    python -m bench.micro --players 100,1000,10000 [--only submit_answer]
+
+validate        P.validate() on a question, an answer and a round_result
+encode          P.encode() of a question and a round_result, JSON and binary
+framing         FrameReader splitting a 64 KiB burst of answer frames (per frame)
+submit_answer   QuizGame.submit_answer(), one per player
+end_round       QuizGame.end_round_and_score() with every player answered
+leaderboard     QuizGame.get_leaderboard(10) and the whole board
+rerank          half the board changing score in a round, always at 10k and
+                30k players: LeaderboardIndex.update_many vs. sorting the
+                whole board, and the end_round_and_score it is part of
+
+Each row is the best of a few repeats. Prints one JSON object per
+(bench, players, case).
+"""
+
+import json
+import random
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from framing import FrameReader
+from server.leaderboard import LeaderboardIndex
+from server.quiz_logic import QuizGame
+
+REPEAT = 5
+
+
+def best(fn, number=1, setup=None):
+    """Best seconds per call of fn() over REPEAT runs of `number` calls."""
+    result = None
+    for _ in range(REPEAT):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn(arg) if setup else fn()
+        spent = (time.perf_counter() - t0) / number
+        result = spent if result is None else min(result, spent)
+    return result
+
+
+def row(bench, players, case, seconds, unit="us"):
+    scale = {"us": 1e6, "ms": 1e3}[unit]
+    return {"bench": bench, "players": players, "case": case,
+            "value": round(seconds * scale, 3), "unit": f"{unit}/op"}
+
+
+def played_game(players):
+    """A game right after one round every player answered (half correctly)."""
+    game = QuizGame("server/questions.json")
+    names = [f"player{i}" for i in range(players)]
+    q = game.start_round(names)
+    correct = game.round_question.answer
+    for i, name in enumerate(names):
+        game.submit_answer(name, q["qid"], correct if i % 2 else q["choices"][0])
+    result = game.end_round_and_score()
+    return game, names, q, result
+
+
+# ------------------ benches ------------------
+
+def bench_validate(players):
+    _, _, q, result = played_game(players)
+    for case, msg in (("question", q), ("answer", P.answer(q["qid"], "TCP")),
+                      ("round_result", result)):
+        yield row("validate", players, case, best(lambda: P.validate(msg), 1000))
+
+
+def bench_encode(players):
+    _, _, q, result = played_game(players)
+    for binary in (False, True):
+        case = "binary" if binary else "json"
+        yield row("encode", players, "question_" + case,
+                  best(lambda: P.encode(q, binary), 1000))
+        yield row("encode", players, "round_result_" + case,
+                  best(lambda: P.encode(result, binary), 10), "ms")
+
+
+def bench_framing(players):
+    for binary in (False, True):
+        frame = P.encode(P.answer("q1", "TCP"), binary)
+        burst = frame * (65536 // len(frame))
+        count = len(burst) // len(frame)
+
+        def split():
+            reader = FrameReader()
+            reader.binary = binary
+            reader.feed(burst)
+            for _ in reader.frames():
+                pass
+
+        case = "binary" if binary else "json"
+        yield row("framing", players, case, best(split, 20) / count)
+
+
+def bench_submit_answer(players):
+    def setup():
+        game = QuizGame("server/questions.json")
+        names = [f"player{i}" for i in range(players)]
+        return game, names, game.start_round(names)
+
+    def submit_all(state):
+        game, names, q = state
+        for name in names:
+            game.submit_answer(name, q["qid"], "TCP")
+
+    yield row("submit_answer", players, "per_answer", best(submit_all, 1, setup) / players)
+
+
+def bench_end_round(players):
+    def setup():
+        game = QuizGame("server/questions.json")
+        names = [f"player{i}" for i in range(players)]
+        q = game.start_round(names)
+        for i, name in enumerate(names):
+            game.submit_answer(name, q["qid"], q["choices"][i % len(q["choices"])])
+        return game
+
+    yield row("end_round", players, "score_round", best(lambda g: g.end_round_and_score(), 1, setup), "ms")
+
+
+def bench_leaderboard(players):
+    game, _, _, _ = played_game(players)
+    yield row("leaderboard", players, "top10", best(lambda: game.get_leaderboard(10), 100))
+    yield row("leaderboard", players, "full", best(lambda: game.get_leaderboard(), 3), "ms")
+
+
+def bench_rerank(players):
+    rng = random.Random(players)
+    scores = [rng.randrange(0, 2000, 10) for _ in range(players)]
+    names = [f"player{i}" for i in range(players)]
+
+    def setup():
+        index = LeaderboardIndex()
+        index.update_many(zip(names, scores, [0] * players))
+        moved = rng.sample(range(players), players // 2)
+        return index, [(names[i], scores[i] + 150, 0) for i in moved]
+
+    yield row("rerank", players, "update_half", best(lambda s: s[0].update_many(s[1]), 1, setup), "ms")
+    def full_sort():
+        # what get_leaderboard() did before the index, every round
+        board = [{"player": name, "score": score, "wins": 0} for name, score in zip(names, scores)]
+        board.sort(key=lambda x: (x["score"], x["wins"]), reverse=True)
+
+    yield row("rerank", players, "full_sort", best(full_sort), "ms")
+
+    def second_round():
+        # round two: scores from round one differ, half the board scores again
+        game = QuizGame("server/questions.json")
+        for r in range(2):
+            q = game.start_round(names)
+            correct = game.round_question.answer
+            for i, name in enumerate(names):
+                game.submit_answer(name, q["qid"], correct if (i + r) % 2 else "-")
+            if r == 0:
+                game.end_round_and_score()
+        return game
+
+    yield row("rerank", players, "end_round_half",
+              best(lambda g: g.end_round_and_score(), 1, second_round), "ms")
+
+
+BENCHES = {
+    "validate": bench_validate,
+    "encode": bench_encode,
+    "framing": bench_framing,
+    "submit_answer": bench_submit_answer,
+    "end_round": bench_end_round,
+    "leaderboard": bench_leaderboard,
+    "rerank": bench_rerank,
+}
+
+
+NO_PLAYERS = {"framing"}     # doesn't depend on the player count, run once
+FIXED_PLAYERS = {"rerank": [10000, 30000]}    # only shows at large boards
+
+
+def run(player_counts, only=None):
+    rows = []
+    for name, fn in BENCHES.items():
+        if only and name not in only:
+            continue
+        counts = FIXED_PLAYERS.get(name, player_counts)
+        for players in ([None] if name in NO_PLAYERS else counts):
+            rows.extend(fn(players))
+    return rows
+
+
+def main():
+    counts = [int(x) for x in _arg("--players", "100,1000,10000").split(",")]
+    only = _arg("--only", None)
+    for r in run(counts, only.split(",") if only else None):
+        print(json.dumps(r))
+
+
+if __name__ == "__main__":
+    main()
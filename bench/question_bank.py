@@ -0,0 +1,114 @@
+"""
+question_bank.py
+----------------
+Startup time and memory of a large question bank, old vs indexed loading.
+
+    python -m bench.question_bank --questions 500000 --rooms 20
+
+before: every QuizGame json.load()s the file into Question objects
+after:  one shared index per process (built once, then read from the .idx
+        sidecar), question bodies read on start_round()
+
+A synthetic bank is written to a temp dir. Memory is what stays allocated
+(tracemalloc) after creating `rooms` games. Prints one JSON object.
+"""
+
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import server.question_bank as QB
+from bench.engine_compare import _arg
+from server.question_bank import Question
+from server.quiz_logic import QuizGame
+
+CATEGORIES = ["network", "os", "security", "database", "web"]
+
+
+def write_bank(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "title": "Bench", "time_limit_sec": 10,\n  "questions": [\n')
+        for i in range(count):
+            item = {
+                "id": f"q{i}",
+                "question": f"Câu hỏi số {i}: giao thức nào thuộc tầng {i % 7}?",
+                "choices": ["HTTP", "TCP", "ARP", "DNS"],
+                "answer": "TCP",
+                "category": random.choice(CATEGORIES),
+                "difficulty": random.randint(1, 5),
+            }
+            f.write("    " + json.dumps(item, ensure_ascii=False))
+            f.write(",\n" if i + 1 < count else "\n")
+        f.write("  ]\n}\n")
+
+
+def load_all(path):
+    # the old QuizGame.load_questions()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        Question(qid=item["id"], text=item["question"],
+                 choices=item["choices"], answer=item["answer"])
+        for item in data["questions"]
+    ]
+
+
+def measure(make, rooms):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    first = make()
+    first_sec = time.perf_counter() - t0
+    kept = [first] + [make() for _ in range(rooms - 1)]
+    total_sec = time.perf_counter() - t0
+    mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return round(first_sec, 3), round(total_sec, 3), round(mem / 2**20, 1)
+
+
+def main():
+    count = int(_arg("--questions", 100000))
+    rooms = int(_arg("--rooms", 20))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "questions.json")
+        write_bank(path, count)
+
+        before = measure(lambda: load_all(path), rooms)
+
+        QB._banks.clear()
+        cold = measure(lambda: QuizGame(path), rooms)    # builds + saves .idx
+
+        QB._banks.clear()
+        QB._read_question.cache_clear()
+        warm = measure(lambda: QuizGame(path), rooms)    # reads .idx
+
+        game = QuizGame(path)
+        t0 = time.perf_counter()
+        for _ in range(100):
+            game.start_round()
+            game.round_active = False
+        start_round_ms = (time.perf_counter() - t0) * 10
+
+        print(json.dumps({
+            "questions": count,
+            "rooms": rooms,
+            "file_mb": round(os.path.getsize(path) / 2**20, 1),
+            "before_first_sec": before[0],
+            "before_all_rooms_sec": before[1],
+            "before_mb": before[2],
+            "after_cold_first_sec": cold[0],
+            "after_warm_first_sec": warm[0],
+            "after_all_rooms_sec": warm[1],
+            "after_mb": warm[2],
+            "start_round_ms": round(start_round_ms, 3),
+        }))
+
+
+if __name__ == "__main__":
+    main()
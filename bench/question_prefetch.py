@@ -0,0 +1,90 @@
+"""
+question_prefetch.py
+--------------------
+How long a round's deadline takes to get its question queued to every
+player: building and encoding the question on the spot (before) vs. using
+the frames Room._prepare_next encoded during the result pause (after).
+
+    python -m bench.question_prefetch --players 1000 --rounds 20 [--questions server/questions.qbank]
+
+Half the players use the binary encoding. Only Room._next_round is timed,
+from the call to the last frame queued; _prepare_next runs untimed between
+rounds, as it does in the pause after a round_result. Every frame is
+decoded again and checked against the round's question. Prints one JSON
+object.
+"""
+
+import json
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from protocol_binary import LENGTH
+from server.rooms import Room, RoomSettings
+from server.scheduler import Scheduler
+
+
+class Member:
+    """Outbox stand-in: keeps the last frame."""
+
+    def __init__(self, name, binary):
+        self.name = name
+        self.binary = binary
+        self.room = None
+        self.frame = None
+
+    def put(self, frame):
+        self.frame = frame
+        return True
+
+
+def play(players, rounds, questions, prefetch):
+    room = Room("bench", RoomSettings(questions_path=questions), Scheduler())
+    members = [Member(f"player{i}", i % 2 == 1) for i in range(players)]
+    for out in members:
+        room.add(out)
+    room.game.running = True
+
+    spent, played = [], 0
+    while played < rounds:
+        if not room.game.has_next_question():
+            room.game.reset()
+        if prefetch:
+            room._prepare_next(room.epoch)
+        t0 = time.perf_counter()
+        room._next_round(room.epoch)
+        spent.append(time.perf_counter() - t0)
+
+        q = room.question
+        for out in members:
+            payload = out.frame[LENGTH.size:] if out.binary else out.frame
+            assert P.decode(payload, out.binary) == q, "frame differs from the question"
+        room.game.end_round_and_score()
+        room.close_timer.cancel()
+        played += 1
+
+    spent.sort()
+    return {"p50_ms": round(spent[len(spent) // 2] * 1000, 3),
+            "max_ms": round(spent[-1] * 1000, 3)}
+
+
+def main():
+    players = int(_arg("--players", 1000))
+    rounds = int(_arg("--rounds", 20))
+    questions = _arg("--questions", "server/questions.json")
+
+    before = play(players, rounds, questions, prefetch=False)
+    after = play(players, rounds, questions, prefetch=True)
+    print(json.dumps({
+        "players": players,
+        "rounds": rounds,
+        "questions": questions,
+        "on_the_spot": before,
+        "prefetched": after,
+        "speedup_p50": round(before["p50_ms"] / after["p50_ms"], 1) if after["p50_ms"] else None,
+        "checks": "ok",
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+recv_framing.py
+---------------
+Cost of splitting received bytes into frames when many frames arrive per
+recv, e.g. a burst of answers or a backlog of broadcasts.
+
+    python -m bench.recv_framing --frames 20000 --chunks 4096,65536,262144
+
+before: buffer += data.decode(); buffer.split("\\n", 1) per line (old loops)
+after:  framing.FrameReader (bytearray + offsets, JSON and binary)
+
+The same answer frames are fed in chunks of each size, as one recv would
+return them. The old loop re-copies the rest of the chunk after every line,
+so its cost grows with the chunk size; FrameReader's doesn't. Prints one
+JSON object per chunk size.
+"""
+
+import json
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from framing import FrameReader
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def split_lines(parts):
+    buffer = ""
+    n = 0
+    for data in parts:
+        buffer += data.decode()
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            n += 1
+    return n
+
+
+def frame_reader(parts, binary=False):
+    reader = FrameReader(binary)
+    n = 0
+    for data in parts:
+        reader.feed(data)
+        for _ in reader.frames():
+            n += 1
+    return n
+
+
+def cpu_ms(fn, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn(*args)
+        spent = (time.process_time() - t0) * 1000
+        best = spent if best is None else min(best, spent)
+    return round(best, 3)
+
+
+def main():
+    frames = int(_arg("--frames", 20000))
+    sizes = [int(x) for x in _arg("--chunks", "4096,65536,262144").split(",")]
+
+    msgs = [P.answer(f"q{i % 10}", "Paris") for i in range(frames)]
+    json_bytes = b"".join(P.encode(m) for m in msgs)
+    bin_bytes = b"".join(P.encode(m, True) for m in msgs)
+
+    for size in sizes:
+        lines = chunks(json_bytes, size)
+        binary = chunks(bin_bytes, size)
+        assert split_lines(lines) == frame_reader(lines) == frame_reader(binary, True) == frames
+
+        before = cpu_ms(split_lines, lines)
+        after = cpu_ms(frame_reader, lines)
+        print(json.dumps({
+            "frames": frames,
+            "chunk_bytes": size,
+            "before_ms": before,
+            "after_ms": after,
+            "after_binary_ms": cpu_ms(frame_reader, binary, True),
+            "speedup": round(before / after, 1) if after else None,
+        }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+round_scoring.py
+----------------
+Batched round scoring vs the old per-player loop: a randomized equivalence
+check first, then time per round.
+
+    python -m bench.round_scoring --answers 100,1000,10000 --trials 500
+
+before: per answer, _normalize() both the answer and the correct answer,
+        _speed_bonus() per scored player, sort the correct ones for the winner
+after:  the close path of QuizGame.end_round_and_score(): RoundAnswers from
+        the AnswerIntake rows (mapped to choice codes at submit time), then
+        scoring.score_round(), pure Python and NumPy (when installed)
+submit: what that mapping adds to each AnswerIntake.submit(), per answer
+
+The check throws random rounds at both (case/whitespace variants, wrong and
+empty answers, answers at exactly 0 s and at the limit, late answers, equal
+times, a correct answer that isn't a choice) and fails loudly on the first
+difference. Prints one JSON object per answer count.
+"""
+
+import json
+import random
+import time
+
+from bench.engine_compare import _arg
+from server import scoring
+from server.answer_store import AnswerIntake, RoundAnswers
+
+CHOICES = ["HTTP", "TCP", "ARP", "DNS"]
+PIDS = {f"p{pid}": pid for pid in range(100000)}   # like the game's PlayerTable
+
+
+# ------------------ the old algorithm ------------------
+
+def _normalize(s):
+    return (s or "").strip().lower()
+
+
+def _speed_bonus(elapsed, time_limit, bonus_max):
+    if elapsed <= 0:
+        return bonus_max
+    if elapsed >= time_limit:
+        return 0
+    return int(round(bonus_max * (1 - elapsed / time_limit)))
+
+
+def reference(rows, correct, time_limit, base_score, bonus_max):
+    correct_players = []
+    for i, (ans, elapsed, late) in enumerate(rows):
+        if not late and _normalize(ans) == _normalize(correct):
+            correct_players.append((i, elapsed))
+    correct_players.sort(key=lambda x: x[1])
+    winner = correct_players[0][0] if correct_players else None
+
+    flags, bonuses, points = [], [], []
+    for ans, elapsed, late in rows:
+        is_correct = _normalize(ans) == _normalize(correct)
+        scored = is_correct and not late
+        bonus = _speed_bonus(elapsed, time_limit, bonus_max) if scored else 0
+        flags.append(is_correct)
+        bonuses.append(bonus)
+        points.append((base_score + bonus) if scored else 0)
+    return scoring.RoundScores(flags, bonuses, points, winner)
+
+
+# ------------------ helpers ------------------
+
+def random_round(rnd, n):
+    time_limit = rnd.choice([10, 10, 5, 1, 0])
+    correct = rnd.choice(CHOICES + ["tcp ", "Not a choice"])
+    rows = []
+    for _ in range(n):
+        ans = rnd.choice(CHOICES + [" tcp", "Tcp\t", "dns ", "", "zzz", "Not A Choice"])
+        elapsed = rnd.choice([
+            0.0, float(time_limit), round(rnd.uniform(0, 12), 1),
+            rnd.uniform(0, 12), rnd.uniform(0, 0.001),
+        ])
+        rows.append((ans, elapsed, elapsed > time_limit))
+    return rows, correct, time_limit, rnd.choice([100, 0]), rnd.choice([50, 0, 7])
+
+
+def to_intake(rows):
+    intake = AnswerIntake("q", 0.0, 10, choices=CHOICES)
+    for pid, (ans, elapsed, late) in enumerate(rows):
+        intake.submit(f"p{pid}", ans, elapsed, late)
+    return intake
+
+
+def to_answers(intake):
+    """Take the closed intake's rows over, as end_round_and_score does."""
+    answers = RoundAnswers("q", intake.texts, intake.choice_of)
+    answers.extend(intake.close(), PIDS.__getitem__)
+    return answers
+
+
+def batched(answers, correct, time_limit, base_score, bonus_max, use_numpy):
+    return scoring.score_round(answers, answers.choice_code(correct), time_limit,
+                               base_score, bonus_max, use_numpy)
+
+
+def check(trials):
+    rnd = random.Random(7)
+    paths = [False] + ([True] if scoring.np is not None else [])
+    for t in range(trials):
+        rows, correct, *params = random_round(rnd, rnd.choice([0, 1, 2, 5, 50, 300]))
+        expected = reference(rows, correct, *params)
+        answers = to_answers(to_intake(rows))
+        for use_numpy in paths:
+            got = batched(answers, correct, *params, use_numpy)
+            if got != expected:
+                raise AssertionError(f"trial {t} numpy={use_numpy}: {got} != {expected}")
+    return paths
+
+
+def close_path(intake, correct, time_limit, base_score, bonus_max, use_numpy):
+    return batched(to_answers(intake), correct, time_limit, base_score, bonus_max, use_numpy)
+
+
+def per_round_ms(fn, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        spent = (time.perf_counter() - t0) * 1000
+        best = spent if best is None else min(best, spent)
+    return round(best, 3)
+
+
+def main():
+    counts = [int(x) for x in _arg("--answers", "100,1000,10000").split(",")]
+    trials = int(_arg("--trials", 500))
+
+    paths = check(trials)
+    rnd = random.Random(1)
+
+    for n in counts:
+        rows, correct, *params = random_round(rnd, n)
+        params[0] = 10
+        intake = to_intake(rows)
+        row = {
+            "answers": n,
+            "checked_trials": trials,
+            "before_ms": per_round_ms(reference, rows, correct, *params),
+            "after_python_ms": per_round_ms(close_path, intake, correct, *params, False),
+        }
+        if True in paths:
+            row["after_numpy_ms"] = per_round_ms(close_path, intake, correct, *params, True)
+        if n:
+            row["submit_us"] = round(per_round_ms(to_intake, rows) * 1000 / n, 3)
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
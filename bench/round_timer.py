@@ -0,0 +1,98 @@
+"""
+round_timer.py
+--------------
+Round turnaround with bots that answer quickly: closing a round as soon as
+every round player has answered vs always waiting for the deadline.
+
+    python -m bench.round_timer --players 50 --rounds 10
+
+Runs one room in-process on the shared Scheduler in test mode (0.5 s
+question deadline). Fake members answer each question after a random
+0-50 ms delay. `idle` is the time per round after the last answer arrived
+until the next question went out. Prints one JSON object per mode.
+"""
+
+import json
+import random
+import threading
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from server.latency import RttEstimator
+from server.rooms import RoomManager, RoomSettings
+from server.scheduler import Scheduler
+
+ANSWER_DELAY = (0.0, 0.05)
+
+
+class Member:
+    """Outbox stand-in: answers questions through the scheduler."""
+
+    def __init__(self, name, state):
+        self.name = name
+        self.binary = False
+        self.room = None
+        self.rtt = RttEstimator()
+        self.state = state
+
+    def put(self, frame):
+        msg = P.decode(frame.rstrip(b"\n"))
+        t = msg["type"]
+        s = self.state
+        if t == P.QUESTION:
+            if self.name == "bot0":
+                s["asked"].append(time.perf_counter())
+            delay = random.uniform(*ANSWER_DELAY)
+            s["last_answer"] = max(s["last_answer"], time.perf_counter() + delay)
+            s["scheduler"].call_later(delay, s["rooms"].handle, self,
+                                      P.answer(msg["qid"], msg["choices"][0]))
+        elif t == P.ROUND_RESULT and self.name == "bot0":
+            s["idle_from"].append(s["last_answer"])
+            if len(s["idle_from"]) >= s["max_rounds"]:
+                s["done"].set()
+        return True
+
+
+def run(players, rounds, early_close):
+    scheduler = Scheduler().start()
+    rooms = RoomManager(RoomSettings(test_mode=True), scheduler)
+    state = {
+        "scheduler": scheduler, "rooms": rooms, "max_rounds": rounds,
+        "asked": [], "idle_from": [], "last_answer": 0.0, "done": threading.Event(),
+    }
+    members = [Member(f"bot{i}", state) for i in range(players)]
+    for out in members:
+        rooms.join(out, "bench", create=True)
+
+    room = rooms.rooms["bench"]
+    if not early_close:
+        room.game.all_answered = lambda qid: False
+
+    t0 = time.perf_counter()
+    rooms.handle(members[0], P.start())
+    state["done"].wait(60)
+    spent = time.perf_counter() - t0
+
+    # next question minus the last answer of the previous round
+    idle = [nxt - last for last, nxt in zip(state["idle_from"], state["asked"][1:])]
+    room.close()
+    return {
+        "mode": "early_close" if early_close else "deadline_only",
+        "players": players,
+        "rounds": len(state["idle_from"]),
+        "total_sec": round(spent, 3),
+        "round_ms": round(spent / rounds * 1000, 1),
+        "idle_ms": round(sum(idle) / len(idle) * 1000, 1) if idle else None,
+    }
+
+
+def main():
+    players = int(_arg("--players", 50))
+    rounds = int(_arg("--rounds", 10))
+    for early_close in (False, True):
+        print(json.dumps(run(players, rounds, early_close)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+score_persistence.py
+--------------------
+What persisting all-time scores costs the round-close path: write-behind
+(persistence.Scores.record) vs writing each round to SQLite synchronously.
+
+    python -m bench.score_persistence --players 1000 --rounds 50
+
+Plays real rounds with QuizGame, hands each round_result to the store and
+times only that call, as _close_round would see it. Afterwards the queue is
+flushed and the all-time table is checked against the games' own totals.
+Prints one JSON object.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from bench.engine_compare import _arg
+from server import persistence
+from server.quiz_logic import QuizGame
+
+
+def results(players, rounds):
+    """round_results of `rounds` rounds (over as many games as needed)"""
+    names = [f"player{i}" for i in range(players)]
+    out, totals = [], {}
+    while len(out) < rounds:
+        game = QuizGame("server/questions.json")
+        while len(out) < rounds and game.has_next_question():
+            q = game.start_round(names)
+            for i, name in enumerate(names):
+                game.submit_answer(name, q["qid"], q["choices"][i % len(q["choices"])])
+            out.append(game.end_round_and_score())
+        for row in game.get_leaderboard():
+            totals[row["player"]] = totals.get(row["player"], 0) + row["score"]
+    return out, totals
+
+
+def timed(record, rounds):
+    spent = []
+    for r in rounds:
+        t0 = time.perf_counter()
+        record("bench", r)
+        spent.append(time.perf_counter() - t0)
+    spent.sort()
+    return {"p50_ms": round(spent[len(spent) // 2] * 1000, 3),
+            "max_ms": round(spent[-1] * 1000, 3)}
+
+
+def main():
+    players = int(_arg("--players", 1000))
+    rounds = int(_arg("--rounds", 50))
+    closed, totals = results(players, rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # synchronous: one transaction per round, on the caller's thread
+        store = persistence.SQLiteStore(os.path.join(tmp, "sync.db"))
+        store.open()
+        sync = timed(lambda room, r: store.write([(room, r["qid"], time.time(), r["winner"],
+                     [(d["player"], d["points"], d["correct"]) for d in r["details"]])]), closed)
+        store.close()
+
+        scores = persistence.open_scores(os.path.join(tmp, "behind.db"))
+        behind = timed(scores.record, closed)
+        t0 = time.perf_counter()
+        scores.flush()
+        drain = time.perf_counter() - t0
+
+        check = persistence.SQLiteStore(os.path.join(tmp, "behind.db"))
+        check.open()
+        stored = {row["player"]: row["score"] for row in check.top(players)}
+        check.close()
+        assert stored == totals, "persisted totals differ from the games' scoreboards"
+
+    print(json.dumps({
+        "players": players,
+        "rounds": rounds,
+        "sync_close_ms": sync,
+        "write_behind_close_ms": behind,
+        "write_behind_drain_sec": round(drain, 3),
+        "checks": "ok",
+    }))
+
+
+if __name__ == "__main__":
+    main()
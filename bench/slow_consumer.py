@@ -0,0 +1,146 @@
+"""
+slow_consumer.py
+----------------
+Question fan-out skew with stalled receivers in the room.
+
+    python -m bench.slow_consumer --players 200 --stalled 3 --rounds 5
+
+`--stalled` clients join and then never read their socket. For every
+question we record when each healthy bot received it; skew is the spread
+between the first and the last arrival. Prints one JSON object per engine.
+"""
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+import protocol_message as P
+from bench.engine_compare import HOST, _arg, percentile
+
+
+async def stalled_client(name, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    loop = asyncio.get_running_loop()
+    await loop.sock_connect(sock, (HOST, port))
+    await loop.sock_sendall(sock, (name + "\n").encode())
+    return sock  # never read from again
+
+
+async def bot(name, port, leader, state):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write((name + "\n").encode())
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            t = msg["type"]
+
+            if t == P.WELCOME:
+                state["held"] += 1
+                if state["held"] == state["players"]:
+                    state["all_in"].set()
+                if leader:
+                    await state["all_in"].wait()
+                    writer.write((json.dumps(P.start()) + "\n").encode())
+
+            elif t == P.QUESTION:
+                state["arrivals"].setdefault(msg["qid"], []).append(time.perf_counter())
+                ans = P.answer(msg["qid"], msg["choices"][0])
+                writer.write((json.dumps(ans) + "\n").encode())
+
+            elif t == P.ROUND_RESULT and leader:
+                state["rounds"] += 1
+                if state["rounds"] >= state["max_rounds"]:
+                    state["done"].set()
+
+            elif t == P.GAME_OVER:
+                state["done"].set()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        writer.close()
+
+
+async def drive(port, players, stalled, max_rounds):
+    state = {
+        "players": players,
+        "max_rounds": max_rounds,
+        "held": 0,
+        "rounds": 0,
+        "arrivals": {},
+        "all_in": asyncio.Event(),
+        "done": asyncio.Event(),
+    }
+
+    stuck = [await stalled_client(f"stalled{i}", port) for i in range(stalled)]
+    tasks = [
+        asyncio.create_task(bot(f"bench{i}", port, i == 0, state))
+        for i in range(players)
+    ]
+
+    try:
+        await asyncio.wait_for(state["done"].wait(), timeout=30 + 10 * max_rounds)
+    except asyncio.TimeoutError:
+        pass
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for sock in stuck:
+        sock.close()
+
+    skews = [
+        (max(ts) - min(ts)) * 1000
+        for ts in state["arrivals"].values()
+        if len(ts) == players
+    ]
+    return {
+        "players": players,
+        "stalled": stalled,
+        "rounds": state["rounds"],
+        "questions_fully_delivered": len(skews),
+        "skew_p50_ms": percentile(skews, 50),
+        "skew_max_ms": percentile(skews, 100),
+    }
+
+
+def run_engine(engine, port, players, stalled, rounds, extra):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "server.server", "--test",
+         "--engine", engine, "--port", str(port), *extra],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        time.sleep(1.0)
+        result = asyncio.run(drive(port, players, stalled, rounds))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    result["engine"] = engine
+    return result
+
+
+def main():
+    players = int(_arg("--players", 200))
+    stalled = int(_arg("--stalled", 3))
+    rounds = int(_arg("--rounds", 5))
+    port = int(_arg("--port", 5620))
+    engines = _arg("--engines", "threads,asyncio").split(",")
+    extra = ["--lag-policy", _arg("--lag-policy", "drop")]
+
+    for i, engine in enumerate(engines):
+        print(json.dumps(run_engine(engine, port + i, players, stalled, rounds, extra)))
+
+
+if __name__ == "__main__":
+    main()
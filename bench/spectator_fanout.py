@@ -0,0 +1,166 @@
+"""
+spectator_fanout.py
+-------------------
+What a spectator costs and whether it sees the same game: bytes of tallies
+and leaderboard deltas a spectator gets per round vs. the round_result the
+old observer bot got as a player (which also made it a round player every
+round waited for), and whether the leaderboard a spectator rebuilds from
+the deltas matches the owner's.
+
+    python -m bench.spectator_fanout --players 1000 --spectators 10 --nodes 2
+
+All nodes run in this process on the in-process bus ("local"); node n0 owns
+the room and has every player, spectators are spread over all nodes, so
+with --nodes 2 half of them are fed over the bus (SPECTATE). Players answer
+within 0.3 s of a question (so tallies go out mid-round). Two whole games
+are played: after the first every player leaves (the room resets, the
+spectators stay) and new players play the second, whose board must not
+keep anyone from the first. Also checks that every tally counts only the
+players, never the spectators. Prints one JSON object.
+"""
+
+import json
+import threading
+import time
+
+import protocol_message as P
+from bench.engine_compare import _arg
+from server import metrics
+from server.latency import RttEstimator
+from server.rooms import RoomManager, RoomSettings
+from server.scheduler import Scheduler
+
+ROOM = "bench"
+
+
+class Player:
+    """Outbox stand-in: answers after `delay`, counts round_result bytes."""
+
+    def __init__(self, name, node, delay):
+        self.name = name
+        self.binary = False
+        self.room = None
+        self.rtt = RttEstimator()
+        self.node = node          # (scheduler, rooms) it is connected to
+        self.delay = delay
+        self.result_bytes = 0
+
+    def put(self, frame):
+        msg = P.decode(frame.rstrip(b"\n"))
+        if msg["type"] == P.QUESTION:
+            scheduler, rooms = self.node
+            scheduler.call_later(self.delay, rooms.handle, self, P.answer(msg["qid"], msg["choices"][0]))
+        elif msg["type"] == P.ROUND_RESULT:
+            self.result_bytes += len(frame)
+        return True
+
+
+class Spectator:
+    """Outbox stand-in: rebuilds the leaderboard from BOARD deltas."""
+
+    def __init__(self, done):
+        self.binary = False
+        self.watching = None
+        self.view = {}
+        self.bytes = 0
+        self.seen = {}
+        self.tally_players = set()
+        self.done = done
+
+    def put(self, frame):
+        msg = P.decode(frame.rstrip(b"\n"))
+        t = msg["type"]
+        self.seen[t] = self.seen.get(t, 0) + 1
+        if t in (P.TALLY, P.BOARD):
+            self.bytes += len(frame)      # questions are the same for players
+        if t == P.BOARD:
+            for name in msg["gone"]:
+                self.view.pop(name, None)
+            for row in msg["rows"]:
+                self.view[row["player"]] = row
+        elif t == P.TALLY:
+            self.tally_players.add(msg["players"])
+        elif t == P.GAME_OVER:
+            self.done.release()
+        return True
+
+
+def main():
+    players = int(_arg("--players", 1000))
+    spectators = int(_arg("--spectators", 10))
+    nodes = int(_arg("--nodes", 2))
+    interval = float(_arg("--interval", 0.05))
+    metrics.configure_log(0)
+
+    managers = []
+    for i in range(nodes):
+        scheduler = Scheduler().start()
+        settings = RoomSettings(test_mode=True, cluster="local://spectators", node_id=f"n{i}",
+                                spectate_interval=interval)
+        managers.append((scheduler, RoomManager(settings, scheduler)))
+    owner = managers[0][1]
+    owner.create(ROOM)
+
+    done = threading.Semaphore(0)
+    watchers = [Spectator(done) for _ in range(spectators)]
+    for i, out in enumerate(watchers):
+        managers[i % nodes][1].watch(out, ROOM, False)
+
+    def play(prefix, count):
+        """One game with fresh players: (members, finished, seconds, views match)"""
+        members = [Player(f"{prefix}{i}", managers[0], (i % 10) * 0.03) for i in range(count)]
+        for out in members:
+            owner.join(out, ROOM)
+        time.sleep(0.2)                    # remote WATCHes / joins reach the owner
+        t0 = time.perf_counter()
+        owner.handle(members[0], P.start())
+        finished = all(done.acquire(timeout=60) for _ in watchers)
+        spent = time.perf_counter() - t0
+        time.sleep(3 * interval)           # the last round's board
+        room = owner.rooms[ROOM]
+        expected = {row["player"]: row for row in room.game.standings(room.settings.spectate_top_k)}
+        match = all(s.view == expected for s in watchers)
+        return members, finished, spent, match
+
+    members, finished, spent, views_match = play("bot", players)
+    rounds = watchers[0].seen.get(P.QUESTION, 0)
+    seen = dict(watchers[0].seen)
+    spectator_bytes = sum(s.bytes for s in watchers)
+    tallies_ok = all(s.tally_players == {players} for s in watchers)
+
+    # everyone leaves: the room resets, the spectators stay for the next game
+    for out in members:
+        owner.leave(out)
+    time.sleep(0.2)                        # the reset's BOARD reaches remote spectators
+    for s in watchers:
+        s.tally_players.clear()
+    late = max(1, players // 2)
+    members, finished_2, _, views_match_2 = play("late", late)
+    tallies_ok = tallies_ok and all(s.tally_players == {late} for s in watchers)
+
+    for out in members:
+        owner.leave(out)
+    for i, out in enumerate(watchers):
+        managers[i % nodes][1].leave(out)
+    for _, rooms in managers:
+        rooms.bus.close()
+
+    per_round = lambda n: round(n / max(1, rounds))
+    print(json.dumps({
+        "players": players,
+        "spectators": spectators,
+        "nodes": nodes,
+        "rounds": rounds,
+        "finished": finished and finished_2,
+        "game_s": round(spent, 2),
+        "spectator_bytes_per_round": per_round(spectator_bytes / spectators),
+        "observer_bytes_per_round": per_round(members[0].result_bytes),
+        "spectator_messages": seen,
+        "views_match": views_match,
+        "views_match_after_reset": views_match_2,
+        "tally_counts_players_only": tallies_ok,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+suite.py
+--------
+Whole benchmark suite in one machine-readable file, and a diff of two such
+files to spot regressions between commits.
+
+    python -m bench.suite --out before.json [--quick] [--skip-e2e]
+    git checkout <other commit>
+    python -m bench.suite --out after.json
+    python -m bench.suite --compare before.json after.json [--threshold 10]
+
+The file holds the commit, Python and NumPy versions, then every row of
+bench.micro and bench.e2e. --compare lists each metric that moved by more
+than --threshold percent (lower is better for all of them except
+connect_per_sec) and exits non-zero if any got worse.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from bench import e2e, micro
+from bench.engine_compare import _arg
+
+QUICK_PLAYERS = [100, 1000]
+PLAYERS = [100, 1000, 10000]
+HIGHER_IS_BETTER = {"connect_per_sec"}
+
+
+def commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def meta():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "commit": commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": numpy_version,
+        "machine": platform.machine(),
+    }
+
+
+# ------------------ compare ------------------
+
+def metrics(results):
+    """flat {key: number}; key names the row and the field"""
+    flat = {}
+    for row in results.get("micro", []):
+        flat[f"micro {row['bench']} {row['case']} players={row['players']} {row['unit']}"] = row["value"]
+    for row in results.get("e2e", []):
+        name = f"e2e {row['scenario']} {row['engine']}"
+        for field in ("connect_per_sec", "ack_ms", "round_ms", "result_skew_ms"):
+            value = row.get(field)
+            if isinstance(value, dict):
+                for pct in ("p50", "p99"):
+                    flat[f"{name} {field} {pct}"] = value.get(pct)
+            elif value is not None:
+                flat[f"{name} {field}"] = value
+    return flat
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before, after = metrics(old), metrics(new)
+    worse = 0
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for key in sorted(before.keys() & after.keys()):
+        a, b = before[key], after[key]
+        if not a or b is None:
+            continue
+        change = (b - a) / a * 100
+        if key.split()[-1] in HIGHER_IS_BETTER:
+            change = -change
+        if abs(change) < threshold:
+            continue
+        verdict = "worse" if change > 0 else "better"
+        worse += change > 0
+        print(f"{verdict:6} {change:+7.1f}%  {key}: {a} -> {b}")
+    return worse
+
+
+# ------------------ run ------------------
+
+def main():
+    if "--compare" in sys.argv:
+        i = sys.argv.index("--compare")
+        old_path, new_path = sys.argv[i + 1], sys.argv[i + 2]
+        sys.exit(1 if compare(old_path, new_path, float(_arg("--threshold", 10))) else 0)
+
+    quick = "--quick" in sys.argv
+    results = {"meta": meta()}
+    results["micro"] = micro.run(QUICK_PLAYERS if quick else PLAYERS)
+    if "--skip-e2e" not in sys.argv:
+        scenarios = ["small"] if quick else list(e2e.SCENARIOS)
+        results["e2e"] = e2e.run_all(scenarios, ["threads", "asyncio"])
+
+    out = json.dumps(results, indent=1)
+    path = _arg("--out", None)
+    if path:
+        with open(path, "w") as f:
+            f.write(out + "\n")
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+wire_formats.py
+---------------
+JSON lines vs length-prefixed binary frames: bytes on the wire and
+encode / parse time for each hot message type.
+
+    python -m bench.wire_formats --players 10,100,1000
+
+Messages come from a real QuizGame round where every player answered, so
+round_result carries a full leaderboard and details list. Prints one JSON
+object per (players, message type).
+"""
+
+import json
+import time
+
+import protocol_message as P
+from bench.broadcast_encode import play_round
+from bench.engine_compare import _arg
+from protocol_binary import LENGTH
+
+ENCODINGS = {"json": False, "bin": True}
+
+
+def per_call_us(fn, arg, loops):
+    best = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn(arg)
+        spent = (time.perf_counter() - t0) / loops * 1e6
+        best = spent if best is None else min(best, spent)
+    return round(best, 2)
+
+
+def measure(msg, binary, loops):
+    frame = P.encode(msg, binary)
+    payload = frame[LENGTH.size:] if binary else frame[:-1]
+    assert P.decode(payload, binary) == msg
+    return {
+        "bytes": len(frame),
+        "encode_us": per_call_us(lambda m: P.encode(m, binary), msg, loops),
+        "parse_us": per_call_us(lambda p: P.decode(p, binary), payload, loops),
+    }
+
+
+def main():
+    counts = [int(x) for x in _arg("--players", "10,100,1000").split(",")]
+
+    for players in counts:
+        q, result = play_round(players)
+        msgs = {
+            P.QUESTION: q,
+            P.ANSWER: P.answer(q["qid"], q["choices"][0]),
+            P.ANSWER_ACK: P.answer_ack(True, elapsed=1.234),
+            P.ROUND_RESULT: result,
+        }
+        for t, msg in msgs.items():
+            loops = max(10, 20000 // players) if t == P.ROUND_RESULT else 20000
+            row = {"players": players, "type": t}
+            for name, binary in ENCODINGS.items():
+                for k, v in measure(msg, binary, loops).items():
+                    row[f"{name}_{k}"] = v
+            row["bytes_saved_pct"] = round(100 * (1 - row["bin_bytes"] / row["json_bytes"]), 1)
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
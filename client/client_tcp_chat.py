@@ -1,13 +1,16 @@
 import socket
 import threading
 import json
+import random
 import time
 import sys
 
+from framing import FrameReader
 import protocol_message as P
 
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 5555
+RECONNECT_TRIES = 5
 
 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
@@ -22,6 +25,7 @@ time_limit = 0
 
 mode = "idle"      # idle | question
 answered = False
+session = None     # resume token from the welcome
 
 
 # ------------------ networking ------------------
@@ -31,23 +35,47 @@ def send(msg: dict):
     sock.sendall((json.dumps(msg) + "\n").encode())
 
 
+def reconnect() -> bool:
+    """
+    New connection that resumes our session. Backoff with jitter, so a
+    network blip doesn't bring every client back at the same instant.
+    """
+    global sock
+    delay = 0.5
+    for _ in range(RECONNECT_TRIES):
+        time.sleep(delay * random.uniform(0.5, 1.5))
+        delay *= 2
+        try:
+            new = socket.create_connection((SERVER_HOST, SERVER_PORT))
+        except OSError:
+            continue
+        sock = new
+        sock.sendall(P.resume(session))
+        return True
+    return False
+
+
 def receive_loop():
-    buffer = ""
     while True:
-        try:
-            data = sock.recv(4096)
-            if not data:
+        reader = FrameReader()
+        while True:
+            try:
+                if not reader.recv(sock):
+                    break
+
+                for line in reader.frames():
+                    msg = json.loads(line)
+                    P.validate(msg)
+                    handle_message(msg)
+
+            except Exception as e:
+                print("Receive error:", e)
                 break
 
-            buffer += data.decode()
-            while "\n" in buffer:
-                line, buffer = buffer.split("\n", 1)
-                msg = json.loads(line)
-                P.validate(msg)
-                handle_message(msg)
-
-        except Exception as e:
-            print("Receive error:", e)
+        if session is None:
+            break
+        print("🔁 Connection lost, reconnecting...")
+        if not reconnect():
             break
 
     print("🔌 Disconnected")
@@ -57,13 +85,33 @@ def receive_loop():
 # ------------------ message handling ------------------
 
 def handle_message(msg: dict):
-    global current_qid, choices, start_time, time_limit, mode, answered
+    global current_qid, choices, start_time, time_limit, mode, answered, session
 
     t = msg["type"]
 
     if t == P.WELCOME:
+        session = msg.get("session")
+        if msg.get("resumed"):
+            print(f"🔁 Back in the game, {msg['player']}")
+            return
         print(f"👋 Welcome, {msg['player']}")
-        print("Type /start to begin")
+        print("Type /start to begin, /create [room] or /join <room> to switch rooms, /top for all-time scores")
+
+    elif t == P.SESSION:
+        session = msg["session"]
+
+    elif t == P.ROOM:
+        print(f"🏠 Room {msg['room']} ({msg['players']} players)")
+
+    elif t == P.ERROR:
+        print("⚠️", msg["reason"])
+        if msg["reason"] == "session_expired":
+            # too late to resume: join again as a new player
+            session = None
+            sock.sendall((name + "\n").encode())
+
+    elif t == P.PING:
+        send(P.pong(msg["id"]))
 
     elif t == P.QUESTION:
         with lock:
@@ -71,13 +119,15 @@ def handle_message(msg: dict):
             choices = msg["choices"]
             start_time = msg["server_time"]
             time_limit = msg["time_limit_sec"]
-            answered = False
+            answered = msg.get("answered", False)   # replayed after a reconnect
             mode = "question"
 
         print("\n" + "=" * 40)
         print("📘 QUESTION:", msg["question"])
         for i, c in enumerate(choices):
             print(f"  {chr(65+i)}. {c}")
+        if "remaining_sec" in msg:
+            print(f"⏳ {msg['remaining_sec']:.0f}s left" + (" (already answered)" if answered else ""))
 
     elif t == P.ROUND_RESULT:
         with lock:
@@ -85,10 +135,18 @@ def handle_message(msg: dict):
 
         print("\n✅ Correct answer:", msg["correct_answer"])
         print("🏆 Winner:", msg["winner"])
+        if "you" in msg:
+            me = msg["you"]
+            print(f"🎯 You: +{me.get('points', 0)} points | rank {me.get('rank')}")
         print("📊 Leaderboard:")
         for p in msg["leaderboard"]:
             print(" ", p)
 
+    elif t == P.ALL_TIME:
+        print("🏛 All-time leaderboard:")
+        for i, p in enumerate(msg["leaderboard"], 1):
+            print(f"  {i}. {p['player']} {p['score']} pts, {p['wins']} wins")
+
     elif t == P.GAME_OVER:
         print("\n🎉 Game Over!")
         sys.exit()
@@ -106,6 +164,19 @@ def input_loop():
             send(P.start())
             continue
 
+        if text.lower().startswith("/join "):
+            send(P.join(text[6:].strip()))
+            continue
+
+        if text.lower().startswith("/create"):
+            send(P.create(text[7:].strip() or None))
+            continue
+
+        if text.lower().split()[:1] == ["/top"]:
+            k = text.split()[1:2]
+            send(P.top(int(k[0])) if k and k[0].isdigit() else P.top())
+            continue
+
         with lock:
             if mode != "question" or answered:
                 print("❌ No active question")
@@ -129,9 +200,10 @@ def input_loop():
 
 # ------------------ main ------------------
 
-sock.connect((SERVER_HOST, SERVER_PORT))
-
+# ask first: the server only waits a few seconds for the name line
 name = input("Enter your name: ").strip()
+
+sock.connect((SERVER_HOST, SERVER_PORT))
 sock.sendall((name + "\n").encode())
 
 threading.Thread(target=receive_loop, daemon=True).start()
@@ -1,15 +1,17 @@
 import socket
+import sys
 import threading
-import json
 import time
 import random
 
+from framing import FrameReader
 import protocol_message as P
 
 HOST = "127.0.0.1"
 PORT = 5555
 
 BOT_COUNT = 5
+BINARY = "--binary" in sys.argv   # length-prefixed binary frames after welcome
 ANSWER_DELAY = (0.05, 0.3)
 
 # ------------------ shared observer state ------------------
@@ -27,25 +29,20 @@ def bot(name, leader=False):
     global current_question, current_choices, answers
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.connect((HOST, PORT))
-    sock.sendall((name + "\n").encode())
+    sock.sendall(P.hello(name, P.ENCODING_BINARY if BINARY else P.ENCODING_JSON))
 
-    buffer = ""
+    reader = FrameReader()   # binary switches on once the welcome arrives
 
     def send(msg):
-        sock.sendall((json.dumps(msg) + "\n").encode())
+        sock.sendall(P.encode(msg, BINARY))
 
-    while True:
-        data = sock.recv(4096)
-        if not data:
-            return
-
-        buffer += data.decode()
-        while "\n" in buffer:
-            line, buffer = buffer.split("\n", 1)
-            msg = json.loads(line)
+    while reader.recv(sock):
+        for payload in reader.frames():
+            msg = P.decode(payload, reader.binary)
             t = msg["type"]
 
             if t == P.WELCOME:
+                reader.binary = msg.get("encoding") == P.ENCODING_BINARY
                 if leader:
                     time.sleep(0.1)
                     send(P.start())
@@ -66,6 +63,9 @@ def bot(name, leader=False):
 
                 send(P.answer(msg["qid"], choice))
 
+            elif t == P.PING:
+                send(P.pong(msg["id"]))
+
             elif t == P.ROUND_RESULT:
                 with lock:
                     # leader prints ONE consolidated view
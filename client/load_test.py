@@ -0,0 +1,390 @@
+# load_test.py
+#
+# Headless load generator: thousands of asyncio bots per process, spread
+# over several processes, playing real rounds against a running server.
+# Prints one JSON report: connection rate, answer -> answer_ack latency
+# percentiles, round_result fan-out skew across all bots, round time
+# (question out -> result in), and errors.
+#
+#   python -m client.load_test --bots 20000 --procs 4 --rooms 20 --rounds 5 \
+#       --delay exp:0.8 --correct 0.6 [--binary] [--out report.json]
+#
+# --delay   answer delay per question, seconds:
+#           fixed:0.2 | uniform:0.05,0.3 (default) | exp:MEAN | normal:MU,SIGMA
+# --correct chance of answering correctly (looked up in --questions by qid);
+#           omit for random choices
+# --rooms   bots are dealt over rooms load0..N-1 (1 = the default room)
+# --port    5555,5556 deals bots over several server nodes (cluster mode)
+# --flaky   chance per question that a bot drops its connection and comes
+#           back with resume(session), e.g. 0.1 (mobile clients)
+#
+# Skew compares time.monotonic() stamps from different processes, which is
+# one system-wide clock on Linux.
+import asyncio
+import json
+import multiprocessing as mp
+import random
+import resource
+import sys
+import time
+from collections import Counter
+
+from framing import FrameReader
+import protocol_message as P
+
+
+def _arg(flag, default):
+    """Value following `flag` on the command line"""
+    if flag in sys.argv:
+        i = sys.argv.index(flag)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+HOST = _arg("--host", "127.0.0.1")
+PORTS = [int(p) for p in _arg("--port", "5555").split(",")]
+CONNECT_CONCURRENCY = 500      # connects in flight per process
+
+
+# ------------------ knobs ------------------
+
+def delay_sampler(spec: str):
+    """'exp:0.8' -> function returning one delay in seconds"""
+    kind, _, args = spec.partition(":")
+    nums = [float(x) for x in args.split(",") if x]
+    if kind == "fixed":
+        return lambda: nums[0]
+    if kind == "uniform":
+        return lambda: random.uniform(nums[0], nums[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / nums[0])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(nums[0], nums[1]))
+    raise ValueError(f"unknown delay distribution: {spec}")
+
+
+def load_answers(path: str):
+    """qid -> correct answer, from the same bank the server plays"""
+    from server.question_bank import open_bank
+    index = open_bank(path).refresh()
+    answers = {}
+    for pos in range(len(index)):
+        q = index.question(pos)
+        answers[q.qid] = q.answer
+    return answers
+
+
+def room_name(rooms: int, i: int) -> str:
+    return "main" if rooms == 1 else f"load{i % rooms}"
+
+
+def percentiles(values, scale=1000.0):
+    """p50/p90/p99/max in ms"""
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * scale, 2)
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99),
+            "max": round(values[-1] * scale, 2)}
+
+
+# ------------------ one bot ------------------
+
+async def bot(name, room, port, cfg, stats, ready, go):
+    async with stats["connecting"]:
+        try:
+            reader, writer = await asyncio.open_connection(cfg["host"], port)
+        except OSError:
+            stats["errors"]["connect"] += 1
+            ready.release()
+            return
+        stats["connected"] += 1
+        stats["last_connect"] = time.monotonic()
+
+    binary = cfg["binary"]
+    encoding = P.ENCODING_BINARY if binary else P.ENCODING_JSON
+    frames = FrameReader()
+    writer.write(P.hello(name, encoding))
+    sent_at = None        # perf_counter() of the answer awaiting its ack
+    rounds = 0
+    in_room = False
+    session = None
+    drop = False          # simulate a network blip after this batch of frames
+    pending = None        # answer_later() task of the open question
+
+    def send(msg):
+        writer.write(P.encode(msg, frames.binary))
+
+    async def answer_later(msg):
+        nonlocal sent_at
+        await asyncio.sleep(cfg["delay"]())
+        correct = cfg["answers"].get(msg["qid"])
+        if correct is not None and random.random() < cfg["correct"]:
+            choice = correct
+        else:
+            wrong = [c for c in msg["choices"] if c != correct]
+            choice = random.choice(wrong or msg["choices"])
+        sent_at = time.perf_counter()
+        send(P.answer(msg["qid"], choice))
+        stats["answers"] += 1
+
+    try:
+        while rounds < cfg["rounds"]:
+            data = await reader.read(65536)
+            if not data:
+                stats["errors"]["disconnected"] += 1
+                break
+            frames.feed(data)
+            now = time.monotonic()
+
+            for payload in frames.frames():
+                msg = P.decode(payload, frames.binary)
+                t = msg["type"]
+
+                if t == P.WELCOME:
+                    frames.binary = msg.get("encoding") == P.ENCODING_BINARY
+                    session = msg.get("session")
+                    if msg.get("resumed"):
+                        stats["resumed"] += 1
+                    elif room != "main":
+                        send(P.join(room))
+
+                elif t == P.SESSION:
+                    session = msg["session"]
+
+                elif t == P.ROOM:
+                    if msg["room"] == room and not in_room:
+                        in_room = True
+                        ready.release()
+                        if name == cfg["leaders"].get(room):
+                            await go.wait()
+                            send(P.start())
+
+                elif t == P.ERROR:
+                    # another bot may be creating the same room right now
+                    reason = msg["reason"]
+                    if reason == "no_such_room":
+                        send(P.create(room))
+                    elif reason == "room_exists":
+                        send(P.join(room))
+                    else:
+                        stats["errors"][reason] += 1
+
+                elif t == P.PING:
+                    send(P.pong(msg["id"]))
+
+                elif t == P.QUESTION:
+                    if "remaining_sec" not in msg:     # not a replay after a resume
+                        key = (room, msg["qid"])
+                        stats["question_at"].setdefault(key, [now, now])[1] = now
+                    if not msg.get("answered"):
+                        pending = asyncio.get_running_loop().create_task(answer_later(msg))
+                    drop = session is not None and random.random() < cfg["flaky"]
+
+                elif t == P.ANSWER_ACK:
+                    if msg["ok"] and sent_at is not None:
+                        stats["ack_sec"].append(time.perf_counter() - sent_at)
+                    elif not msg["ok"]:
+                        stats["errors"]["ack_" + msg.get("reason", "")] += 1
+                    sent_at = None
+
+                elif t == P.ROUND_RESULT:
+                    key = (room, msg["qid"])
+                    first_last = stats["result_at"].setdefault(key, [now, now])
+                    first_last[0] = min(first_last[0], now)
+                    first_last[1] = max(first_last[1], now)
+                    rounds += 1
+
+                elif t == P.GAME_OVER:
+                    rounds = cfg["rounds"]
+
+            if drop:
+                # gone mid-question; whatever was in flight is lost, and the
+                # replayed question gets its own answer (else it is sent twice)
+                drop = False
+                if pending is not None:
+                    pending.cancel()
+                writer.transport.abort()
+                await asyncio.sleep(random.uniform(0.05, 0.2))
+                reader, writer = await asyncio.open_connection(cfg["host"], port)
+                frames = FrameReader()
+                writer.write(P.resume(session, encoding))
+                stats["drops"] += 1
+
+    except (ConnectionError, OSError):
+        stats["errors"]["dropped"] += 1
+    finally:
+        if pending is not None:
+            pending.cancel()
+        if not in_room:
+            ready.release()
+        writer.close()
+
+
+# ------------------ one process ------------------
+
+async def run_bots(proc, cfg, barrier):
+    stats = {
+        "connecting": asyncio.Semaphore(CONNECT_CONCURRENCY),
+        "connected": 0,
+        "answers": 0,
+        "drops": 0,
+        "resumed": 0,
+        "last_connect": 0.0,
+        "ack_sec": [],
+        "question_at": {},      # (room, qid) -> [first, last] arrival
+        "result_at": {},
+        "errors": Counter(),
+    }
+    mine = range(proc, cfg["bots"], cfg["procs"])
+    ready = asyncio.Semaphore(0)
+    go = asyncio.Event()
+
+    t0 = time.monotonic()
+    tasks = [
+        asyncio.create_task(bot(f"load{i}", room_name(cfg["rooms"], i),
+                                cfg["ports"][i % len(cfg["ports"])], cfg, stats, ready, go))
+        for i in mine
+    ]
+    for _ in mine:
+        await ready.acquire()
+
+    # every process has its bots in their rooms: leaders press start
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    go.set()
+
+    done, pending = await asyncio.wait(tasks, timeout=cfg["timeout"])
+    for task in pending:
+        task.cancel()
+    stats["errors"]["timeout"] += len(pending)
+
+    return {
+        "connected": stats["connected"],
+        "connect_start": t0,
+        "connect_end": stats["last_connect"] or t0,
+        "answers": stats["answers"],
+        "drops": stats["drops"],
+        "resumed": stats["resumed"],
+        "ack_sec": stats["ack_sec"],
+        "question_at": stats["question_at"],
+        "result_at": stats["result_at"],
+        "errors": dict(stats["errors"]),
+    }
+
+
+def _child(proc, cfg, barrier, results):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    try:
+        results.put(asyncio.run(run_bots(proc, cfg, barrier)))
+    except Exception as e:
+        results.put({"errors": {"crashed": 1, type(e).__name__: 1}})
+
+
+# ------------------ report ------------------
+
+def _skew(parts, key):
+    """first/last arrival of each (room, qid) merged over processes -> spread"""
+    spans = {}
+    for part in parts:
+        for k, (first, last) in part.get(key, {}).items():
+            span = spans.setdefault(k, [first, last])
+            span[0] = min(span[0], first)
+            span[1] = max(span[1], last)
+    return [last - first for first, last in spans.values()], len(spans)
+
+
+def _round_times(parts):
+    """first question arrival -> first round_result arrival, per round"""
+    asked, closed = {}, {}
+    for part in parts:
+        for k, (first, _) in part.get("question_at", {}).items():
+            asked[k] = min(asked.get(k, first), first)
+        for k, (first, _) in part.get("result_at", {}).items():
+            closed[k] = min(closed.get(k, first), first)
+    return [closed[k] - asked[k] for k in closed if k in asked]
+
+
+def report(cfg, parts, spent):
+    connected = sum(p.get("connected", 0) for p in parts)
+    starts = [p["connect_start"] for p in parts if "connect_start" in p]
+    ends = [p["connect_end"] for p in parts if "connect_end" in p]
+    connect_sec = (max(ends) - min(starts)) if starts else 0.0
+    acks = [x for p in parts for x in p.get("ack_sec", ())]
+    errors = Counter()
+    for p in parts:
+        errors.update(p.get("errors", {}))
+    question_skew, _ = _skew(parts, "question_at")
+    result_skew, rounds = _skew(parts, "result_at")
+    round_sec = _round_times(parts)
+
+    return {
+        "bots": cfg["bots"],
+        "procs": cfg["procs"],
+        "rooms": cfg["rooms"],
+        "binary": cfg["binary"],
+        "delay": cfg["delay_spec"],
+        "correct": cfg["correct"] if cfg["answers"] else None,
+        "connected": connected,
+        "connect_sec": round(connect_sec, 3),
+        "connect_per_sec": round(connected / connect_sec, 1) if connect_sec > 0 else None,
+        "answers": sum(p.get("answers", 0) for p in parts),
+        "drops": sum(p.get("drops", 0) for p in parts),
+        "resumed": sum(p.get("resumed", 0) for p in parts),
+        "acks": len(acks),
+        "ack_ms": percentiles(acks),
+        "rounds": rounds,
+        "question_skew_ms": percentiles(question_skew),
+        "result_skew_ms": percentiles(result_skew),
+        "round_ms": percentiles(round_sec),
+        "errors": dict(errors),
+        "total_sec": round(spent, 3),
+    }
+
+
+def main():
+    correct = _arg("--correct", None)
+    questions = _arg("--questions", "server/questions.json")
+    cfg = {
+        "host": HOST,
+        "ports": PORTS,
+        "bots": int(_arg("--bots", 1000)),
+        "procs": int(_arg("--procs", 1)),
+        "rooms": int(_arg("--rooms", 1)),
+        "rounds": int(_arg("--rounds", 3)),
+        "binary": "--binary" in sys.argv,
+        "flaky": float(_arg("--flaky", 0)),
+        "delay_spec": _arg("--delay", "uniform:0.05,0.3"),
+        "correct": float(correct) if correct is not None else 0.0,
+        "answers": load_answers(questions) if correct is not None else {},
+    }
+    cfg["delay"] = delay_sampler(cfg["delay_spec"])
+    cfg["timeout"] = float(_arg("--timeout", 60 + 15 * cfg["rounds"]))
+    # first bot of each room presses start
+    cfg["leaders"] = {}
+    for i in range(min(cfg["bots"], cfg["rooms"])):
+        cfg["leaders"][room_name(cfg["rooms"], i)] = f"load{i}"
+
+    ctx = mp.get_context("fork")
+    barrier = ctx.Barrier(cfg["procs"])
+    results = ctx.Queue()
+    t0 = time.monotonic()
+    procs = [ctx.Process(target=_child, args=(i, cfg, barrier, results))
+             for i in range(cfg["procs"])]
+    for p in procs:
+        p.start()
+    parts = [results.get(timeout=cfg["timeout"] + 60) for _ in procs]
+    for p in procs:
+        p.join()
+
+    out = json.dumps(report(cfg, parts, time.monotonic() - t0), indent=2)
+    path = _arg("--out", None)
+    if path:
+        with open(path, "w") as f:
+            f.write(out + "\n")
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
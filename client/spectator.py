@@ -0,0 +1,103 @@
+"""
+spectator.py
+------------
+Watch a room without playing: questions, how many players have answered,
+and the leaderboard, kept up to date from the server's BOARD deltas (only
+rows that changed are sent). A spectator is never a round player.
+
+    python -m client.spectator [--room main] [--port 5555] [--binary] [--top 10]
+"""
+
+import socket
+import sys
+
+from framing import FrameReader
+import protocol_message as P
+
+
+def _arg(flag, default):
+    if flag in sys.argv:
+        i = sys.argv.index(flag)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+HOST = _arg("--host", "127.0.0.1")
+PORT = int(_arg("--port", 5555))
+ROOM = _arg("--room", "main")
+BINARY = "--binary" in sys.argv
+TOP = int(_arg("--top", 10))
+
+view = {}      # player -> row (player, score, wins, rank)
+
+
+def apply_board(msg):
+    for name in msg["gone"]:
+        view.pop(name, None)
+    for row in msg["rows"]:
+        view[row["player"]] = row
+
+
+def print_board():
+    for row in sorted(view.values(), key=lambda r: r["rank"])[:TOP]:
+        print(f"  {row['rank']:3}. {row['player']:20} {row['score']:6} pts  {row['wins']} wins")
+
+
+def handle_message(msg):
+    t = msg["type"]
+
+    if t == P.WATCHING:
+        view.clear()
+        apply_board({"rows": msg["leaderboard"], "gone": []})
+        players = msg["players"]
+        print(f"👁 Watching room {msg['room']}" + (f" ({players} players)" if players is not None else ""))
+        print_board()
+
+    elif t == P.QUESTION:
+        print("\n" + "=" * 40)
+        print("📘 QUESTION:", msg["question"])
+        for i, c in enumerate(msg["choices"]):
+            print(f"  {chr(65 + i)}. {c}")
+
+    elif t == P.TALLY:
+        print(f"🗳 {msg['answers']}/{msg['players']} answered")
+
+    elif t == P.BOARD:
+        apply_board(msg)
+        if msg.get("qid"):
+            print(f"\n✅ Correct answer: {msg['correct_answer']} | 🏆 Winner: {msg['winner']}")
+        print(f"📊 Leaderboard ({len(msg['rows'])} changed):")
+        print_board()
+
+    elif t == P.GAME_OVER:
+        print("\n🎉 Game Over! Waiting for the next game...")
+
+    elif t == P.PING:
+        return P.pong(msg["id"])
+
+    elif t == P.ERROR:
+        print("⚠️", msg["reason"])
+
+
+def main():
+    sock = socket.create_connection((HOST, PORT))
+    sock.sendall(P.watch(ROOM, P.ENCODING_BINARY if BINARY else P.ENCODING_JSON))
+
+    reader = FrameReader()   # binary switches on after the watching message
+    try:
+        while reader.recv(sock):
+            for payload in reader.frames():
+                msg = P.decode(payload, reader.binary)
+                if msg["type"] == P.WATCHING:
+                    reader.binary = msg.get("encoding") == P.ENCODING_BINARY
+                reply = handle_message(msg)
+                if reply is not None:
+                    sock.sendall(P.encode(reply, reader.binary))
+    except KeyboardInterrupt:
+        pass
+    print("🔌 Disconnected")
+
+
+if __name__ == "__main__":
+    main()
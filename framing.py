@@ -0,0 +1,144 @@
+"""
+framing.py
+----------
+Receive buffering shared by the server and every client.
+
+A FrameReader owns one bytearray per connection. The socket reads straight
+into its free tail (sock.recv_into, or asyncio's BufferedProtocol
+get_buffer/buffer_updated) and complete frames are sliced out by offset:
+newline-terminated JSON lines, or u32-length binary frames once `binary` is
+switched on. Consumed bytes are only moved when the buffer needs room, so a
+recv full of small frames costs one pass instead of re-copying the tail
+after every line, and UTF-8 is only ever decoded per complete frame.
+
+The server passes max_frame: a frame announced (binary) or buffered
+(JSON, no newline yet) beyond it raises FrameTooLarge instead of growing
+the buffer without end.
+
+    reader = FrameReader()
+    while reader.recv(sock):
+        for payload in reader.frames():
+            msg = P.decode(payload, reader.binary)
+"""
+
+from typing import Iterator, Optional
+
+from protocol_binary import LENGTH
+
+BUFFER_SIZE = 16384      # initial buffer per connection, grows for big frames
+MIN_READ = 4096          # free space guaranteed before each read
+
+
+class FrameTooLarge(ValueError):
+    """A peer sent (or is still sending) a frame over max_frame bytes."""
+
+
+class FrameReader:
+    def __init__(self, binary: bool = False, size: int = BUFFER_SIZE,
+                 max_frame: Optional[int] = None):
+        self.binary = binary      # framing of everything after the current frame
+        self.max_frame = max_frame   # None = no limit (clients trust the server)
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0           # first unconsumed byte
+        self._end = 0             # end of received data
+        self._scanned = 0         # no newline before this offset
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    # ---------- filling ----------
+
+    def writable(self, sizehint: int = -1) -> memoryview:
+        """Free tail of the buffer to read into (also asyncio get_buffer)."""
+        if self._start == self._end:
+            self._start = self._end = self._scanned = 0
+        want = max(sizehint, MIN_READ)
+        if len(self._buf) - self._end < want:
+            self._make_room(want)
+        return self._view[self._end:]
+
+    def advance(self, nbytes: int) -> None:
+        """`nbytes` were written into writable() (also asyncio buffer_updated)."""
+        self._end += nbytes
+
+    def recv(self, sock) -> int:
+        """One recv_into from a blocking socket; 0 means the peer closed."""
+        n = sock.recv_into(self.writable())
+        self._end += n
+        return n
+
+    def feed(self, data: bytes) -> None:
+        """Append bytes that arrived some other way (e.g. a handoff)."""
+        self.writable(len(data))[:len(data)] = data
+        self._end += len(data)
+
+    def _make_room(self, want: int) -> None:
+        pending = self._end - self._start
+        size = len(self._buf)
+        if pending + want > size:
+            while pending + want > size:
+                size *= 2
+            buf = bytearray(size)
+            buf[:pending] = self._view[self._start:self._end]
+            self._view.release()
+            self._buf, self._view = buf, memoryview(buf)
+        else:
+            self._buf[:pending] = self._buf[self._start:self._end]
+        self._scanned -= self._start
+        self._start, self._end = 0, pending
+
+    # ---------- framing ----------
+
+    def next_frame(self) -> Optional[bytearray]:
+        """Payload of the first complete frame (without framing), or None."""
+        start = self._start
+        if self.binary:
+            if self._end - start < LENGTH.size:
+                return None
+            (n,) = LENGTH.unpack_from(self._buf, start)
+            if self.max_frame is not None and n > self.max_frame:
+                raise FrameTooLarge(n)
+            start += LENGTH.size
+            stop = start + n
+            if stop > self._end:
+                return None
+            self._start = stop
+        else:
+            stop = self._buf.find(b"\n", max(start, self._scanned), self._end)
+            if stop < 0:
+                self._scanned = self._end
+                self._check_pending()
+                return None
+            self._start = self._scanned = stop + 1
+        return self._buf[start:stop]
+
+    def frames(self) -> Iterator[bytearray]:
+        """Every complete frame received so far (each one a fresh copy)."""
+        while True:
+            if self.binary:
+                payload = self.next_frame()
+                if payload is None:
+                    return
+                yield payload
+                continue
+
+            # JSON lines: the hot path, kept free of method calls
+            start, end = self._start, self._end
+            buf = self._buf
+            stop = buf.find(b"\n", max(start, self._scanned), end)
+            if stop < 0:
+                self._scanned = end
+                self._check_pending()
+                return
+            self._start = self._scanned = stop + 1
+            yield buf[start:stop]
+
+    def _check_pending(self) -> None:
+        # only reached when no complete line is buffered, never per frame
+        if self.max_frame is not None and self._end - self._start > self.max_frame:
+            raise FrameTooLarge(self._end - self._start)
+
+    def pending(self) -> bytes:
+        """Received but not yet framed bytes."""
+        return bytes(self._view[self._start:self._end])
@@ -42,5 +42,6 @@ elif mode == "3":
 
     time.sleep(0.5)
     run("-m", "client.fake_client_player")
+    run("-m", "client.spectator")      # the whole room's view, without playing
 
 print("🚀 Game launched")
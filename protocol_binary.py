@@ -0,0 +1,254 @@
+"""
+protocol_binary.py
+------------------
+Compact binary encoding of protocol messages (opt-in, see protocol_message).
+
+Frame:    u32 payload length | payload   (split by framing.FrameReader)
+Payload:  u8 type code | u16 present mask | u16 null mask | fields | extras
+
+Fields of the hot message types (QUESTION, ANSWER, ANSWER_ACK,
+ROUND_RESULT) are packed with struct in schema order; only present, non-None
+fields are written. Keys outside the schema (or values that don't fit the
+packed layout) go to `extras` as (key, JSON) pairs, so nothing is lost.
+Every other message type is code 0 + JSON.
+"""
+
+import json
+import struct
+from typing import Callable, Dict, List, Tuple
+
+import protocol_message as P
+
+LENGTH = struct.Struct("!I")
+HEADER = struct.Struct("!BHH")
+U16 = struct.Struct("!H")
+U32 = struct.Struct("!I")
+F64 = struct.Struct("!d")
+I64 = struct.Struct("!q")
+ROW = struct.Struct("!qqq")     # leaderboard row: score, wins, rounds
+DETAIL = struct.Struct("!d??qqq")   # time_sec, late, correct, points, bonus, rank
+
+GENERIC = 0
+
+# kinds: s=str  f=float  i=int  b=bool  l=list[str]  j=any JSON
+#        board=leaderboard rows  details=round detail rows
+SCHEMAS: Dict[str, List[Tuple[str, str]]] = {
+    P.QUESTION: [
+        ("qid", "s"), ("question", "s"), ("choices", "l"),
+        ("time_limit_sec", "i"), ("server_time", "f"),
+    ],
+    P.ANSWER: [
+        ("qid", "s"), ("answer", "s"),
+    ],
+    P.ANSWER_ACK: [
+        ("ok", "b"), ("elapsed", "f"), ("reason", "s"), ("late", "b"),
+    ],
+    P.ROUND_RESULT: [
+        ("ok", "b"), ("qid", "s"), ("correct_answer", "s"), ("winner", "s"),
+        ("players", "i"), ("leaderboard", "board"), ("details", "details"),
+    ],
+}
+CODES = {t: i + 1 for i, t in enumerate(SCHEMAS)}
+TYPES = {code: t for t, code in CODES.items()}
+BOARD_KEYS = {"player", "score", "wins", "rounds"}
+DETAIL_KEYS = {"player", "answer", "time_sec", "late", "correct", "points", "bonus", "rank"}
+
+
+class _Unpackable(Exception):
+    pass
+
+
+# ================== ENCODE ==================
+
+def _str(s: str) -> bytes:
+    b = s.encode()
+    return U16.pack(len(b)) + b
+
+
+def _json(value) -> bytes:
+    b = json.dumps(value).encode()
+    return U32.pack(len(b)) + b
+
+
+def _field(kind: str, value) -> bytes:
+    if kind == "s":
+        if not isinstance(value, str):
+            raise _Unpackable
+        return _str(value)
+    if kind == "f":
+        return F64.pack(value)
+    if kind == "i":
+        return I64.pack(value)
+    if kind == "b":
+        return b"\x01" if value else b"\x00"
+    if kind == "l":
+        return U16.pack(len(value)) + b"".join(_str(v) for v in value)
+    if kind == "board":
+        parts = [U32.pack(len(value))]
+        for row in value:
+            if row.keys() != BOARD_KEYS:
+                raise _Unpackable
+            parts.append(_str(row["player"]))
+            parts.append(ROW.pack(row["score"], row["wins"], row["rounds"]))
+        return b"".join(parts)
+    if kind == "details":
+        parts = [U32.pack(len(value))]
+        for row in value:
+            if row.keys() != DETAIL_KEYS or not isinstance(row["answer"], str):
+                raise _Unpackable
+            parts.append(_str(row["player"]) + _str(row["answer"]))
+            parts.append(DETAIL.pack(row["time_sec"], row["late"], row["correct"],
+                                     row["points"], row["bonus"], row["rank"]))
+        return b"".join(parts)
+    return _json(value)
+
+
+def encode_payload(msg: Dict) -> bytes:
+    schema = SCHEMAS.get(msg.get("type"))
+    if schema is not None:
+        present = nulls = 0
+        parts = []
+        extras = {k: v for k, v in msg.items() if k != "type"}
+
+        for bit, (key, kind) in enumerate(schema):
+            if key not in msg:
+                continue
+            if msg[key] is None:
+                nulls |= 1 << bit
+                del extras[key]
+                continue
+            try:
+                parts.append(_field(kind, msg[key]))
+            except (_Unpackable, struct.error, TypeError, AttributeError):
+                continue    # stays in extras as JSON
+            present |= 1 << bit
+            del extras[key]
+
+        for key, value in extras.items():
+            parts.append(_str(key) + _json(value))
+
+        return HEADER.pack(CODES[msg["type"]], present, nulls) + b"".join(parts)
+
+    return bytes([GENERIC]) + json.dumps(msg).encode()
+
+
+def encode(msg: Dict) -> bytes:
+    """One length-prefixed frame"""
+    payload = encode_payload(msg)
+    return LENGTH.pack(len(payload)) + payload
+
+
+def prepare(msg: Dict, key: str) -> Callable[[float], bytes]:
+    """
+    Pack msg once with the float field `key` zeroed; stamp(value) then only
+    writes those 8 bytes (same idea as P.prepare). Not thread-safe: one
+    caller stamps at a time.
+    """
+    schema = SCHEMAS[msg["type"]]
+    if (key, "f") not in schema:
+        raise KeyError(key)
+    template = bytearray(encode(dict(msg, **{key: 0.0})))
+
+    # offset of the field: header + every packed field before it
+    pos = LENGTH.size + HEADER.size
+    for name, kind in schema:
+        if name == key:
+            break
+        if msg.get(name) is None:
+            continue
+        try:
+            pos += len(_field(kind, msg[name]))
+        except (_Unpackable, struct.error, TypeError, AttributeError):
+            continue    # went to extras, after the fields
+
+    def stamp(value: float) -> bytes:
+        F64.pack_into(template, pos, value)
+        return bytes(template)
+
+    return stamp
+
+
+def personalize(frame: bytes, key: str, value) -> bytes:
+    """Append one extra field to an encoded frame (same idea as P.personalize)."""
+    payload = frame[LENGTH.size:]
+    if payload[0] == GENERIC:
+        msg = json.loads(payload[1:])
+        msg[key] = value
+        return encode(msg)
+    payload += _str(key) + _json(value)
+    return LENGTH.pack(len(payload)) + payload
+
+
+# ================== DECODE ==================
+
+def decode(payload) -> Dict:
+    payload = memoryview(payload)
+    code = payload[0]
+    if code == GENERIC:
+        return json.loads(bytes(payload[1:]))
+
+    t = TYPES[code]
+    _, present, nulls = HEADER.unpack_from(payload, 0)
+    pos = HEADER.size
+    msg = {"type": t}
+
+    for bit, (key, kind) in enumerate(SCHEMAS[t]):
+        if nulls >> bit & 1:
+            msg[key] = None
+        elif present >> bit & 1:
+            msg[key], pos = _read(kind, payload, pos)
+
+    while pos < len(payload):
+        key, pos = _read("s", payload, pos)
+        msg[key], pos = _read("j", payload, pos)
+
+    return msg
+
+
+def _read(kind: str, buf, pos: int):
+    if kind == "s":
+        (n,) = U16.unpack_from(buf, pos)
+        pos += 2
+        return str(buf[pos:pos + n], "utf-8"), pos + n
+    if kind == "f":
+        return F64.unpack_from(buf, pos)[0], pos + 8
+    if kind == "i":
+        return I64.unpack_from(buf, pos)[0], pos + 8
+    if kind == "b":
+        return buf[pos] != 0, pos + 1
+    if kind == "l":
+        (n,) = U16.unpack_from(buf, pos)
+        pos += 2
+        items = []
+        for _ in range(n):
+            s, pos = _read("s", buf, pos)
+            items.append(s)
+        return items, pos
+    if kind == "board":
+        (n,) = U32.unpack_from(buf, pos)
+        pos += 4
+        rows = []
+        for _ in range(n):
+            player, pos = _read("s", buf, pos)
+            score, wins, rounds = ROW.unpack_from(buf, pos)
+            pos += ROW.size
+            rows.append({"player": player, "score": score, "wins": wins, "rounds": rounds})
+        return rows, pos
+    if kind == "details":
+        (n,) = U32.unpack_from(buf, pos)
+        pos += 4
+        rows = []
+        for _ in range(n):
+            player, pos = _read("s", buf, pos)
+            answer, pos = _read("s", buf, pos)
+            time_sec, late, correct, points, bonus, rank = DETAIL.unpack_from(buf, pos)
+            pos += DETAIL.size
+            rows.append({
+                "player": player, "answer": answer, "time_sec": time_sec,
+                "late": late, "correct": correct, "points": points,
+                "bonus": bonus, "rank": rank,
+            })
+        return rows, pos
+    (n,) = U32.unpack_from(buf, pos)
+    pos += 4
+    return json.loads(bytes(buf[pos:pos + n])), pos + n
@@ -5,7 +5,8 @@ Shared protocol definitions for Quiz Game
 Used by BOTH server and client
 """
 
-from typing import Dict, List, Optional
+import json
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 # ================== MESSAGE TYPES ==================
@@ -17,25 +18,193 @@ ANSWER_ACK = "answer_ack"
 ROUND_RESULT = "round_result"
 GAME_OVER = "game_over"
 ERROR = "error"
+ROOM = "room"
+PING = "ping"
+ALL_TIME = "all_time"
+SESSION = "session"
+WATCHING = "watching"      # spectators only: snapshot, then TALLY / BOARD deltas
+TALLY = "tally"
+BOARD = "board"
 
 # Client → Server
 ANSWER = "answer"
 START = "start"
+JOIN = "join"
+CREATE = "create"
+PONG = "pong"
+TOP = "top"
+RESUME = "resume"
+WATCH = "watch"
+
+# Wire encodings, chosen by the client in its first (name) line:
+#   "alice"          -> newline-delimited JSON (default)
+#   "alice\tbin"     -> length-prefixed binary frames after the welcome
+# A reconnecting client sends resume(session) as its first line instead,
+# a spectator sends watch(room).
+ENCODING_JSON = "json"
+ENCODING_BINARY = "bin"
 
 
 # ================== BUILDERS ==================
 
-def welcome(player: str) -> Dict:
-    return {
+def hello(player: str, encoding: str = ENCODING_JSON) -> bytes:
+    """First line a client sends (always plain text)"""
+    if encoding == ENCODING_JSON:
+        return (player + "\n").encode()
+    return f"{player}\t{encoding}\n".encode()
+
+
+def parse_hello(line: str) -> Tuple[str, bool]:
+    """(player name, wants binary)"""
+    name, _, encoding = line.partition("\t")
+    return name.strip(), encoding.strip() == ENCODING_BINARY
+
+
+def resume(session: str, encoding: str = ENCODING_JSON) -> bytes:
+    """First line of a reconnect: reattach to the player of `session`"""
+    msg = {"type": RESUME, "session": session}
+    if encoding != ENCODING_JSON:
+        msg["encoding"] = encoding
+    return (json.dumps(msg) + "\n").encode()
+
+
+def _first_line(line: str, msg_type: str) -> Optional[Dict]:
+    """The first line as a message of msg_type, None if it is anything else
+    (a hello name may start with "{" too)"""
+    if not line.startswith("{"):
+        return None
+    try:
+        msg = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(msg, dict) or msg.get("type") != msg_type:
+        return None
+    return msg
+
+
+def parse_resume(line: str) -> Optional[Tuple[str, bool]]:
+    """(session, wants binary) if the first line is a resume, else None"""
+    msg = _first_line(line, RESUME)
+    if msg is None:
+        return None
+    validate(msg)
+    return msg["session"], msg.get("encoding") == ENCODING_BINARY
+
+
+def watch(room: str, encoding: str = ENCODING_JSON) -> bytes:
+    """First line of a spectator: follow `room` without playing in it"""
+    msg = {"type": WATCH, "room": room}
+    if encoding != ENCODING_JSON:
+        msg["encoding"] = encoding
+    return (json.dumps(msg) + "\n").encode()
+
+
+def parse_watch(line: str) -> Optional[Tuple[str, bool]]:
+    """(room, wants binary) if the first line is a watch, else None"""
+    msg = _first_line(line, WATCH)
+    if msg is None:
+        return None
+    validate(msg)
+    return msg["room"], msg.get("encoding") == ENCODING_BINARY
+
+
+def welcome(player: str, encoding: str = ENCODING_JSON,
+            session: Optional[str] = None, resumed: bool = False) -> Dict:
+    """session: token for resume() after a dropped connection"""
+    msg = {
         "type": WELCOME,
         "player": player,
     }
+    if encoding != ENCODING_JSON:
+        msg["encoding"] = encoding
+    if session is not None:
+        msg["session"] = session
+    if resumed:
+        msg["resumed"] = True
+    return msg
+
+
+def session(token: str) -> Dict:
+    """New resume token (the connection moved to another worker)"""
+    return {
+        "type": SESSION,
+        "session": token,
+    }
+
+def watching(room_id: str, players: Optional[int], leaderboard: List[Dict],
+             encoding: str = ENCODING_JSON) -> Dict:
+    """
+    A spectator's welcome: the room's current top rows (player, score,
+    wins, rank). BOARD messages after it only carry rows that changed.
+    """
+    msg = {
+        "type": WATCHING,
+        "room": room_id,
+        "players": players,
+        "leaderboard": leaderboard,
+    }
+    if encoding != ENCODING_JSON:
+        msg["encoding"] = encoding
+    return msg
+
+
+def tally(qid: str, answers: int, players: int) -> Dict:
+    """How many of the round's players have answered so far"""
+    return {
+        "type": TALLY,
+        "qid": qid,
+        "answers": answers,
+        "players": players,
+    }
+
+
+def board(rows: List[Dict], gone: List[str], players: int,
+          last: Optional[Dict] = None) -> Dict:
+    """
+    Leaderboard delta for spectators: rows whose rank, score or wins
+    changed, and players that left the top. last: qid / correct_answer /
+    winner of the latest round closed since the previous BOARD.
+    """
+    msg = {
+        "type": BOARD,
+        "rows": rows,
+        "gone": gone,
+        "players": players,
+    }
+    if last is not None:
+        msg.update(last)
+    return msg
+
 
 def start():
     return {
         "type": START
     }
 
+
+def join(room: str) -> Dict:
+    return {
+        "type": JOIN,
+        "room": room,
+    }
+
+
+def create(room: Optional[str] = None) -> Dict:
+    msg = {
+        "type": CREATE,
+    }
+    if room:
+        msg["room"] = room
+    return msg
+
+
+def room(room_id: str, players: int) -> Dict:
+    return {
+        "type": ROOM,
+        "room": room_id,
+        "players": players,
+    }
+
 def question(
     qid: str,
     text: str,
@@ -103,6 +272,92 @@ def error(reason: str) -> Dict:
     }
 
 
+def top(k: int = 10) -> Dict:
+    """Ask for the all-time leaderboard (needs a server running with --db)"""
+    return {
+        "type": TOP,
+        "k": k,
+    }
+
+
+def all_time(leaderboard: List[Dict]) -> Dict:
+    return {
+        "type": ALL_TIME,
+        "leaderboard": leaderboard,
+    }
+
+
+def ping(ping_id: int) -> Dict:
+    """RTT probe; the client answers with pong(same id) right away"""
+    return {
+        "type": PING,
+        "id": ping_id,
+    }
+
+
+def pong(ping_id: int) -> Dict:
+    return {
+        "type": PONG,
+        "id": ping_id,
+    }
+
+
+# ================== ENCODING ==================
+
+def encode(msg: Dict, binary: bool = False) -> bytes:
+    """
+    Validate and serialize a message into one frame: newline-terminated
+    JSON, or a length-prefixed binary frame when `binary`.
+    Broadcasts call this once and send the same bytes to every client.
+    """
+    validate(msg)
+    if binary:
+        return _bin.encode(msg)
+    return (json.dumps(msg) + "\n").encode()
+
+
+def decode(payload: bytes, binary: bool = False) -> Dict:
+    """Parse one frame payload (without the framing) back into a dict"""
+    if binary:
+        return _bin.decode(payload)
+    return json.loads(payload)
+
+
+def prepare(msg: Dict, key: str, binary: bool = False) -> Callable[[float], bytes]:
+    """
+    Encode a message ahead of time except for one float field: the
+    returned stamp(value) gives the frame with `key` set to value, without
+    re-encoding the rest. Questions are prepared during the pause before
+    their round and stamped with server_time when it starts.
+    """
+    validate(msg)
+    if binary:
+        return _bin.prepare(msg, key)
+    rest = {k: v for k, v in msg.items() if k != key}
+    head = (json.dumps(rest)[:-1] + ', "%s": ' % key).encode()
+    return lambda value: head + b"%r}\n" % value
+
+
+def personalize(frame: bytes, key: str, value, binary: bool = False) -> bytes:
+    """
+    Add one field to an already encoded frame without re-encoding it.
+    Used to append each player's own row to a shared round_result.
+    """
+    if binary:
+        return _bin.personalize(frame, key, value)
+    return frame[:-2] + (', "%s": %s}\n' % (key, json.dumps(value))).encode()
+
+
+def split_round_result(msg: Dict) -> Tuple[Dict, Dict[str, Dict]]:
+    """
+    Compact round_result: shared summary without 'details',
+    plus every player's own detail row keyed by player name.
+    """
+    shared = {k: v for k, v in msg.items() if k != "details"}
+    rows = {row["player"]: row for row in msg.get("details", [])}
+    return shared, rows
+
+
 # ================== VALIDATION ==================
 
 def validate(msg: Dict) -> None:
@@ -129,7 +384,28 @@ def validate(msg: Dict) -> None:
     elif t == ERROR:
         _require(msg, "reason")
 
-    elif t in (WELCOME, GAME_OVER, START):
+    elif t in (JOIN, ROOM, WATCH):
+        _require(msg, "room")
+
+    elif t == WATCHING:
+        _require(msg, "room", "leaderboard")
+
+    elif t == TALLY:
+        _require(msg, "qid", "answers")
+
+    elif t == BOARD:
+        _require(msg, "rows", "gone")
+
+    elif t in (PING, PONG):
+        _require(msg, "id")
+
+    elif t == ALL_TIME:
+        _require(msg, "leaderboard")
+
+    elif t in (SESSION, RESUME):
+        _require(msg, "session")
+
+    elif t in (WELCOME, GAME_OVER, START, CREATE, TOP):
         pass
     
     else:
@@ -140,3 +416,7 @@ def _require(msg: Dict, *fields: str) -> None:
     for f in fields:
         if f not in msg:
             raise ValueError(f"Missing field '{f}'")
+
+
+# binary codec uses the constants above
+import protocol_binary as _bin  # noqa: E402
@@ -0,0 +1,121 @@
+# admission.py
+#
+# Limits that keep dead, slow or hostile clients from pinning threads and
+# memory. Everything is checked where it is cheapest: connection caps right
+# after accept() (a refused socket gets one error frame and never gets a
+# thread or an Outbox), timeouts and the frame size on the read path, the
+# answer rate in RoomManager.handle. Every refusal is counted in metrics.
+#
+#   python -m server.server --max-conns 25000 --max-per-ip 50 \
+#       --handshake-timeout 10 --idle-timeout 600 --max-frame 16384 --answer-rate 20
+#
+# With --workers every worker applies the connection caps to its own
+# connections (the kernel spreads them evenly); a socket handed over from
+# another worker is always admitted, it was already accepted there.
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from server import metrics
+import protocol_message as P
+
+MAX_CONNECTIONS = 25000    # per process, 0 = unlimited
+MAX_PER_IP = 0             # 0 = unlimited (load tests and NAT share one address)
+HANDSHAKE_TIMEOUT = 10.0   # seconds to send the name (or resume) line, 0 = off
+IDLE_TIMEOUT = 600.0       # seconds without a frame from the client, 0 = off
+MAX_FRAME = 16384          # bytes in one client frame
+ANSWER_RATE = 20.0         # answers per second per client, 0 = off
+
+
+@dataclass
+class Limits:
+    max_connections: int = MAX_CONNECTIONS
+    max_per_ip: int = MAX_PER_IP
+    handshake_timeout: float = HANDSHAKE_TIMEOUT
+    idle_timeout: float = IDLE_TIMEOUT
+    max_frame: int = MAX_FRAME
+
+
+class Admission:
+    """Open connections of this process, in total and per client address."""
+
+    def __init__(self, limits: Limits):
+        self.limits = limits
+        self.open = 0
+        self.per_ip: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def admit(self, ip: str, force: bool = False) -> Optional[str]:
+        """None if the connection may stay, else the reason to refuse it."""
+        reason = None
+        with self.lock:
+            count = self.per_ip.get(ip, 0)
+            if force:
+                pass
+            elif self.limits.max_connections and self.open >= self.limits.max_connections:
+                reason = "server_full"
+            elif self.limits.max_per_ip and count >= self.limits.max_per_ip:
+                reason = "too_many_connections"
+            if reason is None:
+                self.open += 1
+                self.per_ip[ip] = count + 1
+        if reason is not None:
+            metrics.rejected.inc(label=reason)
+        return reason
+
+    def release(self, ip: str) -> None:
+        with self.lock:
+            self.open -= 1
+            count = self.per_ip.pop(ip, 1) - 1
+            if count > 0:
+                self.per_ip[ip] = count
+
+
+_refusals: Dict[str, bytes] = {}
+
+
+def refusal(reason: str) -> bytes:
+    """The error frame a refused connection gets (JSON, no hello was read)."""
+    frame = _refusals.get(reason)
+    if frame is None:
+        frame = _refusals[reason] = P.encode(P.error(reason))
+    return frame
+
+
+def refuse(sock, reason: str) -> None:
+    """Threaded engine: answer and close a socket that was not admitted."""
+    sock.setblocking(False)    # a fresh socket's send buffer is empty anyway
+    try:
+        sock.send(refusal(reason))
+    except OSError:
+        pass
+    sock.close()
+
+
+def evicted(addr, reason: str) -> None:
+    """reason: handshake_timeout | idle_timeout | frame_too_large | handoff_too_large"""
+    metrics.evicted.inc(label=reason)
+    metrics.log("evicted", f"⏱️ {addr} closed: {reason}", addr=str(addr), reason=reason)
+
+
+class RateLimit:
+    """Token bucket per client; its state lives on the Outbox (out.bucket)."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, 2 * rate)
+
+    def allow(self, out) -> bool:
+        now = time.monotonic()
+        bucket = getattr(out, "bucket", None)
+        if bucket is None:
+            out.bucket = [self.burst - 1, now]   # [tokens, last refill]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
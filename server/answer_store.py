@@ -0,0 +1,216 @@
+# answer_store.py
+#
+# Compact per-game storage for answers and player totals. Player names are
+# interned once into small integer ids; answers and stats live in parallel
+# typed arrays instead of a dict + tuple per answer and a dict per player,
+# and only the last few closed rounds are kept.
+#
+# While a round is open, answers arrive through an AnswerIntake, which maps
+# each one to its choice code as it is accepted; the round owner takes the
+# rows over as they are when it closes the round.
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+ANSWER_HISTORY = 10      # closed rounds kept per game (None = keep all)
+
+
+def normalize(s: str) -> str:
+    """Answer comparison form: case and surrounding whitespace don't matter."""
+    return (s or "").strip().lower()
+
+
+class PlayerTable:
+    """Player name <-> small int id, stable for the life of a game."""
+
+    __slots__ = ("names", "ids")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def id(self, name: str) -> int:
+        """Id of a player, assigning the next one on first sight."""
+        pid = self.ids.get(name)
+        if pid is None:
+            name = sys.intern(name)
+            pid = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return pid
+
+    def get(self, name: str) -> Optional[int]:
+        return self.ids.get(name)
+
+    def clear(self) -> None:
+        self.names.clear()
+        self.ids.clear()
+
+
+class RoundAnswers:
+    """
+    Answers of one round as parallel arrays, one row per answering player.
+    The answer text is a code into `texts` (a round rarely sees more than
+    the four choices), and `choice` is the code of its normalized form:
+    the choice index when it matches one, a later code otherwise, so two
+    answers are equal for scoring iff their choice codes are. Both codes
+    were assigned by the round's AnswerIntake at submit time; close()
+    drops the lookup dict once the round is over.
+    """
+
+    __slots__ = ("qid", "player", "answer", "choice", "elapsed", "late", "texts", "_choice_of")
+
+    def __init__(self, qid: str, texts: Sequence[str] = (), choice_of: Optional[Dict[str, int]] = None):
+        self.qid = qid
+        self.player = array("I")      # player id
+        self.answer = array("I")      # code into texts
+        self.choice = array("i")      # normalized answer code, choices first
+        self.elapsed = array("d")     # seconds since the question went out
+        self.late = bytearray()       # 1 if past the time limit
+        self.texts = texts
+        self._choice_of: Optional[Dict[str, int]] = choice_of or {}
+
+    def __len__(self) -> int:
+        return len(self.player)
+
+    def add(self, pid: int, text: int, choice: int, elapsed: float, late: bool) -> None:
+        self.player.append(pid)
+        self.answer.append(text)
+        self.choice.append(choice)
+        self.elapsed.append(elapsed)
+        self.late.append(late)
+
+    def extend(self, rows: Sequence[tuple], pid_of) -> None:
+        """add() every row of AnswerIntake.close(); pid_of(name) -> player id"""
+        if not rows:
+            return
+        players, texts, choices, elapsed, late = zip(*rows)
+        self.player.extend(map(pid_of, players))
+        self.answer.extend(texts)
+        self.choice.extend(choices)
+        self.elapsed.extend(elapsed)
+        self.late.extend(late)
+
+    def choice_code(self, answer: str) -> int:
+        """Code `answer` would get, -1 if no answer so far matches it."""
+        return self._choice_of.get(normalize(answer), -1)
+
+    def rows(self) -> Iterator[Tuple[int, str, float, bool]]:
+        """(player id, answer, elapsed, late) in answer order"""
+        texts = self.texts
+        for i in range(len(self.player)):
+            yield self.player[i], texts[self.answer[i]], self.elapsed[i], bool(self.late[i])
+
+    def close(self) -> None:
+        self._choice_of = None
+
+
+class AnswerIntake:
+    """
+    Answer collection for one open round, safe to submit to from any
+    thread. One short lock covers the duplicate check and the append, so
+    exactly one answer per player is accepted, in acceptance order. The
+    answer is mapped to its text and choice codes here (the normalized
+    choices are a table built when the round starts, other texts are
+    normalized once each), so closing the round only hands the rows over.
+    `expected` are the round's registered players: `complete` turns True
+    once every one of them has an accepted answer, so the round can close
+    without waiting for its timer.
+    """
+
+    __slots__ = ("qid", "start", "time_limit", "expected", "complete", "texts", "choice_of",
+                 "_codes", "_lock", "_players", "_rows", "_closed", "_answered")
+
+    def __init__(self, qid: str, start: float, time_limit: float,
+                 expected: Iterable[str] = (), choices: Sequence[str] = ()):
+        self.qid = qid
+        self.start = start            # round start (time.perf_counter())
+        self.time_limit = time_limit
+        self.expected = frozenset(expected)
+        self.complete = False
+        self.texts: List[str] = []    # distinct answer texts, first seen first
+        self.choice_of: Dict[str, int] = {}    # normalized text -> choice code
+        for c in choices:
+            self.choice_of.setdefault(normalize(c), len(self.choice_of))
+        self._codes: Dict[str, Tuple[int, int]] = {}   # text -> (texts code, choice code)
+        self._lock = threading.Lock()
+        self._players = set()
+        self._rows: List[tuple] = []   # (player, texts code, choice code, elapsed, late)
+        self._closed = False
+        self._answered = 0             # accepted answers from expected players
+
+    def submit(self, player: str, answer: str, elapsed: float, late: bool) -> Optional[str]:
+        """None if accepted, otherwise the answer_ack reason."""
+        with self._lock:
+            if self._closed:
+                return "round_not_active"
+            if player in self._players:
+                return "already_answered"
+            self._players.add(player)
+            codes = self._codes.get(answer)
+            if codes is None:
+                choice = self.choice_of.setdefault(normalize(answer), len(self.choice_of))
+                codes = self._codes[answer] = (len(self.texts), choice)
+                self.texts.append(answer)
+            self._rows.append((player, codes[0], codes[1], elapsed, late))
+            if player in self.expected:
+                self._answered += 1
+                if self._answered == len(self.expected):
+                    self.complete = True
+        return None
+
+    def count(self) -> int:
+        """Accepted answers so far (a snapshot, no lock taken)."""
+        return len(self._rows)
+
+    def has_answered(self, player: str) -> bool:
+        with self._lock:
+            return player in self._players
+
+    def close(self) -> List[tuple]:
+        """
+        Stop accepting and return (player, texts code, choice code, elapsed,
+        late) in acceptance order. Every answer whose submit() returned None
+        is in it.
+        """
+        with self._lock:
+            self._closed = True
+            return self._rows
+
+
+class Scoreboard:
+    """score / wins / rounds per player id, as parallel arrays."""
+
+    __slots__ = ("score", "wins", "rounds")
+
+    def __init__(self):
+        self.score = array("q")
+        self.wins = array("l")
+        self.rounds = array("l")
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def ensure(self, pid: int) -> None:
+        missing = pid + 1 - len(self.score)
+        if missing > 0:
+            zeros = [0] * missing
+            self.score.extend(zeros)
+            self.wins.extend(zeros)
+            self.rounds.extend(zeros)
+
+    def row(self, pid: int) -> Dict[str, int]:
+        return {
+            "score": self.score[pid],
+            "wins": self.wins[pid],
+            "rounds": self.rounds[pid],
+        }
+
+    def clear(self) -> None:
+        del self.score[:], self.wins[:], self.rounds[:]
@@ -0,0 +1,270 @@
+# async_server.py
+#
+# asyncio engine: one event loop drives every connection and every room's
+# round timers, instead of one OS thread per socket. Same wire
+# protocol and the same RoomManager as the threaded engine.
+#
+#   python -m server.server --engine asyncio
+import asyncio
+
+from server import admission, metrics, workers
+from server.outbox import AsyncOutbox, SEND_QUEUE_MAX, LAG_POLICY
+from server.rooms import DEFAULT_ROOM, Handoff, RoomManager, RoomSettings
+from server.scheduler import LoopScheduler
+from framing import FrameReader, FrameTooLarge
+import protocol_message as P
+
+HOST = "0.0.0.0"
+PORT = 5555
+SEND_QUEUE = SEND_QUEUE_MAX
+LAG = LAG_POLICY
+LIMITS = admission.Limits()
+
+rooms = None   # RoomManager, created once the loop is running
+gate = None    # admission.Admission of this process
+
+# ------------------ networking helpers ------------------
+
+def send(out, msg):
+    out.put(P.encode(msg, out.binary))
+
+
+# ------------------ client protocol ------------------
+
+class ClientProtocol(asyncio.BufferedProtocol):
+    """
+    One per connection. The transport reads straight into our FrameReader
+    (instead of a StreamReader), which also lets a socket be handed to
+    another worker together with whatever input it still has pending.
+    """
+
+    def __init__(self, handoff=None):
+        self.handoff = handoff     # header when adopted from another worker
+        self.transport = None
+        self.addr = None
+        self.reader = FrameReader(max_frame=LIMITS.max_frame)
+        self.name = None
+        self.out = None
+        self.handed_off = False
+        self.admitted = False
+        self.timer = None          # handshake / idle check
+        self.last_read = 0.0       # loop.time() of the last complete frame
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info("peername")
+        reason = gate.admit(self.addr[0], force=self.handoff is not None)
+        if reason is not None:
+            transport.write(admission.refusal(reason))
+            transport.close()
+            return
+        self.admitted = True
+        metrics.log_connection(self.addr, "connected")
+        workers.count_connection(1)
+
+        loop = asyncio.get_running_loop()
+        self.last_read = loop.time()
+        first = LIMITS.idle_timeout
+        if self.handoff is None and LIMITS.handshake_timeout:
+            first = LIMITS.handshake_timeout
+        if first:
+            self.timer = loop.call_later(first, self._check_timeout)
+
+        if self.handoff is not None:
+            self.name = self.handoff["name"]
+            self.out = AsyncOutbox(transport, self.name, SEND_QUEUE, LAG,
+                                   self.handoff["binary"])
+            self.reader.feed(self.handoff["buffer"])
+            rooms.adopt(self.out, self.handoff["action"], self.handoff["room"])
+            self.name = self.out.name
+            self.reader.binary = self.out.binary
+            self.process()
+
+    def get_buffer(self, sizehint):
+        return self.reader.writable(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self.reader.advance(nbytes)
+        metrics.bytes_in.inc(nbytes)
+        if not self.handed_off:
+            self.process()
+
+    def process(self):
+        try:
+            for payload in self.reader.frames():
+                # whole frames only: trickled bytes don't keep a connection open
+                self.last_read = asyncio.get_running_loop().time()
+                self.on_frame(payload)
+                if self.handed_off:
+                    return
+        except Handoff as h:
+            self.start_handoff(h)
+        except FrameTooLarge:
+            self._evict("frame_too_large")
+        except Exception as e:
+            print("Error:", e)
+            self.transport.close()
+
+    def on_frame(self, payload: bytes):
+        if self.out is None or self.out.name is None:
+            line = payload.decode()
+            if self.out is None:
+                self.out = AsyncOutbox(self.transport, None, SEND_QUEUE, LAG)
+
+            resume = P.parse_resume(line)
+            if resume is not None:
+                # reconnect: take over the seat (and score) of a dropped connection
+                rooms.resume(self.out, *resume)
+                self.name = self.out.name
+                self.reader.binary = self.out.binary
+                return
+
+            watch = P.parse_watch(line)
+            if watch is not None:
+                rooms.watch(self.out, *watch)
+                self.name = self.out.name
+                self.reader.binary = self.out.binary
+                return
+
+            self.name, binary = P.parse_hello(line)
+            if not self.name:
+                self.transport.close()
+                return
+            self.out.name = self.name
+
+            metrics.log("hello", f"    Player: {self.name}", player=self.name)
+            # welcome is always JSON, the chosen encoding starts after it
+            send(self.out, P.welcome(
+                self.name, P.ENCODING_BINARY if binary else P.ENCODING_JSON,
+                session=rooms.sessions.issue(self.out)))
+            self.out.binary = self.reader.binary = binary
+            rooms.join(self.out, DEFAULT_ROOM, create=True)
+            return
+
+        msg = P.decode(payload, self.out.binary)
+        P.validate(msg)
+
+        metrics.log_message(self.name, msg)
+
+        rooms.handle(self.out, msg)
+
+    def pause_writing(self):
+        if self.out:
+            self.out.writable.clear()
+
+    def resume_writing(self):
+        if self.out:
+            self.out.writable.set()
+
+    # ---------- timeouts ----------
+
+    def _check_timeout(self):
+        # one timer per connection, re-armed from last_read: reads never touch it
+        self.timer = None
+        if self.handed_off or self.transport.is_closing():
+            return
+        if self.name is None and self.handoff is None and LIMITS.handshake_timeout:
+            self._evict("handshake_timeout")
+            return
+        if not LIMITS.idle_timeout or (self.out is not None and self.out.watching is not None):
+            return      # spectators never send anything
+        loop = asyncio.get_running_loop()
+        left = self.last_read + LIMITS.idle_timeout - loop.time()
+        if left > 0:
+            self.timer = loop.call_later(left, self._check_timeout)
+        else:
+            self._evict("idle_timeout")
+
+    def _evict(self, reason: str):
+        admission.evicted(self.addr, reason)
+        self.transport.abort()
+
+    def connection_lost(self, exc):
+        if not self.admitted:
+            return
+        if self.timer is not None:
+            self.timer.cancel()
+        gate.release(self.addr[0])
+        if self.out and not self.handed_off:
+            rooms.drop(self.out)
+            self.out.close()
+        workers.count_connection(-1)
+        metrics.log_connection(self.addr, "handed off" if self.handed_off else "disconnected")
+
+    # ---------- multi-process handoff ----------
+
+    def start_handoff(self, h: Handoff):
+        # room lives in another worker: flush, pass the socket on, forget it
+        self.handed_off = True
+        self.transport.pause_reading()
+        rooms.leave(self.out)
+        rooms.sessions.forget(self.out)
+        asyncio.get_running_loop().create_task(self._finish_handoff(h))
+
+    async def _finish_handoff(self, h: Handoff):
+        await self.out.detach()
+        sock = self.transport.get_extra_info("socket")
+        if not workers.router.send(sock, h.action, h.room_id, self.name,
+                                   self.out.binary, self.reader.pending()):
+            self.handed_off = False
+            admission.evicted(self.addr, "handoff_too_large")
+        self.transport.abort()   # only drops our fd; the other worker owns the connection
+
+
+def _receive_handoffs(router):
+    loop = asyncio.get_running_loop()
+    while True:
+        # one broken handoff must not stop this worker taking the next ones
+        try:
+            sock, header = router.receive()
+        except BlockingIOError:
+            return
+        except (OSError, ValueError) as e:
+            print("Handoff error:", e)
+            continue
+        try:
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            continue
+        loop.create_task(
+            loop.connect_accepted_socket(lambda h=header: ClientProtocol(h), sock)
+        )
+
+
+# ------------------ server ------------------
+
+async def serve(settings: RoomSettings, server=None, router=None):
+    global rooms, gate
+
+    loop = asyncio.get_running_loop()
+    rooms = RoomManager(settings, LoopScheduler(loop), router)
+    gate = admission.Admission(LIMITS)
+
+    if router is not None:
+        router.inbox.setblocking(False)
+        loop.add_reader(router.inbox, _receive_handoffs, router)
+
+    if server is None:
+        server = await loop.create_server(ClientProtocol, HOST, PORT)
+    else:
+        server = await loop.create_server(ClientProtocol, sock=server)
+    print(f"Server listening on {HOST}:{PORT} (asyncio)")
+    async with server:
+        await server.serve_forever()
+
+
+def start(settings: RoomSettings, host=HOST, port=PORT,
+          send_queue=SEND_QUEUE_MAX, lag_policy=LAG_POLICY,
+          server=None, router=None, limits=None):
+    global HOST, PORT, SEND_QUEUE, LAG, LIMITS
+
+    HOST, PORT = host, port
+    SEND_QUEUE, LAG = send_queue, lag_policy
+    if limits is not None:
+        LIMITS = limits
+
+    try:
+        asyncio.run(serve(settings, server, router))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,406 @@
+# cluster.py
+#
+# Several server nodes (separate processes, possibly separate boxes behind
+# one load balancer) sharing one set of rooms. The shared registry maps each
+# room to the node that claimed it first; that node runs its QuizGame.
+# Players of the room connected to other nodes sit in a RemoteRoom there:
+# their answers are forwarded to the owner for scoring, and every question /
+# round_result crosses the bus once per node, then fans out to that node's
+# players (rooms.py has both sides).
+#
+#   python -m server.cluster --port 5600                     # the hub
+#   python -m server.server --cluster tcp://127.0.0.1:5600 --node a --port 5555
+#   python -m server.server --cluster tcp://127.0.0.1:5600 --node b --port 5556
+#
+# Buses are pluggable: anything with connect(node, deliver) / claim(room,
+# node, create, done) / release(room, node) / send(node, msg) / close() in
+# BUSES. "local" keeps the hub in this process (several RoomManagers in one
+# interpreter, for benches); "tcp" talks to a small hub process over a
+# socket, standing in for a real broker. claim() is the only call with an
+# answer, and only joins, creates and watches of rooms use it: it waits for
+# it, or with done=callback returns at once (the event loop never waits).
+# Everything else is fire-and-forget: the tcp bus queues the frame for its
+# writer thread, so no caller ever blocks on the hub's socket.
+#
+# If the hub goes away the tcp bus fails its claims at once, hands the node
+# HUB_LOST (the hub tells the others NODE_DOWN for it, so the node drops
+# what it shared with them) and reconnects; HUB_BACK once it is back.
+import collections
+import itertools
+import json
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from framing import FrameReader
+
+CALL_TIMEOUT = 5.0       # seconds to wait for the hub to answer a claim
+RECONNECT_MAX = 5.0      # seconds between attempts to reach a lost hub, at most
+BUS_QUEUE_MAX = 10000    # frames waiting for the hub; one this far behind is dropped
+
+# ------------------ node <-> hub ------------------
+
+HELLO = "hello"          # {node}
+CLAIM = "claim"          # {id, room, node, create} -> REPLY {id, owner}
+REPLY = "reply"
+RELEASE = "release"      # {room, node}
+RELAY = "relay"          # {to, msg}: hand msg to node `to`
+NODE_DOWN = "node_down"  # hub -> every node: {node}; its rooms are gone
+# bus -> its own node, never on the wire
+HUB_LOST = "hub_lost"    # {}: cut off from the cluster, claims fail for now
+HUB_BACK = "hub_back"    # {}: reconnected, the registry forgot our rooms
+
+# ------------------ node <-> node (the msg of a RELAY) ------------------
+
+# to the room's owner
+MEMBER_JOIN = "member_join"     # {room, node, player}
+MEMBER_LEAVE = "member_leave"   # {room, node, player}
+START = "start"                 # {room, node, player}
+ANSWER = "answer"               # {room, node, player, qid, answer, compensation}
+WATCH = "watch"                 # {room, node}: the node has spectators of the room
+UNWATCH = "unwatch"             # {room, node}: ... and now it has none
+# from the owner to a node with players (or spectators) in the room
+FANOUT = "fanout"               # {room, msg}: same message for every player there
+SPECTATE = "spectate"           # {room, msg}: for the node's spectators only
+RESULT = "result"               # {room, shared, rows}: compact round_result
+TO_PLAYER = "to_player"         # {room, player, msg}
+MOVED = "moved"                 # {room, owner}: the registry names another owner
+
+
+def _line(msg: dict) -> bytes:
+    return json.dumps(msg).encode() + b"\n"
+
+
+class Hub:
+    """Room registry and message relay, one per cluster."""
+
+    def __init__(self):
+        self.owners: Dict[str, str] = {}            # room -> node
+        self.nodes: Dict[str, Callable] = {}        # node -> deliver(msg)
+        self.lock = threading.Lock()
+
+    def attach(self, node: str, deliver: Callable) -> None:
+        with self.lock:
+            old = self.nodes.get(node)
+        if old is not None:
+            # a reconnect: the node gave up what it shared, so do the others
+            self.detach(node, old)
+        with self.lock:
+            self.nodes[node] = deliver
+        print(f"🔗 Node {node} joined the cluster")
+
+    def detach(self, node: str, deliver: Callable) -> None:
+        with self.lock:
+            if self.nodes.get(node) is not deliver:
+                return       # already replaced by a reconnect
+            del self.nodes[node]
+            for room in [r for r, owner in self.owners.items() if owner == node]:
+                del self.owners[room]
+            others = list(self.nodes.values())
+        print(f"💔 Node {node} left the cluster")
+        for deliver in others:
+            deliver({"op": NODE_DOWN, "node": node})
+
+    def claim(self, room: str, node: str, create: bool = True) -> Optional[str]:
+        """Owner of the room; `node` becomes it if there is none and create."""
+        with self.lock:
+            owner = self.owners.get(room)
+            if owner is None and create:
+                owner = self.owners[room] = node
+            return owner
+
+    def release(self, room: str, node: str) -> None:
+        with self.lock:
+            if self.owners.get(room) == node:
+                del self.owners[room]
+
+    def send(self, node: str, msg: dict) -> bool:
+        deliver = self.nodes.get(node)
+        if deliver is None:
+            return False
+        deliver(msg)
+        return True
+
+
+# ------------------ in-process bus ------------------
+
+_local_hubs: Dict[str, Hub] = {}
+
+
+class LocalBus:
+    """Nodes in one interpreter: 'local' or 'local://name' for a separate hub."""
+
+    def __init__(self, address: str = ""):
+        self.hub = _local_hubs.setdefault(address, Hub())
+        self.node = None
+        self.deliver = None
+
+    def connect(self, node: str, deliver: Callable) -> None:
+        self.node, self.deliver = node, deliver
+        self.hub.attach(node, deliver)
+
+    def claim(self, room: str, node: str, create: bool = True,
+              done: Optional[Callable] = None) -> Optional[str]:
+        owner = self.hub.claim(room, node, create)
+        if done is not None:
+            done(owner, None)
+        return owner
+
+    def release(self, room: str, node: str) -> None:
+        self.hub.release(room, node)
+
+    def send(self, node: str, msg: dict) -> None:
+        self.hub.send(node, msg)
+
+    def close(self) -> None:
+        self.hub.detach(self.node, self.deliver)
+
+
+# ------------------ socket bus ------------------
+
+class _Call:
+    """A claim waiting for the hub's reply."""
+    __slots__ = ("event", "owner", "error", "done")
+
+    def __init__(self, done: Optional[Callable]):
+        self.event = threading.Event()
+        self.owner = None
+        self.error = None
+        self.done = done
+
+    def finish(self, owner: Optional[str], error: Optional[Exception] = None) -> None:
+        self.owner, self.error = owner, error
+        self.event.set()
+        if self.done is not None:
+            self.done(owner, error)
+
+
+class SocketBus:
+    """One TCP connection to a `python -m server.cluster` hub, JSON lines."""
+
+    def __init__(self, address: str):
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.sock = None
+        self.node = None
+        self.deliver = None
+        self.up = False          # connected and introduced (HELLO sent)
+        self.closed = False
+        self._lock = threading.Lock()     # guards sock/up/_waiting/_queue
+        self._ready = threading.Condition(self._lock)   # frames queued
+        self._queue = collections.deque()   # frames for the writer thread
+        self._ids = itertools.count(1)
+        self._waiting: Dict[int, _Call] = {}   # claim id -> call
+
+    def connect(self, node: str, deliver: Callable) -> None:
+        self.node, self.deliver = node, deliver
+        self._open()
+        threading.Thread(target=self._run, daemon=True).start()
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def claim(self, room: str, node: str, create: bool = True,
+              done: Optional[Callable] = None) -> Optional[str]:
+        """
+        Owner of the room (see Hub.claim). Waits for the hub's reply, at
+        most CALL_TIMEOUT; with `done` returns None at once and the reply
+        calls done(owner, error) on the bus thread instead. error is a
+        ConnectionError when the hub is out of reach: then the claim fails
+        right away rather than waiting for it (raises, without `done`).
+        """
+        call_id = next(self._ids)
+        call = _Call(done)
+        data = _line({"op": CLAIM, "id": call_id, "room": room, "node": node, "create": create})
+        with self._lock:
+            sent = self._enqueue(data)
+            if sent:
+                self._waiting[call_id] = call
+        if not sent:
+            call.finish(None, ConnectionError("cluster hub unreachable"))
+        if done is not None:
+            return None
+        if not call.event.wait(CALL_TIMEOUT):
+            with self._lock:
+                self._waiting.pop(call_id, None)
+            raise ConnectionError("cluster hub did not answer")
+        if call.error is not None:
+            raise call.error
+        return call.owner
+
+    def release(self, room: str, node: str) -> None:
+        self._write({"op": RELEASE, "room": room, "node": node})
+
+    def send(self, node: str, msg: dict) -> None:
+        self._write({"op": RELAY, "to": node, "msg": msg})
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._ready.notify()
+        if self.sock is not None:
+            self.sock.close()
+
+    def _write(self, msg: dict) -> None:
+        """Dropped while the hub is away: the node gave up what it shared."""
+        data = _line(msg)
+        with self._lock:
+            self._enqueue(data)
+
+    def _enqueue(self, data: bytes) -> bool:
+        # with self._lock held. Callers (the event loop, the room scheduler)
+        # never wait on the socket, the writer thread sends
+        if not self.up:
+            return False
+        if len(self._queue) >= BUS_QUEUE_MAX:
+            # the hub stopped reading: drop it, the reader reconnects
+            print("⚠️ Cluster hub not keeping up, dropping the connection")
+            self.up = False
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return False
+        self._queue.append(data)
+        self._ready.notify()
+        return True
+
+    def _writer(self) -> None:
+        while True:
+            with self._ready:
+                while not self._queue:
+                    if self.closed:
+                        return
+                    self._ready.wait()
+                # everything queued in one sendall, to the connection it was queued for
+                sock, data = self.sock, b"".join(self._queue)
+                self._queue.clear()
+            try:
+                sock.sendall(data)
+            except OSError:
+                pass     # the reader notices the hub is gone
+
+    def _sendall(self, data: bytes) -> bool:
+        try:
+            self.sock.sendall(data)
+            return True
+        except OSError:
+            return False     # the reader notices the hub is gone
+
+    def _open(self) -> None:
+        sock = socket.create_connection(self.address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self.sock = sock
+            self.up = self._sendall(_line({"op": HELLO, "node": self.node}))
+
+    def _run(self) -> None:
+        delay = 0.5
+        while not self.closed:
+            self._read()
+            if self.closed:
+                return
+            self._lost()
+            while not self.closed:
+                time.sleep(delay)
+                try:
+                    self._open()
+                except OSError:
+                    delay = min(2 * delay, RECONNECT_MAX)
+                    continue
+                delay = 0.5
+                print("🛰 Reconnected to the cluster hub")
+                self.deliver({"op": HUB_BACK})
+                break
+
+    def _read(self) -> None:
+        reader = FrameReader()
+        try:
+            while reader.recv(self.sock):
+                for payload in reader.frames():
+                    msg = json.loads(payload)
+                    if msg["op"] == REPLY:
+                        with self._lock:
+                            call = self._waiting.pop(msg["id"], None)
+                        if call is not None:
+                            call.finish(msg["owner"])
+                    else:
+                        self.deliver(msg)
+        except (OSError, ValueError):
+            pass
+
+    def _lost(self) -> None:
+        with self._lock:
+            self.up = False
+            self._queue.clear()
+            calls, self._waiting = list(self._waiting.values()), {}
+            self.sock.close()
+        print("⚠️ Lost the cluster hub, reconnecting")
+        for call in calls:
+            call.finish(None, ConnectionError("lost the cluster hub"))
+        self.deliver({"op": HUB_LOST})
+
+
+BUSES = {"local": LocalBus, "tcp": SocketBus}
+
+
+def open_bus(url: str):
+    """'local', 'local://name' or 'tcp://host:port'"""
+    kind, _, address = url.partition("://")
+    return BUSES[kind](address)
+
+
+# ------------------ hub process ------------------
+
+def _hub_connection(hub: Hub, sock: socket.socket) -> None:
+    lock = threading.Lock()
+
+    def deliver(msg: dict) -> None:
+        data = _line(msg)
+        try:
+            with lock:
+                sock.sendall(data)
+        except OSError:
+            pass     # that node's own reader notices and detaches it
+
+    reader = FrameReader()
+    node = None
+    try:
+        while reader.recv(sock):
+            for payload in reader.frames():
+                msg = json.loads(payload)
+                op = msg["op"]
+                if op == RELAY:
+                    hub.send(msg["to"], msg["msg"])
+                elif op == CLAIM:
+                    owner = hub.claim(msg["room"], msg["node"], msg["create"])
+                    deliver({"op": REPLY, "id": msg["id"], "owner": owner})
+                elif op == RELEASE:
+                    hub.release(msg["room"], msg["node"])
+                elif op == HELLO:
+                    node = msg["node"]
+                    hub.attach(node, deliver)
+    except (OSError, ValueError) as e:
+        print("Hub connection error:", e)
+    finally:
+        if node is not None:
+            hub.detach(node, deliver)
+        sock.close()
+
+
+def serve_hub(host: str = "0.0.0.0", port: int = 5600) -> None:
+    hub = Hub()
+    server = socket.create_server((host, port))
+    print(f"🛰 Cluster hub listening on {host}:{port}")
+    while True:
+        sock, _ = server.accept()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=_hub_connection, args=(hub, sock), daemon=True).start()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else 5600
+    try:
+        serve_hub(port=port)
+    except KeyboardInterrupt:
+        pass
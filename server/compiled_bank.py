@@ -0,0 +1,189 @@
+# compiled_bank.py
+#
+# Compiled question bank: questions.json turned into one binary file that is
+# mmap'ed read-only and indexed in place. Nothing is parsed at startup, and
+# every process (workers, rooms) reading the same file shares its pages in
+# the OS page cache instead of holding its own copy.
+#
+#   python -m server.compiled_bank server/questions.json [server/questions.qbank]
+#   python -m server.server --questions server/questions.qbank
+#
+# Layout (little endian):
+#   header    magic "QBNK", version, record size, count, choice refs,
+#             offsets of the sections below
+#   meta      JSON: game config + category / difficulty tables
+#   records   one fixed-size record per question (string refs + codes)
+#   choices   (offset, length) string refs, a contiguous run per question
+#   strings   UTF-8 string table, every distinct string stored once
+#
+# The compiler writes a temp file and renames it over the target, so a
+# running server keeps its old mapping intact and hot-reloads the new one.
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from server.question_bank import Question, QuestionIndex, Stamp
+
+COMPILED_SUFFIX = ".qbank"
+MAGIC = b"QBNK"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIQQQQ")
+# qid, text, answer as (offset, length) | first choice ref, choice count,
+# category code, difficulty code
+RECORD = struct.Struct("<7I3H2x")
+REF = struct.Struct("<II")
+
+
+# ------------------ compiler ------------------
+
+def compile_bank(src: str, dst: Optional[str] = None) -> str:
+    """Compile a questions JSON file; returns the output path."""
+    if dst is None:
+        dst = os.path.splitext(src)[0] + COMPILED_SUFFIX
+
+    with open(src, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.pop("questions")
+
+    strings = bytearray()
+    refs: Dict[str, tuple] = {}
+
+    def ref(s: str) -> tuple:
+        r = refs.get(s)
+        if r is None:
+            b = s.encode("utf-8")
+            r = refs[s] = (len(strings), len(b))
+            strings.extend(b)
+        return r
+
+    categories: List = [None]
+    difficulties: List = [None]
+    cat_code = {None: 0}
+    diff_code = {None: 0}
+    records = bytearray()
+    choices = bytearray()
+    choice_count = 0
+
+    for item in items:
+        cat, diff = item.get("category"), item.get("difficulty")
+        if cat not in cat_code:
+            cat_code[cat] = len(categories)
+            categories.append(cat)
+        if diff not in diff_code:
+            diff_code[diff] = len(difficulties)
+            difficulties.append(diff)
+
+        for c in item["choices"]:
+            choices += REF.pack(*ref(c))
+        records += RECORD.pack(
+            *ref(item["id"]), *ref(item["question"]), *ref(item["answer"]),
+            choice_count, len(item["choices"]),
+            cat_code[cat], diff_code[diff],
+        )
+        choice_count += len(item["choices"])
+
+    meta = json.dumps({
+        "config": data,
+        "categories": categories,
+        "difficulties": difficulties,
+    }).encode()
+
+    meta_off = HEADER.size
+    records_off = meta_off + len(meta)
+    choices_off = records_off + len(records)
+    strings_off = choices_off + len(choices)
+    header = HEADER.pack(MAGIC, VERSION, RECORD.size, len(items), choice_count,
+                         meta_off, records_off, choices_off, strings_off)
+
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as f:
+        for part in (header, meta, records, choices, strings):
+            f.write(part)
+    os.replace(tmp, dst)
+    return dst
+
+
+# ------------------ reader ------------------
+
+class CompiledIndex(QuestionIndex):
+    """QuestionIndex backed by an mmap'ed .qbank file."""
+
+    def __init__(self, path: str, stamp: Stamp):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, record_size, count, _, meta_off, records_off,
+         choices_off, strings_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path}: not a version {VERSION} question bank")
+
+        meta = json.loads(self._mm[meta_off:records_off])
+        self.path = path
+        self.stamp = stamp
+        self.config = meta["config"]
+        self.categories = meta["categories"]
+        self.difficulties = meta["difficulties"]
+        self._count = count
+        self._records = records_off
+        self._choices = choices_off
+        self._strings = strings_off
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _str(self, off: int, length: int) -> str:
+        start = self._strings + off
+        return str(self._mm[start:start + length], "utf-8")
+
+    def question(self, pos: int) -> Question:
+        if not 0 <= pos < self._count:
+            raise IndexError(pos)
+        (qid_off, qid_len, text_off, text_len, ans_off, ans_len,
+         first, n, cat, diff) = RECORD.unpack_from(self._mm, self._records + pos * RECORD.size)
+        choices = [
+            self._str(*REF.unpack_from(self._mm, self._choices + i * REF.size))
+            for i in range(first, first + n)
+        ]
+        return Question(
+            qid=self._str(qid_off, qid_len),
+            text=self._str(text_off, text_len),
+            choices=choices,
+            answer=self._str(ans_off, ans_len),
+            category=self.categories[cat],
+            difficulty=self.difficulties[diff],
+        )
+
+    def select(self, category: Optional[str] = None,
+               difficulty: Optional[int] = None) -> Sequence[int]:
+        if category is None and difficulty is None:
+            return range(self._count)
+
+        cat = self.categories.index(category) if category in self.categories else -1
+        diff = self.difficulties.index(difficulty) if difficulty in self.difficulties else -1
+        end = self._records + self._count * RECORD.size
+        positions = array("L")
+        for i, rec in enumerate(RECORD.iter_unpack(memoryview(self._mm)[self._records:end])):
+            if (category is None or rec[8] == cat) and (difficulty is None or rec[9] == diff):
+                positions.append(i)
+        return positions
+
+    def save(self) -> None:
+        pass    # the compiled file is its own index
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: python -m server.compiled_bank questions.json [out.qbank]")
+        sys.exit(2)
+    dst = compile_bank(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    index = CompiledIndex(dst, (0, 0))
+    print(f"📦 {len(index)} questions → {dst} ({os.path.getsize(dst)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
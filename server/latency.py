@@ -0,0 +1,120 @@
+# latency.py
+#
+# Optional per-client round-trip time estimation. Every ping_interval the
+# server sends one ping to every connected client (one id per tick, so the
+# frame is encoded once per wire encoding) and times the pong. A client's
+# RTT is the smallest of its last few samples: queueing and a bot that is
+# busy thinking only ever add delay, the minimum is the path itself.
+#
+# The round clock starts when the question is queued and stops when the
+# answer is read, so a client's measured answer time includes one full
+# round trip; submit_answer() subtracts compensation(out), capped so a
+# client delaying its pongs can gain at most MAX_COMPENSATION.
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from server import metrics
+import protocol_message as P
+
+RTT_WINDOW = 5            # samples per client, estimate = min of these
+MAX_COMPENSATION = 0.5    # seconds an answer time can be reduced by
+PENDING_PINGS = 8         # ticks whose pongs are still accepted
+STATS_SAMPLES = 4096      # recent samples kept for the percentiles
+
+
+class RttEstimator:
+    """Per-connection RTT samples (lives on the Outbox)."""
+
+    __slots__ = ("samples",)
+
+    def __init__(self):
+        self.samples = deque(maxlen=RTT_WINDOW)
+
+    def add(self, rtt: float) -> None:
+        self.samples.append(rtt)
+
+    @property
+    def rtt(self) -> Optional[float]:
+        return min(self.samples) if self.samples else None
+
+
+class RttStats:
+    """Distribution of recent RTT samples from every client, for the stats line."""
+
+    def __init__(self, keep: int = STATS_SAMPLES):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=keep)
+        self.count = 0            # all samples ever recorded
+
+    def record(self, rtt: float) -> None:
+        with self.lock:
+            self.samples.append(rtt)
+            self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        """count, p50/p90/p99/max in milliseconds over the recent samples"""
+        with self.lock:
+            data = sorted(self.samples)
+            count = self.count
+        if not data:
+            return {"count": count}
+        pick = lambda q: round(data[min(len(data) - 1, int(q * len(data)))] * 1000, 2)
+        return {
+            "count": count,
+            "p50_ms": pick(0.50),
+            "p90_ms": pick(0.90),
+            "p99_ms": pick(0.99),
+            "max_ms": round(data[-1] * 1000, 2),
+        }
+
+
+stats = RttStats()
+
+
+def compensation(out) -> float:
+    """Seconds to take off this client's answer time (0 until it has ponged)."""
+    rtt = out.rtt.rtt
+    if rtt is None:
+        return 0.0
+    return min(rtt, MAX_COMPENSATION)
+
+
+class Pinger:
+    """Pings every member of every room on the rooms' scheduler."""
+
+    def __init__(self, rooms, interval: float):
+        self.rooms = rooms            # RoomManager
+        self.interval = interval
+        self.sent: Dict[int, float] = {}   # ping id -> perf_counter() when queued
+        self.next_id = 0
+        self.reported = 0             # stats.count at the last stats line
+
+    def start(self) -> "Pinger":
+        self.rooms.scheduler.call_later(self.interval, self._tick)
+        return self
+
+    def _tick(self) -> None:
+        self.rooms.scheduler.call_later(self.interval, self._tick)
+
+        ping_id = self.next_id
+        self.next_id += 1
+        self.sent[ping_id] = time.perf_counter()
+        self.sent.pop(ping_id - PENDING_PINGS, None)
+        clients = self.rooms.broadcast_all(P.ping(ping_id))
+
+        if stats.count != self.reported:
+            self.reported = stats.count
+            s = stats.summary()
+            print(f"📶 RTT ms p50 {s['p50_ms']} p90 {s['p90_ms']} "
+                  f"p99 {s['p99_ms']} max {s['max_ms']} ({clients} clients)")
+
+    def pong(self, out, ping_id) -> None:
+        sent = self.sent.get(ping_id)
+        if sent is None:
+            return                    # unknown or too old
+        rtt = time.perf_counter() - sent
+        out.rtt.add(rtt)
+        stats.record(rtt)
+        metrics.client_rtt.observe(rtt)
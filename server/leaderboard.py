@@ -0,0 +1,150 @@
+# leaderboard.py
+import bisect
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# sort key, one int: higher score first, then more wins, then whoever joined
+# first. (-score, -wins, seq) packed so that ints compare like the tuple would
+# (wins and seq stay below 2**32), which is much cheaper than comparing tuples.
+Key = int
+_SEQ = 1 << 32
+_MASK = _SEQ - 1
+
+LOAD = 512            # keys per chunk; a chunk is split in two at 2 * LOAD
+RESORT_FRACTION = 8   # update_many re-sorts once when > 1/8 of the board changed
+
+
+class LeaderboardIndex:
+    """
+    Ranked view of the scoreboard, kept sorted incrementally.
+
+    Keys live in a list of sorted chunks (the layout sortedcontainers uses),
+    so moving one player costs a bisect over the chunk maxima plus an insert
+    into one chunk of at most 2 * LOAD keys, not a shift of the whole board.
+    When a round changes a large part of the board, update_many re-sorts it
+    in one go instead (two sorted runs, timsort merges them in about linear
+    time). Ordering matches the old get_leaderboard(): (score, wins)
+    descending, ties by join order.
+    """
+
+    def __init__(self):
+        self._chunks: List[List[Key]] = []      # each sorted, all ascending
+        self._maxes: List[Key] = []             # last key of every chunk
+        self._offsets: Optional[List[int]] = None   # keys before each chunk, rebuilt lazily
+        self._len = 0
+        self._key_of: Dict[str, Key] = {}
+        self._names: List[str] = []             # by seq (join order)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, player: str) -> bool:
+        return player in self._key_of
+
+    def _seq(self, player: str) -> int:
+        self._names.append(player)
+        return len(self._names) - 1
+
+    def update(self, player: str, score: int, wins: int) -> None:
+        """Insert a player or move it to its new position."""
+        old = self._key_of.get(player)
+        seq = self._seq(player) if old is None else old & _MASK
+        key = (-score * _SEQ - wins) * _SEQ + seq
+        if key != old:
+            self._move(player, key)
+
+    def update_many(self, rows: Iterable[Tuple[str, int, int]]) -> None:
+        """update() for (player, score, wins) rows, re-sorting once if many moved."""
+        key_of = self._key_of
+        moved = []
+        stale = set()
+        for player, score, wins in rows:
+            old = key_of.get(player)
+            seq = self._seq(player) if old is None else old & _MASK
+            key = (-score * _SEQ - wins) * _SEQ + seq
+            if key != old:
+                moved.append((player, key))
+                stale.add(old)
+        if len(moved) * RESORT_FRACTION <= self._len:
+            for player, key in moved:
+                self._move(player, key)
+            return
+
+        key_of.update(moved)
+        # the unchanged keys are one sorted run, the moved ones another:
+        # timsort merges the two in about linear time
+        keys = [key for chunk in self._chunks for key in chunk if key not in stale]
+        keys.extend(sorted(key for _, key in moved))
+        keys.sort()
+        self._chunks = [keys[i:i + LOAD] for i in range(0, len(keys), LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._offsets = None
+        self._len = len(keys)
+
+    def rank(self, player: str) -> Optional[int]:
+        """1-based rank, None for unknown players"""
+        key = self._key_of.get(player)
+        if key is None:
+            return None
+        if self._offsets is None:
+            self._offsets = list(accumulate((len(c) for c in self._chunks), initial=0))
+        i = bisect.bisect_left(self._maxes, key)
+        return self._offsets[i] + bisect.bisect_left(self._chunks[i], key) + 1
+
+    def top(self, k: Optional[int] = None) -> List[str]:
+        names = self._names
+        top: List[str] = []
+        for chunk in self._chunks:
+            if k is not None and len(top) + len(chunk) >= k:
+                top.extend(names[key & _MASK] for key in chunk[:k - len(top)])
+                break
+            top.extend(names[key & _MASK] for key in chunk)
+        return top
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._maxes.clear()
+        self._offsets = None
+        self._len = 0
+        self._key_of.clear()
+        self._names.clear()
+
+    # ---------- chunks ----------
+
+    def _move(self, player: str, key: Key) -> None:
+        old = self._key_of.get(player)
+        if old is not None:
+            self._remove(old)
+        self._insert(key)
+        self._key_of[player] = key
+
+    def _insert(self, key: Key) -> None:
+        self._offsets = None
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            return
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            bisect.insort(self._chunks[i], key)
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * LOAD:
+            self._chunks[i:i + 1] = [chunk[:LOAD], chunk[LOAD:]]
+            self._maxes[i:i + 1] = [chunk[LOAD - 1], chunk[-1]]
+
+    def _remove(self, key: Key) -> None:
+        self._offsets = None
+        self._len -= 1
+        i = bisect.bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect.bisect_left(chunk, key)]
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
@@ -0,0 +1,242 @@
+# metrics.py
+#
+# Counters and histograms for the server hot paths, served in the
+# Prometheus text format over a small HTTP endpoint:
+#
+#   python -m server.server --metrics-port 9100
+#   curl localhost:9100/metrics
+#
+# With --workers every process has its own registry and serves it on
+# metrics_port + worker index.
+#
+# Also the per-message log. By default every received message and every
+# connect/disconnect is printed as before; --log-sample 0.01 prints one
+# JSON line per 100 events instead, --log-sample 0 turns it off.
+import bisect
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+import protocol_message as P
+
+# seconds; fine at the low end, where answers and broadcasts live
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+RTT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+REGISTRY: List = []
+
+
+class Counter:
+    """Monotonic count, optionally split by one label."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[Optional[str], float] = {} if label else {None: 0}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, n: float = 1, label: Optional[str] = None) -> None:
+        with self.lock:
+            self.values[label] = self.values.get(label, 0) + n
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            values = sorted(self.values.items(), key=lambda kv: kv[0] or "")
+        for label, value in values:
+            if self.label is None:
+                lines.append(f"{self.name} {value:g}")
+            else:
+                lines.append(f'{self.name}{{{self.label}="{label}"}} {value:g}')
+        return lines
+
+
+class ThreadCounter(Counter):
+    """
+    Counter for per-frame hot paths: every thread adds to its own cell, no
+    lock and no contention; render() sums the cells. Cells of threads that
+    ended are folded into one total now and then. No label.
+    """
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._local = threading.local()
+        self._cells: List[tuple] = []     # (thread, [count])
+        self._fold_at = 64
+
+    def inc(self, n: float = 1, label: Optional[str] = None) -> None:
+        try:
+            self._local.cell[0] += n
+        except AttributeError:
+            cell = self._local.cell = [n]
+            with self.lock:
+                self._cells.append((threading.current_thread(), cell))
+                if len(self._cells) >= self._fold_at:
+                    self._fold()
+                    self._fold_at = max(64, 2 * len(self._cells))
+
+    def _fold(self) -> None:
+        # a finished thread's cell doesn't change any more
+        live = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                live.append((thread, cell))
+            else:
+                self.values[None] += cell[0]
+        self._cells = live
+
+    def render(self) -> List[str]:
+        with self.lock:
+            self._fold()
+            total = self.values[None] + sum(cell[0] for _, cell in self._cells)
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {total:g}"]
+
+
+class Gauge(Counter):
+    """Current value (inc with a negative n to go down)."""
+
+    kind = "gauge"
+
+
+class Histogram:
+    """Cumulative buckets + sum + count, like a Prometheus client histogram."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)    # last one is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        running = 0
+        for bound, count in zip(self.bounds + ["+Inf"], counts):
+            running += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {running}')
+        lines.append(f"{self.name}_sum {total:g}")
+        lines.append(f"{self.name}_count {running}")
+        return lines
+
+
+# ------------------ the server's metrics ------------------
+
+connections = Counter("quiz_connections_total", "Client connections accepted")
+connections_open = Gauge("quiz_connections_open", "Client connections currently open")
+spectators = Gauge("quiz_spectators", "Spectator connections currently watching a room")
+dropped = Counter("quiz_dropped_clients_total", "Clients disconnected for not keeping up")
+messages_in = Counter("quiz_messages_in_total", "Frames received from clients", "type")
+messages_out = ThreadCounter("quiz_messages_out_total", "Frames queued to clients")
+bytes_in = Counter("quiz_bytes_in_total", "Bytes received from clients")
+bytes_out = ThreadCounter("quiz_bytes_out_total", "Bytes queued to clients")
+rounds = Counter("quiz_rounds_total", "Rounds closed")
+answer_ack = Histogram("quiz_answer_ack_seconds", "Answer handled -> answer_ack queued")
+broadcast = Histogram("quiz_broadcast_seconds", "Encode and queue one room broadcast")
+round_close = Histogram("quiz_round_close_seconds", "Score a round and fan out its result")
+client_rtt = Histogram("quiz_client_rtt_seconds", "Ping -> pong round trip", RTT_BUCKETS)
+persist_batch = Histogram("quiz_persist_batch_seconds", "Write one batch of rounds to the score store")
+persist_dropped = Counter("quiz_persist_dropped_total", "Rounds not persisted, write-behind queue full")
+cluster_out = Counter("quiz_cluster_messages_out_total", "Messages sent to other cluster nodes", "op")
+cluster_in = Counter("quiz_cluster_messages_in_total", "Messages received over the cluster bus", "op")
+rejected = Counter("quiz_rejected_connections_total", "Connections refused right after accept", "reason")
+evicted = Counter("quiz_evicted_clients_total", "Connections closed for breaking a limit", "reason")
+rate_limited = Counter("quiz_rate_limited_total", "Answers refused by the per-client rate limit")
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------ HTTP endpoint ------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass   # scrapes are not news
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread."""
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return httpd
+
+
+# ------------------ logging ------------------
+
+_sample_every: Optional[int] = None     # None = print everything (legacy), 0 = off
+_seen = itertools.count()
+
+
+def configure_log(sample: Optional[float]) -> None:
+    """sample: None prints every event as text, else the JSON-line rate (0..1)."""
+    global _sample_every
+    if sample is None:
+        _sample_every = None
+    else:
+        _sample_every = round(1 / sample) if sample > 0 else 0
+
+
+def _sampled() -> bool:
+    return bool(_sample_every) and next(_seen) % _sample_every == 0
+
+
+def _emit(event: str, **fields) -> None:
+    print(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}))
+
+
+def log_message(player: str, msg: dict) -> None:
+    if msg["type"] == P.PONG:
+        return
+    if _sample_every is None:
+        print(f"[{player}] {msg}")
+    elif _sampled():
+        _emit("message", player=player, msg=msg)
+
+
+def log(event: str, text: str, **fields) -> None:
+    """Per-client event: `text` in legacy mode, else a sampled JSON line."""
+    if _sample_every is None:
+        print(text)
+    elif _sampled():
+        _emit(event, **fields)
+
+
+def log_connection(addr, event: str) -> None:
+    """event: connected | disconnected | handed off"""
+    mark = "+" if event == "connected" else "-"
+    log(event, f"[{mark}] {addr} {event}", addr=str(addr))
@@ -0,0 +1,200 @@
+# outbox.py
+#
+# Per-client bounded send queues. broadcast() only enqueues bytes; every
+# client has its own writer draining the queue, so one slow or stalled TCP
+# receiver can't delay the frame for anyone else.
+import asyncio
+import queue
+import socket
+import threading
+
+from server import metrics
+from server.latency import RttEstimator
+
+SEND_QUEUE_MAX = 64      # frames waiting per client before it counts as lagging
+LAG_POLICY = "drop"      # drop -> disconnect a lagging client
+                         # lag  -> keep it, skip frames until its queue drains
+DETACH_TIMEOUT = 2.0     # seconds to flush queued frames before a handoff
+
+_CLOSE = None            # sentinel that stops a writer
+_DETACH = object()       # sentinel: flush what's queued, then stop (socket stays open)
+
+
+class Outbox:
+    """Threaded engine: one writer thread per client socket."""
+
+    def __init__(self, sock, name: str, max_pending: int = SEND_QUEUE_MAX,
+                 policy: str = LAG_POLICY, binary: bool = False):
+        self.sock = sock
+        self.name = name
+        self.binary = binary      # wire encoding negotiated in the hello line
+        self.policy = policy
+        self.queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.lagging = False
+        self.skipped = 0
+        self.closed = False       # no new frames accepted
+        self.room = None          # set by RoomManager.join
+        self.watching = None      # room a spectator follows (RoomManager.watch), never with .room
+        self.rtt = RttEstimator()  # filled by pongs when pinging is on
+        self.session = None       # resume token (sessions.Sessions)
+        self.bucket = None        # answer rate limit state (admission.RateLimit)
+        self._stop = False        # writer drops whatever is still queued
+        self.detached = False     # socket handed to another worker, never shut it down
+        self._flushed = threading.Event()
+
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def put(self, data: bytes) -> bool:
+        """Enqueue a frame without blocking. False if the client was dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(data)
+            metrics.messages_out.inc()
+            metrics.bytes_out.inc(len(data))
+            return True
+        except queue.Full:
+            return self._on_full()
+
+    def close(self) -> None:
+        if self._stop or self.detached:
+            return
+        self.closed = True
+        self._stop = True
+        try:
+            self.queue.put_nowait(_CLOSE)
+        except queue.Full:
+            pass
+        # wake the reader blocked in recv() on the same socket
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def detach(self) -> None:
+        """Send everything already queued, then stop without closing the socket."""
+        if self.closed:
+            return
+        self.closed = True
+        self.detached = True
+        try:
+            self.queue.put(_DETACH, timeout=DETACH_TIMEOUT)
+        except queue.Full:
+            pass
+        self._flushed.wait(DETACH_TIMEOUT)
+
+    def _on_full(self) -> bool:
+        if self.policy == "lag":
+            if not self.lagging:
+                print(f"🐢 {self.name} is lagging, skipping frames")
+            self.lagging = True
+            self.skipped += 1
+            return True
+
+        print(f"🐢 {self.name} too slow — dropping")
+        metrics.dropped.inc()
+        self.close()
+        return False
+
+    def _writer(self) -> None:
+        while True:
+            data = self.queue.get()
+            if data is _DETACH:
+                self._flushed.set()
+                return
+            if data is _CLOSE or self._stop:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.close()
+                return
+            if self.lagging and self.queue.empty():
+                self.lagging = False
+
+
+class AsyncOutbox:
+    """asyncio engine: one writer task per client transport."""
+
+    def __init__(self, transport, name: str, max_pending: int = SEND_QUEUE_MAX,
+                 policy: str = LAG_POLICY, binary: bool = False):
+        self.transport = transport
+        self.name = name
+        self.binary = binary      # wire encoding negotiated in the hello line
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.writable = asyncio.Event()   # cleared while the transport is paused
+        self.writable.set()
+        self.lagging = False
+        self.skipped = 0
+        self.closed = False
+        self.room = None          # set by RoomManager.join
+        self.watching = None      # room a spectator follows (RoomManager.watch), never with .room
+        self.rtt = RttEstimator()  # filled by pongs when pinging is on
+        self.session = None       # resume token (sessions.Sessions)
+        self.bucket = None        # answer rate limit state (admission.RateLimit)
+        self._flushed = asyncio.get_running_loop().create_future()
+
+        self.task = asyncio.get_running_loop().create_task(self._drain())
+
+    def put(self, data: bytes) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(data)
+            metrics.messages_out.inc()
+            metrics.bytes_out.inc(len(data))
+            return True
+        except asyncio.QueueFull:
+            return self._on_full()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.task.cancel()
+        self.transport.close()
+
+    async def detach(self) -> None:
+        """Send everything already queued, then stop without closing the socket."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await asyncio.wait_for(self.queue.put(_DETACH), DETACH_TIMEOUT)
+            await asyncio.wait_for(asyncio.shield(self._flushed), DETACH_TIMEOUT)
+            # bytes handed to the transport but not yet in the kernel
+            while self.transport.get_write_buffer_size():
+                await asyncio.sleep(0.01)
+        except asyncio.TimeoutError:
+            pass
+        self.task.cancel()
+
+    def _on_full(self) -> bool:
+        if self.policy == "lag":
+            if not self.lagging:
+                print(f"🐢 {self.name} is lagging, skipping frames")
+            self.lagging = True
+            self.skipped += 1
+            return True
+
+        print(f"🐢 {self.name} too slow — dropping")
+        metrics.dropped.inc()
+        self.close()
+        return False
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                data = await self.queue.get()
+                if data is _DETACH:
+                    self._flushed.set_result(None)
+                    return
+                await self.writable.wait()
+                self.transport.write(data)
+                if self.lagging and self.queue.empty():
+                    self.lagging = False
+        except asyncio.CancelledError:
+            pass
+        except (ConnectionError, OSError):
+            self.close()
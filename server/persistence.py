@@ -0,0 +1,202 @@
+# persistence.py
+#
+# All-time scores that survive restarts and empty rooms. Closing a round
+# only puts a small tuple on a write-behind queue; one writer thread per
+# process folds the queued rounds into one transaction per batch and then
+# re-reads the all-time top rows through the (score, wins) index into
+# memory, which is what `top` requests are answered from. Nothing on the
+# round-close or message path touches the database.
+#
+#   python -m server.server --db scores.db
+#   python -m server.persistence scores.db [k]      # print the all-time top k
+#
+# Backends are pluggable: anything with open() / write(batch) / top(k) /
+# close() in BACKENDS. SQLite is the default (and only) one here; every
+# worker process opens the same file, WAL mode lets them write in turn.
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from server import metrics
+
+BATCH_MAX = 256          # rounds per transaction
+FLUSH_EVERY = 0.5        # seconds a closed round may wait for its batch
+PENDING_MAX = 10000      # queued rounds before new ones are dropped
+TOP_CACHE = 100          # all-time rows kept in memory for `top`
+
+# (room, qid, closed_at, winner, [(player, points, correct), ...])
+RoundRecord = Tuple[str, str, float, Optional[str], List[Tuple[str, int, bool]]]
+
+
+class SQLiteStore:
+    """SQLite backend. Only ever used from the writer thread."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS players (
+        name      TEXT PRIMARY KEY,
+        score     INTEGER NOT NULL DEFAULT 0,
+        wins      INTEGER NOT NULL DEFAULT 0,
+        answers   INTEGER NOT NULL DEFAULT 0,
+        correct   INTEGER NOT NULL DEFAULT 0,
+        last_seen REAL
+    );
+    CREATE INDEX IF NOT EXISTS players_rank ON players (score DESC, wins DESC);
+    CREATE TABLE IF NOT EXISTS rounds (
+        id        INTEGER PRIMARY KEY,
+        room      TEXT NOT NULL,
+        qid       TEXT NOT NULL,
+        closed_at REAL NOT NULL,
+        winner    TEXT,
+        answers   INTEGER NOT NULL
+    );
+    """
+
+    UPSERT = """
+    INSERT INTO players (name, score, wins, answers, correct, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        score = score + excluded.score,
+        wins = wins + excluded.wins,
+        answers = answers + excluded.answers,
+        correct = correct + excluded.correct,
+        last_seen = excluded.last_seen
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def write(self, batch: List[RoundRecord]) -> None:
+        # fold the batch per player first: one upsert per player, not per answer
+        totals: Dict[str, list] = {}
+        for _, _, closed_at, winner, rows in batch:
+            for player, points, correct in rows:
+                t = totals.get(player)
+                if t is None:
+                    t = totals[player] = [0, 0, 0, 0, closed_at]
+                t[0] += points
+                t[1] += player == winner
+                t[2] += 1
+                t[3] += bool(correct)
+                t[4] = closed_at
+
+        with self.db:   # one transaction
+            self.db.executemany(
+                "INSERT INTO rounds (room, qid, closed_at, winner, answers) VALUES (?, ?, ?, ?, ?)",
+                [(room, qid, closed_at, winner, len(rows))
+                 for room, qid, closed_at, winner, rows in batch],
+            )
+            self.db.executemany(self.UPSERT, [(p, *t) for p, t in totals.items()])
+
+    def top(self, k: int) -> List[Dict]:
+        cur = self.db.execute(
+            "SELECT name, score, wins, answers, correct FROM players"
+            " ORDER BY score DESC, wins DESC LIMIT ?", (k,))
+        return [
+            {"player": name, "score": score, "wins": wins,
+             "answers": answers, "correct": correct}
+            for name, score, wins, answers, correct in cur
+        ]
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+BACKENDS = {"sqlite": SQLiteStore}
+
+
+class Scores:
+    """Write-behind front of a backend: record() never blocks, top() never reads disk."""
+
+    def __init__(self, store):
+        self.store = store
+        self.top_rows: List[Dict] = []     # replaced whole by the writer
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_writer(self) -> queue.Queue:
+        # started lazily, and again in a forked worker (threads don't survive fork)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=PENDING_MAX)
+                    threading.Thread(target=self._writer, args=(self._queue,),
+                                     daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def record(self, room: str, result: dict) -> None:
+        """Queue a closed round's round_result (from end_round_and_score)."""
+        rows = [(d["player"], d["points"], d["correct"]) for d in result.get("details", ())]
+        try:
+            self._ensure_writer().put_nowait(
+                (room, result["qid"], time.time(), result.get("winner"), rows))
+        except queue.Full:
+            self.dropped += 1
+            metrics.persist_dropped.inc()
+
+    def top(self, k: int) -> List[Dict]:
+        self._ensure_writer()
+        return self.top_rows[:k]
+
+    def flush(self) -> None:
+        """Block until everything queued so far is written (tools, shutdown)."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def _writer(self, q: queue.Queue) -> None:
+        self.store.open()
+        self.top_rows = self.store.top(TOP_CACHE)
+        while True:
+            try:
+                batch = [q.get(timeout=FLUSH_EVERY)]
+            except queue.Empty:
+                # idle: pick up what other workers wrote
+                self.top_rows = self.store.top(TOP_CACHE)
+                continue
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            t0 = time.perf_counter()
+            try:
+                self.store.write(batch)
+                self.top_rows = self.store.top(TOP_CACHE)
+            except sqlite3.Error as e:
+                print("⚠️ score persistence failed:", e)
+            metrics.persist_batch.observe(time.perf_counter() - t0)
+            for _ in batch:
+                q.task_done()
+
+
+def open_scores(url: str) -> Scores:
+    """'scores.db' or 'sqlite:scores.db'; the writer starts on first use"""
+    kind, sep, path = url.partition(":")
+    if not sep or kind not in BACKENDS:
+        kind, path = "sqlite", url
+    return Scores(BACKENDS[kind](path))
+
+
+if __name__ == "__main__":
+    store = SQLiteStore(sys.argv[1])
+    store.open()
+    for i, row in enumerate(store.top(int(sys.argv[2]) if len(sys.argv) > 2 else 10), 1):
+        print(f"{i:3}. {row['player']:20} {row['score']:8} pts  {row['wins']} wins"
+              f"  {row['correct']}/{row['answers']} correct")
+    store.close()
@@ -0,0 +1,296 @@
+# question_bank.py
+#
+# Read-only question store shared by every room in the process. The JSON
+# file is scanned once into an index (byte offset/length, category and
+# difficulty per question) that is saved next to it as <file>.idx and reused
+# while the file is unchanged. Question bodies are only read from disk when a
+# round starts. Editing the file is picked up between rounds (hot reload).
+# A .qbank file (see compiled_bank.py) is mmap'ed and used as its own index.
+import json
+import os
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+RELOAD_CHECK = 1.0       # seconds between stat() checks of the question file
+INDEX_SUFFIX = ".idx"    # sidecar file holding the index
+INDEX_VERSION = 1
+BODY_CACHE = 1024        # parsed question bodies kept in memory (all rooms)
+
+Stamp = Tuple[int, int]  # (mtime_ns, size) of the indexed file
+
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+@dataclass
+class Question:
+    qid: str
+    text: str
+    choices: List[str]
+    answer: str
+    category: Optional[str] = None
+    difficulty: Optional[int] = None
+
+
+class QuestionIndex:
+    """
+    One immutable snapshot of the question file: game config plus where
+    every question lives in it. Categories and difficulties are stored as
+    small codes into per-index tables, so 500k questions fit in a few MB.
+    """
+
+    def __init__(self, path: str, stamp: Stamp, config: Dict,
+                 offsets: array, lengths: array,
+                 categories: List, category_codes: array,
+                 difficulties: List, difficulty_codes: array):
+        self.path = path
+        self.stamp = stamp
+        self.config = config              # every top-level key except "questions"
+        self.offsets = offsets
+        self.lengths = lengths
+        self.categories = categories      # code -> value, code 0 is None
+        self.category_codes = category_codes
+        self.difficulties = difficulties
+        self.difficulty_codes = difficulty_codes
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def select(self, category: Optional[str] = None,
+               difficulty: Optional[int] = None) -> Sequence[int]:
+        """Positions of the questions matching the filters, in file order."""
+        if category is None and difficulty is None:
+            return range(len(self))
+
+        cat = self.categories.index(category) if category in self.categories else -1
+        diff = self.difficulties.index(difficulty) if difficulty in self.difficulties else -1
+        return [
+            i for i in range(len(self))
+            if (category is None or self.category_codes[i] == cat)
+            and (difficulty is None or self.difficulty_codes[i] == diff)
+        ]
+
+    def question(self, pos: int) -> Question:
+        return _read_question(self.path, self.stamp, self.offsets[pos], self.lengths[pos])
+
+    # ---------- sidecar file ----------
+
+    def save(self) -> None:
+        data = {
+            "version": INDEX_VERSION,
+            "stamp": list(self.stamp),
+            "config": self.config,
+            "offsets": self.offsets.tolist(),
+            "lengths": self.lengths.tolist(),
+            "categories": self.categories,
+            "category_codes": self.category_codes.tolist(),
+            "difficulties": self.difficulties,
+            "difficulty_codes": self.difficulty_codes.tolist(),
+        }
+        tmp = self.path + INDEX_SUFFIX + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path + INDEX_SUFFIX)
+
+    @classmethod
+    def load(cls, path: str, stamp: Stamp) -> Optional["QuestionIndex"]:
+        """Saved index for this exact file version, or None."""
+        try:
+            with open(path + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or tuple(data.get("stamp", ())) != stamp:
+            return None
+        return cls(
+            path, stamp, data["config"],
+            array("q", data["offsets"]), array("L", data["lengths"]),
+            data["categories"], array("H", data["category_codes"]),
+            data["difficulties"], array("H", data["difficulty_codes"]),
+        )
+
+    @classmethod
+    def build(cls, path: str, stamp: Stamp) -> "QuestionIndex":
+        """
+        Scan the file once. Questions are decoded one at a time just to
+        record their position, so the whole list never exists as objects.
+        """
+        with open(path, "rb") as f:
+            raw = f.read()
+        text = raw.decode("utf-8")
+        del raw
+        ascii_only = text.isascii()
+
+        # char position -> byte offset, advanced monotonically
+        cursor = [0, 0]
+
+        def byte_at(pos: int) -> int:
+            if ascii_only:
+                return pos
+            cursor[1] += len(text[cursor[0]:pos].encode("utf-8"))
+            cursor[0] = pos
+            return cursor[1]
+
+        decoder = json.JSONDecoder()
+        config: Dict = {}
+        offsets, lengths = array("q"), array("L")
+        categories, category_codes = [None], array("H")
+        difficulties, difficulty_codes = [None], array("H")
+        cat_code = {None: 0}
+        diff_code = {None: 0}
+
+        def skip(pos: int, expect: str = "") -> int:
+            pos = _WS.match(text, pos).end()
+            if expect:
+                if text[pos:pos + 1] != expect:
+                    raise ValueError(f"{path}: expected {expect!r} at char {pos}")
+                pos = _WS.match(text, pos + 1).end()
+            return pos
+
+        pos = skip(0, "{")
+        while text[pos:pos + 1] != "}":
+            key, pos = decoder.raw_decode(text, pos)
+            pos = skip(pos, ":")
+
+            if key == "questions":
+                pos = skip(pos, "[")
+                while text[pos:pos + 1] != "]":
+                    item, end = decoder.raw_decode(text, pos)
+                    start_byte = byte_at(pos)
+                    offsets.append(start_byte)
+                    lengths.append(byte_at(end) - start_byte)
+
+                    cat = item.get("category")
+                    if cat not in cat_code:
+                        cat_code[cat] = len(categories)
+                        categories.append(cat)
+                    category_codes.append(cat_code[cat])
+
+                    diff = item.get("difficulty")
+                    if diff not in diff_code:
+                        diff_code[diff] = len(difficulties)
+                        difficulties.append(diff)
+                    difficulty_codes.append(diff_code[diff])
+
+                    pos = skip(end)
+                    if text[pos:pos + 1] == ",":
+                        pos = skip(pos + 1)
+                pos += 1
+            else:
+                config[key], pos = decoder.raw_decode(text, pos)
+
+            pos = skip(pos)
+            if text[pos:pos + 1] == ",":
+                pos = skip(pos + 1)
+
+        return cls(path, stamp, config, offsets, lengths,
+                   categories, category_codes, difficulties, difficulty_codes)
+
+
+@lru_cache(maxsize=BODY_CACHE)
+def _read_question(path: str, stamp: Stamp, offset: int, length: int) -> Question:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        item = json.loads(f.read(length))
+    return Question(
+        qid=item["id"],
+        text=item["question"],
+        choices=item["choices"],
+        answer=item["answer"],
+        category=item.get("category"),
+        difficulty=item.get("difficulty"),
+    )
+
+
+def _stamp(path: str) -> Stamp:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _open_index(path: str) -> QuestionIndex:
+    stamp = _stamp(path)
+    if path.endswith(COMPILED_SUFFIX):
+        return CompiledIndex(path, stamp)
+
+    index = QuestionIndex.load(path, stamp)
+    if index is None:
+        index = QuestionIndex.build(path, stamp)
+        try:
+            index.save()
+        except OSError:
+            pass    # read-only directory: just rebuild next start
+    return index
+
+
+class QuestionBank:
+    """
+    The current QuestionIndex of one file. Games keep a reference to the
+    snapshot they started a round with, so swapping in a reloaded index
+    never affects a round in progress.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index = _open_index(path)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> QuestionIndex:
+        """Current index, re-read first if the file changed on disk."""
+        now = time.monotonic()
+        if not force and now - self._checked < RELOAD_CHECK:
+            return self.index
+
+        with self._lock:
+            self._checked = now
+            try:
+                if _stamp(self.path) != self.index.stamp:
+                    index = _open_index(self.path)
+                    if not len(index):
+                        # nothing to ask: games (and question() below) need one
+                        raise ValueError("no questions in it")
+                    self.index = index
+                    print(f"🔁 Reloaded {self.path}: {len(self.index)} questions")
+            except (OSError, ValueError) as e:
+                # e.g. caught mid-save by an editor: keep serving the old one
+                print(f"⚠️ Question bank reload failed, keeping old one: {e}")
+        return self.index
+
+    def question(self, index: QuestionIndex, pos: int) -> Optional[Question]:
+        """
+        Body of question `pos` of `index`, re-indexing once if the file moved
+        under it. None if the file has no readable question left.
+        """
+        try:
+            return index.question(pos)
+        except (OSError, ValueError, KeyError):
+            index = self.refresh(force=True)
+        if not len(index):
+            return None
+        try:
+            return index.question(min(pos, len(index) - 1))
+        except (OSError, ValueError, KeyError) as e:
+            # changed on disk into something we can't index (the old index kept)
+            print(f"⚠️ No readable question in {self.path}: {e}")
+            return None
+
+
+_banks: Dict[str, QuestionBank] = {}
+_banks_lock = threading.Lock()
+
+
+def open_bank(path: str) -> QuestionBank:
+    """Shared bank for a file: every room of the process uses the same one."""
+    key = os.path.abspath(path)
+    with _banks_lock:
+        bank = _banks.get(key)
+        if bank is None:
+            bank = _banks[key] = QuestionBank(path)
+        return bank
+
+
+from server.compiled_bank import COMPILED_SUFFIX, CompiledIndex  # noqa: E402
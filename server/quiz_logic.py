@@ -1,126 +1,181 @@
 # quiz_logic.py
-import json
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
 
-
-@dataclass
-class Question:
-    qid: str
-    text: str
-    choices: List[str]
-    answer: str
+from server.answer_store import ANSWER_HISTORY, AnswerIntake, PlayerTable, RoundAnswers, Scoreboard
+from server.leaderboard import LeaderboardIndex
+from server.question_bank import Question, QuestionIndex, open_bank
+from server.scoring import score_round
 
 
 class QuizGame:
-    def __init__(self, questions_path: str = "server/questions.json"):
+    def __init__(self, questions_path: str = "server/questions.json",
+                 category: Optional[str] = None, difficulty: Optional[int] = None):
         self.round_players: set[str] = set()
         self.questions_path = questions_path
+        self.category = category          # only play questions of this category
+        self.difficulty = difficulty      # ... and/or this difficulty
 
         # Config (loaded from JSON)
         self.title = "Quiz"
         self.time_limit_sec = 10
         self.base_score = 100
         self.fast_bonus_max = 50
+        self.leaderboard_top_k: Optional[int] = 10     # round_result rows, None = whole board
+        self.answer_history: Optional[int] = ANSWER_HISTORY   # closed rounds kept
 
-        # Question bank
-        self.questions: List[Question] = []
-        self.question_map: Dict[str, Question] = {}
+        # Question bank: shared by every room, bodies read lazily per round
+        self.bank = open_bank(questions_path)
+        self.bank_index: Optional[QuestionIndex] = None
+        self.order: Sequence[int] = ()    # positions in bank_index, in play order
+        self.round_question: Optional[Question] = None
+        self.next_question = None         # (bank_index, q_index, Question) read ahead by peek_question
 
         # Game state
         self.q_index = 0
         self.round_active = False
         self.round_qid: Optional[str] = None
-        self.round_start = 0.0
+        self.round_start = 0.0            # wall clock, only sent to clients
         self.running = False
 
-        # answers[qid][player] = (answer, elapsed)
-        self.answers: Dict[str, Dict[str, Tuple[str, float]]] = {}
+        # players get a small int id; answers and stats are arrays by id
+        self.players = PlayerTable()
+        self.intake: Optional[AnswerIntake] = None    # open round, safe to submit to from any thread
+        self.history: Deque[RoundAnswers] = deque()   # closed rounds, oldest first
+
+        # score / wins / rounds per player id
+        self.scoreboard = Scoreboard()
 
-        # scoreboard[player] = stats
-        self.scoreboard: Dict[str, Dict[str, int]] = {}
+        # sorted by (score, wins), only touched for players that changed
+        self.ranking = LeaderboardIndex()
 
         self.load_questions()
 
     # ---------- loading ----------
 
     def load_questions(self) -> None:
-        with open(self.questions_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        """(Re)apply config and question order from the bank's current index."""
+        index = self.bank.refresh()
+        data = index.config
 
         self.title = data.get("title", self.title)
         self.time_limit_sec = int(data.get("time_limit_sec", self.time_limit_sec))
         self.base_score = int(data.get("base_score", self.base_score))
         self.fast_bonus_max = int(data.get("fast_bonus_max", self.fast_bonus_max))
+        if "leaderboard_top_k" in data:
+            k = data["leaderboard_top_k"]
+            self.leaderboard_top_k = None if k is None else int(k)
+        if "answer_history" in data:
+            h = data["answer_history"]
+            self.answer_history = None if h is None else int(h)
 
-        self.questions.clear()
-        self.question_map.clear()
+        self.bank_index = index
+        self.order = index.select(self.category, self.difficulty)
 
-        for item in data["questions"]:
-            q = Question(
-                qid=item["id"],
-                text=item["question"],
-                choices=item["choices"],
-                answer=item["answer"],
-            )
-            self.questions.append(q)
-            self.question_map[q.qid] = q
-
-        self.q_index = 0
+    def _sync_bank(self) -> None:
+        # hot reload, only between rounds: a running round keeps its question and config
+        if not self.round_active and self.bank.refresh() is not self.bank_index:
+            self.load_questions()
 
     # ---------- game flow ----------
 
     def has_next_question(self) -> bool:
-        return self.q_index < len(self.questions)
+        self._sync_bank()
+        return self.q_index < len(self.order)
 
-    def start_round(self) -> Dict:
+    def start_round(self, players: Iterable[str] = ()) -> Dict:
+        """
+        players: who this round is for; each gets rounds += 1 when it ends,
+        and all_answered() turns True once every one of them has answered.
+        """
         if not self.has_next_question():
             self.running = False
             return {"type": "game_over"}
 
-        q = self.questions[self.q_index]
+        ahead, self.next_question = self.next_question, None
+        if ahead is not None and ahead[0] is self.bank_index and ahead[1] == self.q_index:
+            q = ahead[2]
+        else:
+            q = self.bank.question(self.bank_index, self.order[self.q_index])
+            if q is None:
+                # the question file went bad under the game: end it
+                self.running = False
+                return {"type": "game_over"}
         self.q_index += 1
 
         self.round_active = True
         self.round_qid = q.qid
+        self.round_question = q
         self.round_start = time.time()
         self.running = True
+        self._register_round_players(players)
+
+        # answer times use the monotonic clock, immune to wall-clock jumps
+        self.intake = AnswerIntake(q.qid, time.perf_counter(), self.time_limit_sec,
+                                   expected=self.round_players, choices=q.choices)
 
-        self.answers[q.qid] = {}
+        return self._question_msg(q, self.round_start)
 
+    def peek_question(self) -> Optional[Dict]:
+        """
+        The next round's question message (server_time 0.0) without starting
+        it, or None if the game is over. Its body is read from the bank now,
+        and start_round reuses it unless the bank was reloaded in between.
+        """
+        if self.round_active or not self.has_next_question():
+            return None
+        q = self.bank.question(self.bank_index, self.order[self.q_index])
+        if q is None:
+            return None     # start_round ends the game
+        self.next_question = (self.bank_index, self.q_index, q)
+        return self._question_msg(q, 0.0)
+
+    def _question_msg(self, q: Question, server_time: float) -> Dict:
         return {
             "type": "question",
             "qid": q.qid,
             "question": q.text,
             "choices": q.choices,
             "time_limit_sec": self.time_limit_sec,
-            "server_time": self.round_start,
+            "server_time": server_time,
         }
 
-    def submit_answer(self, player: str, qid: str, answer: str) -> Dict:
-        if not self.round_active or qid != self.round_qid:
+    def submit_answer(self, player: str, qid: str, answer: str,
+                      compensation: float = 0.0) -> Dict:
+        """
+        Thread-safe without the room lock: only touches the round's
+        AnswerIntake, players and scores are updated when the round closes.
+        compensation: seconds of network round trip to take off the answer
+        time (latency.compensation()), so bonus, lateness and the winner
+        compare thinking time rather than distance to the server.
+        """
+        intake = self.intake
+        if intake is None or qid != intake.qid:
             return {
                 "type": "answer_ack",
                 "ok": False,
                 "reason": "round_not_active",
             }
 
-        elapsed = time.time() - self.round_start
-        late = elapsed > self.time_limit_sec
-
-        # prevent double answers
-        if player in self.answers[qid]:
+        if not isinstance(answer, str):
             return {
                 "type": "answer_ack",
                 "ok": False,
-                "reason": "already_answered",
+                "reason": "invalid_answer",
             }
 
-        # ALWAYS record the answer (even if late)
-        self.answers[qid][player] = (answer, elapsed, late)
+        elapsed = max(0.0, time.perf_counter() - intake.start - compensation)
+        late = elapsed > intake.time_limit
 
-        self._ensure_player(player)
+        # ALWAYS record the answer (even if late), once per player
+        reason = intake.submit(player, answer, elapsed, late)
+        if reason is not None:
+            return {
+                "type": "answer_ack",
+                "ok": False,
+                "reason": reason,
+            }
 
         return {
             "type": "answer_ack",
@@ -130,37 +185,62 @@ class QuizGame:
         }
 
 
-    def end_round_and_score(self) -> Dict:
+    def all_answered(self, qid: str) -> bool:
+        """True once every round player has an answer in for round `qid`."""
+        intake = self.intake
+        return intake is not None and intake.qid == qid and intake.complete
+
+    def has_answered(self, qid: str, player: str) -> bool:
+        """True if `player` has an answer in for the open round `qid`."""
+        intake = self.intake
+        return intake is not None and intake.qid == qid and intake.has_answered(player)
+
+    def tally(self) -> Optional[Tuple[str, int, int]]:
+        """(qid, answers in so far, round players) of the open round, None between rounds."""
+        intake = self.intake
+        if intake is None:
+            return None
+        return intake.qid, intake.count(), len(intake.expected)
+
+    def end_round_and_score(self, top_k: Optional[int] = None, ranks: bool = True) -> Dict:
+        """
+        top_k: leaderboard rows to build, if fewer than leaderboard_top_k.
+        ranks: put every player's rank on its details row; a caller that
+        only sends some rows (compact results) ranks those itself (get_rank).
+        """
         if not self.round_active or not self.round_qid:
             return {"type": "round_result", "ok": False}
 
         qid = self.round_qid
-        q = self.question_map.get(qid)
+        q = self.round_question
         correct = q.answer if q else ""
-
-        # --- determine correct (on-time) players ---
-        correct_players: list[tuple[str, float]] = []
-
-        for player, (ans, elapsed, late) in self.answers[qid].items():
-            if not late and self._normalize(ans) == self._normalize(correct):
-                correct_players.append((player, elapsed))
-
-        # fastest correct wins
-        correct_players.sort(key=lambda x: x[1])
-        winner = correct_players[0][0] if correct_players else None
+        names = self.players.names
+        board = self.scoreboard
+
+        # --- stop the intake, answers already carry their choice codes ---
+        intake = self.intake
+        answers = RoundAnswers(qid, intake.texts, intake.choice_of)
+        answers.extend(intake.close(), self._ensure_player)
+        self.intake = None
+
+        # --- correctness, bonus, points and winner for all answers at once ---
+        scores = score_round(
+            answers, answers.choice_code(correct), self.time_limit_sec,
+            self.base_score, self.fast_bonus_max,
+        )
+        winner = names[answers.player[scores.winner]] if scores.winner is not None else None
 
         # --- build details & score ---
         details = []
+        changed: set[str] = set()
 
-        for player, (ans, elapsed, late) in self.answers[qid].items():
-            is_correct = self._normalize(ans) == self._normalize(correct)
-            scored = is_correct and not late
-
-            bonus = self._speed_bonus(elapsed) if scored else 0
-            points = (self.base_score + bonus) if scored else 0
+        for i, (pid, ans, elapsed, late) in enumerate(answers.rows()):
+            player = names[pid]
+            points = scores.points[i]
 
-            if scored:
-                self.scoreboard[player]["score"] += points
+            if points:
+                board.score[pid] += points
+                changed.add(player)
 
             details.append(
                 {
@@ -168,24 +248,42 @@ class QuizGame:
                     "answer": ans,
                     "time_sec": round(elapsed, 3),
                     "late": late,
-                    "correct": is_correct,
+                    "correct": scores.correct[i],
                     "points": points,
-                    "bonus": bonus,
+                    "bonus": scores.bonus[i],
                 }
             )
 
         # winner gets win
         if winner:
-            self.scoreboard[winner]["wins"] += 1
+            board.wins[self.players.get(winner)] += 1
+            changed.add(winner)
+
+        ids = self.players.get
+        self.ranking.update_many((p, board.score[ids(p)], board.wins[ids(p)]) for p in changed)
+
+        if ranks:
+            for row in details:
+                row["rank"] = self.ranking.rank(row["player"])
 
         # count round participation for ALL players
         self._finalize_round_participation()
 
-        # close round
+        # close round, keep its answers compactly for a while
+        answers.close()
+        self.history.append(answers)
+        if self.answer_history is not None:
+            while len(self.history) > self.answer_history:
+                self.history.popleft()
+
         self.round_active = False
         self.round_qid = None
+        self.round_question = None
         self.round_start = 0.0
 
+        k = self.leaderboard_top_k
+        if top_k is not None and (k is None or top_k < k):
+            k = top_k
         return {
             "type": "round_result",
             "ok": True,
@@ -193,25 +291,46 @@ class QuizGame:
             "correct_answer": correct,
             "winner": winner,
             "details": details,
-            "leaderboard": self.get_leaderboard(),
+            "leaderboard": self.get_leaderboard(k),
+            "players": len(self.ranking),
         }
 
 
     # ---------- leaderboard ----------
 
-    def get_leaderboard(self) -> List[Dict]:
-        board = [
-            {
-                "player": p,
-                "score": s["score"],
-                "wins": s["wins"],
-                "rounds": s["rounds"],
-            }
-            for p, s in self.scoreboard.items()
-        ]
-        board.sort(key=lambda x: (x["score"], x["wins"]), reverse=True)
+    def get_leaderboard(self, k: Optional[int] = None) -> List[Dict]:
+        """Top-k rows (whole board when k is None), best first."""
+        scores = self.scoreboard
+        board = []
+        for p in self.ranking.top(k):
+            pid = self.players.get(p)
+            board.append(
+                {
+                    "player": p,
+                    "score": scores.score[pid],
+                    "wins": scores.wins[pid],
+                    "rounds": scores.rounds[pid],
+                }
+            )
         return board
 
+    def standings(self, k: int) -> List[Dict]:
+        """
+        Top-k rows for spectators: player, score, wins, rank. No "rounds",
+        it changes for every player every round and would defeat the deltas.
+        """
+        scores = self.scoreboard
+        rows = []
+        for rank, p in enumerate(self.ranking.top(k), 1):
+            pid = self.players.get(p)
+            rows.append({"player": p, "score": scores.score[pid],
+                         "wins": scores.wins[pid], "rank": rank})
+        return rows
+
+    def get_rank(self, player: str) -> Optional[int]:
+        """1-based rank of a player, None if they never played."""
+        return self.ranking.rank(player)
+
 
     # ---------- helpers ----------
 
@@ -220,25 +339,29 @@ class QuizGame:
         self.q_index = 0
         self.round_active = False
         self.round_qid = None
+        self.round_question = None
+        self.next_question = None
         self.round_start = 0.0
-        self.answers.clear()
+        self.intake = None
+        self.history.clear()
+        self.players.clear()
         self.scoreboard.clear()
+        self.ranking.clear()
         self.round_players.clear()   # 👈 NEW
         self.running = False
 
 
-    def _ensure_player(self, player: str) -> None:
-        if player not in self.scoreboard:
-            self.scoreboard[player] = {
-                "score": 0,
-                "wins": 0,
-                "rounds": 0,
-            }
+    def _ensure_player(self, player: str) -> int:
+        """Player id, adding a zeroed scoreboard row on first sight."""
+        if player not in self.players:
+            self.scoreboard.ensure(self.players.id(player))
+            self.ranking.update(player, 0, 0)
+        return self.players.get(player)
 
 
-    def _register_round_players(self, players: list[str]) -> None:
+    def _register_round_players(self, players: Iterable[str]) -> None:
         """
-        Call once at the start of a round.
+        Called by start_round().
         Every player here will get rounds += 1 when the round ends.
         """
         self.round_players = set(players)
@@ -252,20 +375,6 @@ class QuizGame:
         Counts the round for ALL players, even if they answered late or not at all.
         """
         for p in self.round_players:
-            self.scoreboard[p]["rounds"] += 1
+            self.scoreboard.rounds[self.players.get(p)] += 1
 
         self.round_players.clear()
-
-
-    def _speed_bonus(self, elapsed: float) -> int:
-        if elapsed <= 0:
-            return self.fast_bonus_max
-        if elapsed >= self.time_limit_sec:
-            return 0
-        return int(round(self.fast_bonus_max * (1 - elapsed / self.time_limit_sec)))
-
-
-    @staticmethod
-    def _normalize(s: str) -> str:
-        return (s or "").strip().lower()
-
@@ -0,0 +1,1085 @@
+# rooms.py
+#
+# Many independent quiz games in one server process. Each Room owns its own
+# QuizGame, members and lock; round timers for every room run on one shared
+# scheduler. Engine-agnostic: members are Outbox/AsyncOutbox objects and the
+# scheduler is either Scheduler (threads) or LoopScheduler (asyncio).
+#
+# In cluster mode (cluster.py) a room lives on the node that owns it in the
+# shared registry; other nodes hold a RemoteRoom with only their own players.
+#
+# Spectators (RoomManager.watch) follow a room without playing: they get its
+# questions and game_over, and instead of round_results a tally of answers
+# and leaderboard deltas, both at most once per spectate_interval.
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from server import admission, cluster, latency, metrics, persistence, sessions, workers
+from server.quiz_logic import QuizGame
+import protocol_message as P
+
+DEFAULT_ROOM = "main"
+
+
+class Handoff(Exception):
+    """
+    Raised when a client asks for a room owned by another worker process.
+    The engine detaches the socket and passes it on with (action, room).
+    """
+
+    def __init__(self, action: str, room_id: str):
+        super().__init__(f"{action} {room_id}")
+        self.action = action     # enter | join | create
+        self.room_id = room_id
+
+
+@dataclass
+class RoomSettings:
+    questions_path: str = "server/questions.json"
+    test_mode: bool = False
+    result_mode: str = "auto"      # full | compact | auto
+    full_result_max: int = 20      # auto: rooms up to this size get full details
+    compact_top_k: int = 10        # leaderboard rows in a compact round_result
+    ping_interval: float = 0.0     # seconds between RTT pings, 0 = off
+    db_path: Optional[str] = None  # all-time scores (persistence.open_scores), None = off
+    cluster: Optional[str] = None  # bus url (cluster.open_bus), None = single node
+    node_id: Optional[str] = None  # this node's name in the cluster, default random
+    resume_grace: float = sessions.RESUME_GRACE   # seconds a dropped player keeps its seat
+    answer_rate: float = admission.ANSWER_RATE    # answers/sec per client, 0 = unlimited
+    spectate_interval: float = 1.0   # seconds between spectator updates (tally, board)
+    spectate_top_k: int = 20         # leaderboard rows spectators follow
+
+    @property
+    def result_wait(self) -> float:
+        # bot-only test runs don't need a pause for humans to read the result
+        return 0.05 if self.test_mode else 3
+
+
+def send(out, msg: dict) -> None:
+    out.put(P.encode(msg, out.binary))
+
+
+def _fanout(members, msg: dict, frames: Optional[dict] = None) -> dict:
+    # serialize once per wire encoding, same bytes for everyone using it;
+    # `frames` may bring some of them already encoded
+    frames = {} if frames is None else dict(frames)
+    for out in members:
+        frame = frames.get(out.binary)
+        if frame is None:
+            frame = frames[out.binary] = P.encode(msg, out.binary)
+        out.put(frame)
+    return frames
+
+
+def _personalized(members, shared: dict, row_for) -> None:
+    # shared part encoded once per wire encoding, only the "you" row differs
+    frames = {}
+    for out in members:
+        frame = frames.get(out.binary)
+        if frame is None:
+            frame = frames[out.binary] = P.encode(shared, out.binary)
+        out.put(P.personalize(frame, "you", row_for(out.name), out.binary))
+
+
+class Room:
+    def __init__(self, room_id: str, settings: RoomSettings, scheduler, scores=None,
+                 relay=None):
+        self.id = room_id
+        self.settings = settings
+        self.scheduler = scheduler
+        self.scores = scores      # persistence.Scores, None if not persisting
+        self.relay = relay        # relay(node, msg) to other cluster nodes
+        self.game = QuizGame(settings.questions_path)
+        self.members = set()      # Outbox objects (have .name)
+        self.peers: Dict[str, set] = {}   # cluster node -> names of its players here
+        self.lock = threading.Lock()
+        self.started = False
+        self.epoch = 0            # bumped on reset, stale timers check it
+        self.close_timer = None   # deadline of the open round
+        self.question = None      # open round's question message, for resumed players
+        self.deadline = 0.0       # its deadline (time.monotonic())
+        self.prepared = None      # (message, {binary: stamp}) of the next question
+        self.spectators = set()   # Outboxes watching here, never round players
+        self.watchers = set()     # cluster nodes with spectators of this room
+        self.view = []            # top rows as spectators last got them
+        self.last = None          # latest closed round, for the next BOARD
+        self.tallied = None       # (qid, answers) of the last TALLY
+        self.spectate_timer = None
+
+    # ---------- membership ----------
+
+    def _size(self) -> int:
+        return len(self.members) + sum(len(names) for names in self.peers.values())
+
+    def _names(self):
+        yield from (out.name for out in self.members)
+        for names in self.peers.values():
+            yield from names
+
+    def add(self, out) -> int:
+        with self.lock:
+            self.members.add(out)
+            return self._size()
+
+    def remove(self, out) -> bool:
+        """True if the room is now empty"""
+        with self.lock:
+            self.members.discard(out)
+            return not self._size()
+
+    def replace(self, old, out) -> int:
+        """A resumed player's new connection takes the old one's seat."""
+        with self.lock:
+            self.members.discard(old)
+            self.members.add(out)
+            return self._size()
+
+    def add_remote(self, node: str, name: str) -> int:
+        with self.lock:
+            self.peers.setdefault(node, set()).add(name)
+            return self._size()
+
+    def remove_remote(self, node: str, name: str) -> bool:
+        """True if the room is now empty"""
+        with self.lock:
+            names = self.peers.get(node)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.peers[node]
+            return not self._size()
+
+    def drop_node(self, node: str) -> bool:
+        """Forget every player of a node that left the cluster; True if now empty"""
+        with self.lock:
+            self.peers.pop(node, None)
+            self.watchers.discard(node)
+            return not self._size()
+
+    def close(self) -> None:
+        with self.lock:
+            print(f"🔄 [{self.id}] All players left — resetting game")
+            self.epoch += 1
+            self.question = None
+            self.prepared = None
+            self.last = None
+            if self.spectate_timer is not None:
+                self.spectate_timer.cancel()
+                self.spectate_timer = None
+            self.game.reset()
+            # spectators staying for the next game drop the old board too
+            gone = [row["player"] for row in self.view]
+            self.view = []
+            self.tallied = None
+            self.started = False
+            spectators = list(self.spectators)
+            watchers = list(self.watchers)
+            msg = P.board([], gone, self._size())
+        if gone:
+            _fanout(spectators, msg)
+            for node in watchers:
+                self.relay(node, {"op": cluster.SPECTATE, "room": self.id, "msg": msg})
+
+    # ---------- spectators ----------
+
+    def watched(self) -> bool:
+        return bool(self.spectators or self.watchers)
+
+    def watch(self, out):
+        """Add a spectator: (players, current view) for its watching message."""
+        with self.lock:
+            self.spectators.add(out)
+            return self._size(), list(self.view)
+
+    def unwatch(self, out) -> bool:
+        """True if nobody plays or watches here any more"""
+        with self.lock:
+            self.spectators.discard(out)
+            return not self._size() and not self.watched()
+
+    def add_watcher(self, node: str) -> None:
+        # the node's first spectator: bring its copy of the view up to date
+        with self.lock:
+            self.watchers.add(node)
+            msg = P.board(list(self.view), [], self._size())
+        self.relay(node, {"op": cluster.SPECTATE, "room": self.id, "msg": msg})
+
+    def remove_watcher(self, node: str) -> bool:
+        """True if nobody plays or watches here any more"""
+        with self.lock:
+            self.watchers.discard(node)
+            return not self._size() and not self.watched()
+
+    def _spectate_soon(self) -> None:
+        # with self.lock held. One timer per watched room: updates coalesce
+        # to one per spectate_interval, however fast answers and rounds go
+        if self.spectate_timer is None and self.watched():
+            self.spectate_timer = self.scheduler.call_later(
+                self.settings.spectate_interval, self._spectate, self.epoch)
+
+    def _spectate(self, epoch: int) -> None:
+        msgs = []
+        with self.lock:
+            if epoch != self.epoch:
+                return
+            self.spectate_timer = None
+            tally = self.game.tally()
+            if tally is not None and tally[:2] != self.tallied:
+                self.tallied = tally[:2]
+                msgs.append(P.tally(*tally))
+            if self.last is not None:
+                msgs.append(self._board_delta())
+            if tally is not None:
+                self._spectate_soon()     # keep counting while the round is open
+            spectators = list(self.spectators)
+            watchers = list(self.watchers)
+
+        for msg in msgs:
+            _fanout(spectators, msg)
+            for node in watchers:
+                self.relay(node, {"op": cluster.SPECTATE, "room": self.id, "msg": msg})
+
+    def _board_delta(self) -> dict:
+        # with self.lock held: only rows that moved or changed since the last BOARD
+        rows = self.game.standings(self.settings.spectate_top_k)
+        before = {row["player"]: row for row in self.view}
+        changed = [row for row in rows if before.pop(row["player"], None) != row]
+        self.view = rows
+        last, self.last = self.last, None
+        return P.board(changed, list(before), self._size(), last)
+
+    # ---------- fan-out ----------
+
+    def broadcast(self, msg: dict, frames: Optional[dict] = None,
+                  spectators: bool = False) -> None:
+        t0 = time.perf_counter()
+        with self.lock:
+            members = list(self.members)
+            peers = list(self.peers)
+            watchers = ()
+            if spectators:
+                members.extend(self.spectators)
+                watchers = [node for node in self.watchers if node not in self.peers]
+        _fanout(members, msg, frames)
+        # other nodes get it once each and fan out to their own players
+        for node in peers:
+            self.relay(node, {"op": cluster.FANOUT, "room": self.id, "msg": msg})
+        for node in watchers:
+            self.relay(node, {"op": cluster.SPECTATE, "room": self.id, "msg": msg})
+        metrics.broadcast.observe(time.perf_counter() - t0)
+
+    def _compact(self) -> bool:
+        # with self.lock held: does this round's result go out compact?
+        s = self.settings
+        return s.result_mode == "compact" or (
+            s.result_mode == "auto" and self._size() > s.full_result_max
+        )
+
+    def broadcast_round_result(self, result: dict, compact: bool) -> None:
+        """
+        full:    everyone gets every player's detail row (legacy)
+        compact: shared summary encoded once + only the player's own row
+        (result comes from end_round_and_score(..., ranks=not compact))
+        """
+        t0 = time.perf_counter()
+        with self.lock:
+            members = list(self.members)
+            peers = {node: list(names) for node, names in self.peers.items()}
+
+        if not compact:
+            _fanout(members, result)
+            for node in peers:
+                self.relay(node, {"op": cluster.FANOUT, "room": self.id, "msg": result})
+            metrics.broadcast.observe(time.perf_counter() - t0)
+            return
+
+        shared, rows = P.split_round_result(result)
+
+        def row_for(name):
+            # only rows that are sent get a rank
+            row = rows.get(name)
+            if row is None:
+                return {"player": name, "points": 0, "rank": self.game.get_rank(name)}
+            row["rank"] = self.game.get_rank(name)
+            return row
+
+        _personalized(members, shared, row_for)
+        for node, names in peers.items():
+            self.relay(node, {"op": cluster.RESULT, "room": self.id, "shared": shared,
+                              "rows": {name: row_for(name) for name in names}})
+        metrics.broadcast.observe(time.perf_counter() - t0)
+
+    # ---------- game flow ----------
+
+    def start(self, by: str) -> None:
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+            print(f"🚀 [{self.id}] Game started by {by}")
+
+            if self.game.running:
+                return
+            print(f"▶ [{self.id}] Quiz loop started")
+            self.game.running = True
+            epoch = self.epoch
+
+        self.scheduler.call_soon(self._next_round, epoch)
+
+    def submit_answer(self, out, msg: dict, compensation: float = 0.0) -> None:
+        # no room lock: the game's answer intake has its own
+        send(out, self.game.submit_answer(
+            player=out.name,
+            qid=msg["qid"],
+            answer=msg["answer"],
+            compensation=compensation,
+        ))
+        self._answered(msg["qid"])
+
+    def submit_remote(self, node: str, msg: dict) -> None:
+        """An answer forwarded by the node its player is connected to."""
+        ack = self.game.submit_answer(
+            player=msg["player"],
+            qid=msg["qid"],
+            answer=msg["answer"],
+            compensation=msg["compensation"],
+        )
+        self.relay(node, {"op": cluster.TO_PLAYER, "room": self.id,
+                          "player": msg["player"], "msg": ack})
+        self._answered(msg["qid"])
+
+    def replay(self, out) -> None:
+        """The open question again, for a resumed player: time left, and
+        whether its answer already made it in before the connection dropped."""
+        with self.lock:
+            q, deadline = self.question, self.deadline
+        if q is None:
+            return
+        send(out, dict(q, remaining_sec=round(max(0.0, deadline - time.monotonic()), 3),
+                       answered=self.game.has_answered(q["qid"], out.name)))
+
+    def _answered(self, qid: str) -> None:
+        # last round player in: close now instead of at the deadline
+        # (after the ack, so the result never overtakes it)
+        if self.game.all_answered(qid):
+            self.scheduler.call_soon(self._close_round, self.epoch, qid)
+
+    def _next_round(self, epoch: int) -> None:
+        with self.lock:
+            if epoch != self.epoch:
+                return
+            if not self._size():
+                print(f"⏸ [{self.id}] No players, stopping quiz")
+                self.game.running = False
+                return
+            prepared, self.prepared = self.prepared, None
+            if not self.game.has_next_question():
+                self.game.running = False
+                q = None
+            else:
+                q = self.game.start_round(self._names())
+                if self.settings.test_mode:
+                    q["time_limit_sec"] = 1
+
+                question_wait = 0.5 if self.settings.test_mode else self.game.time_limit_sec
+                self.close_timer = self.scheduler.call_later(
+                    question_wait, self._close_round, epoch, q["qid"])
+                self.question = q
+                self.deadline = time.monotonic() + question_wait
+                self.tallied = None
+                self._spectate_soon()
+
+        if q is None:
+            self.broadcast(P.game_over(), spectators=True)
+            return
+
+        frames = None
+        if prepared is not None and prepared[0] == dict(q, server_time=0.0):
+            # encoded during the result pause: only the clock goes in now
+            frames = {binary: stamp(q["server_time"]) for binary, stamp in prepared[1].items()}
+        self.broadcast(q, frames, spectators=True)
+
+    def _prepare_next(self, epoch: int) -> None:
+        """
+        During the pause after a round_result: read the next question and
+        encode it for every wire encoding in the room, so the next round
+        only stamps server_time into ready frames.
+        """
+        with self.lock:
+            if epoch != self.epoch:
+                return
+            q = self.game.peek_question()
+            encodings = {out.binary for out in self.members}
+            encodings.update(out.binary for out in self.spectators)
+        if q is None:
+            return
+        if self.settings.test_mode:
+            q["time_limit_sec"] = 1
+        stamps = {binary: P.prepare(q, "server_time", binary) for binary in encodings}
+        with self.lock:
+            if epoch == self.epoch:
+                self.prepared = (q, stamps)
+
+    def _close_round(self, epoch: int, qid: str) -> None:
+        # runs from the deadline timer or early once everyone answered,
+        # whichever comes first; the other one finds the round closed
+        t0 = time.perf_counter()
+        with self.lock:
+            if epoch != self.epoch or qid != self.game.round_qid:
+                return
+            self.close_timer.cancel()
+            self.question = None
+            compact = self._compact()
+            result = self.game.end_round_and_score(
+                self.settings.compact_top_k if compact else None, ranks=not compact)
+            self.last = {"qid": result["qid"], "correct_answer": result["correct_answer"],
+                         "winner": result["winner"]}
+            self._spectate_soon()
+
+        workers.count_round()
+        if self.scores is not None:
+            self.scores.record(self.id, result)   # write-behind, no I/O here
+        self.broadcast_round_result(result, compact)
+        metrics.round_close.observe(time.perf_counter() - t0)
+        self.scheduler.call_soon(self._prepare_next, epoch)
+        self.scheduler.call_later(self.settings.result_wait, self._next_round, epoch)
+
+
+class RemoteRoom:
+    """
+    A room owned by another cluster node, as this node sees it: only the
+    players connected here. Game actions go to the owner over the bus; what
+    the owner broadcasts arrives once per node and fans out from here.
+    """
+
+    def __init__(self, room_id: str, owner: str, manager: "RoomManager"):
+        self.id = room_id
+        self.owner = owner        # node running the QuizGame
+        self.manager = manager
+        self.members = set()      # Outbox objects connected to this node
+        self.by_name = {}         # name -> Outbox, for acks and other replies
+        self.lock = threading.Lock()
+        self.question = None      # last question from the owner, for resumed players
+        self.deadline = 0.0
+        self.spectators = set()   # spectators connected to this node
+        self.view: Dict[str, dict] = {}   # player -> row, from the owner's BOARD deltas
+        self.players = None       # head count from the latest BOARD
+
+    def _to_owner(self, op: str, **fields) -> None:
+        self.manager.relay(self.owner, {"op": op, "room": self.id,
+                                        "node": self.manager.node, **fields})
+
+    # ---------- membership ----------
+
+    def add(self, out) -> None:
+        with self.lock:
+            self.members.add(out)
+            self.by_name[out.name] = out
+        # None: the owner knows the head count and sends the room message
+        self._to_owner(cluster.MEMBER_JOIN, player=out.name)
+
+    def remove(self, out) -> bool:
+        """True if no player of this node is left in the room"""
+        with self.lock:
+            self.members.discard(out)
+            if self.by_name.get(out.name) is out:
+                del self.by_name[out.name]
+            empty = not self.members
+        self._to_owner(cluster.MEMBER_LEAVE, player=out.name)
+        return empty
+
+    def replace(self, old, out) -> None:
+        with self.lock:
+            self.members.discard(old)
+            self.members.add(out)
+            self.by_name[out.name] = out
+        # the owner still has the player; it answers with the room message
+        self._to_owner(cluster.MEMBER_JOIN, player=out.name)
+
+    def move(self, owner: str) -> None:
+        """The registry names another owner: introduce our players to it."""
+        with self.lock:
+            self.owner = owner
+            names = list(self.by_name)
+            watched = bool(self.spectators)
+        for name in names:
+            self._to_owner(cluster.MEMBER_JOIN, player=name)
+        if watched:
+            self._to_owner(cluster.WATCH)
+
+    def evacuate(self) -> list:
+        """Everyone here, the room itself is gone (its owner died)."""
+        with self.lock:
+            members = list(self.members) + list(self.spectators)
+            self.members.clear()
+            self.by_name.clear()
+            self.spectators.clear()
+        return members
+
+    # ---------- spectators ----------
+
+    def watched(self) -> bool:
+        return bool(self.spectators)
+
+    def watch(self, out):
+        with self.lock:
+            first = not self.spectators
+            self.spectators.add(out)
+            view = sorted(self.view.values(), key=lambda row: row["rank"])
+            players = self.players
+        if first:
+            # the owner answers with its whole view, which reaches `out` too
+            self._to_owner(cluster.WATCH)
+        return players, view
+
+    def unwatch(self, out) -> bool:
+        """True if no player or spectator of this node is left"""
+        with self.lock:
+            self.spectators.discard(out)
+            last = not self.spectators
+            empty = last and not self.members
+        if last:
+            self._to_owner(cluster.UNWATCH)
+        return empty
+
+    def spectate(self, msg: dict) -> None:
+        """A tally, board delta or question for this node's spectators."""
+        with self.lock:
+            if msg["type"] == P.BOARD:
+                for name in msg["gone"]:
+                    self.view.pop(name, None)
+                for row in msg["rows"]:
+                    self.view[row["player"]] = row
+                self.players = msg["players"]
+            spectators = list(self.spectators)
+        _fanout(spectators, msg)
+
+    def close(self) -> None:
+        pass      # nothing to reset, the game lives on the owner
+
+    # ---------- game flow (forwarded) ----------
+
+    def start(self, by: str) -> None:
+        self._to_owner(cluster.START, player=by)
+
+    def submit_answer(self, out, msg: dict, compensation: float = 0.0) -> None:
+        # RTT is measured here, where the player is connected
+        self._to_owner(cluster.ANSWER, player=out.name, qid=msg["qid"],
+                       answer=msg["answer"], compensation=compensation)
+
+    # ---------- fan-out (from the owner) ----------
+
+    def broadcast(self, msg: dict) -> None:
+        t0 = time.perf_counter()
+        with self.lock:
+            members = list(self.members)
+            if msg["type"] == P.QUESTION:
+                self.question = msg
+                self.deadline = time.monotonic() + msg["time_limit_sec"]
+            else:
+                self.question = None
+            if msg["type"] in (P.QUESTION, P.GAME_OVER):
+                members.extend(self.spectators)
+        _fanout(members, msg)
+        metrics.broadcast.observe(time.perf_counter() - t0)
+
+    def broadcast_result(self, shared: dict, rows: dict) -> None:
+        t0 = time.perf_counter()
+        with self.lock:
+            members = list(self.members)
+            self.question = None
+        _personalized(members, shared,
+                      lambda name: rows.get(name) or {"player": name, "points": 0})
+        metrics.broadcast.observe(time.perf_counter() - t0)
+
+    def replay(self, out) -> None:
+        with self.lock:
+            q, deadline = self.question, self.deadline
+        if q is not None:
+            send(out, dict(q, remaining_sec=round(max(0.0, deadline - time.monotonic()), 3)))
+
+    def to_player(self, name: str, msg: dict) -> None:
+        out = self.by_name.get(name)
+        if out is not None:
+            send(out, msg)
+
+
+class RoomManager:
+    """Rooms keyed by id. The manager lock only guards the rooms dict."""
+
+    def __init__(self, settings: RoomSettings, scheduler, router=None):
+        self.settings = settings
+        self.scheduler = scheduler
+        self.router = router     # workers.Router in multi-process mode
+        self.rooms: Dict[str, Room] = {}    # Room, or RemoteRoom in cluster mode
+        self.lock = threading.Lock()
+        self.scores = None
+        if settings.db_path:
+            self.scores = persistence.open_scores(settings.db_path)
+        self.pinger = None
+        if settings.ping_interval > 0:
+            self.pinger = latency.Pinger(self, settings.ping_interval).start()
+        self.answer_limit = None
+        if settings.answer_rate > 0:
+            self.answer_limit = admission.RateLimit(settings.answer_rate)
+        # with workers, a token hashes to the worker that issued it (like room ids)
+        self.sessions = sessions.Sessions(
+            scheduler, settings.resume_grace, on_expire=self.leave,
+            owns=lambda token: self.router is None or self.router.is_local(token))
+        self.bus = None
+        self.node = None
+        if settings.cluster:
+            self.node = settings.node_id or uuid.uuid4().hex[:8]
+            self.bus = cluster.open_bus(settings.cluster)
+            # bus messages run on the scheduler, like round timers
+            self.bus.connect(self.node, lambda msg: scheduler.call_threadsafe(self.on_cluster, msg))
+            print(f"🛰 Node {self.node} on cluster bus {settings.cluster}")
+
+    def _ensure_local(self, action: str, room_id: str) -> None:
+        if self.router is not None and not self.router.is_local(room_id):
+            raise Handoff(action, room_id)
+
+    def _new_room(self, room_id: str, owner: Optional[str]):
+        if owner != self.node:
+            return RemoteRoom(room_id, owner, self)
+        return Room(room_id, self.settings, self.scheduler, self.scores,
+                    self.relay if self.bus is not None else None)
+
+    def _claim(self, room_id: str, create: bool, then, *args, out=None,
+               missing: str = "no_such_room") -> None:
+        """
+        then(owner, *args) once the registry named the room's owner; if there
+        is none (and not create) `out` gets the error `missing`. A client
+        thread waits for the hub; the event loop and the timer thread don't,
+        the hub's reply resumes the call on the scheduler. If the hub is out
+        of reach `out` gets cluster_unavailable.
+        """
+        if self.bus is None:
+            # no registry: the rooms here are all there is
+            if create:
+                then(self.node, *args)
+            elif out is not None:
+                send(out, P.error(missing))
+            return
+
+        def done(owner, error=None):
+            if error is not None:
+                print(f"⚠️ Claim of room {room_id} failed: {error}")
+                if out is not None:
+                    send(out, P.error("cluster_unavailable"))
+            elif out is not None and getattr(out, "closed", False):
+                pass       # the connection went away meanwhile
+            elif owner is None:
+                if out is not None:
+                    send(out, P.error(missing))
+            else:
+                then(owner, *args)
+
+        if self.scheduler.may_block():
+            try:
+                done(self.bus.claim(room_id, self.node, create))
+            except ConnectionError as e:
+                done(None, e)
+        else:
+            self.bus.claim(room_id, self.node, create,
+                           lambda owner, error: self.scheduler.call_threadsafe(done, owner, error))
+
+    def create(self, room_id: Optional[str] = None, out=None) -> None:
+        """New room, `out` (if any) joins it; error room_exists if the id is taken"""
+        if room_id is None:
+            room_id = self.router.local_room_id() if self.router else uuid.uuid4().hex[:6]
+        self._ensure_local("create", room_id)
+
+        with self.lock:
+            taken = room_id in self.rooms
+        if not taken:
+            self._claim(room_id, True, self._created, room_id, out, out=out)
+        elif out is not None:
+            send(out, P.error("room_exists"))
+
+    def _created(self, owner: str, room_id: str, out) -> None:
+        room = None
+        if owner == self.node:       # else taken on another node
+            with self.lock:
+                if room_id not in self.rooms:
+                    room = self.rooms[room_id] = self._new_room(room_id, self.node)
+        if out is None:
+            return
+        if room is None:
+            send(out, P.error("room_exists"))
+            return
+        print(f"🏠 Room {room.id} created by {out.name}")
+        self.join(out, room.id)
+
+    def join(self, out, room_id: str, create: bool = False) -> None:
+        """Move a client into a room; error no_such_room if it doesn't exist."""
+        current = getattr(out, "room", None)
+        if current is not None and current.id == room_id:
+            return
+        self._ensure_local("enter" if create else "join", room_id)
+
+        with self.lock:
+            exists = room_id in self.rooms
+        # with a bus the shared registry decides, wherever the room lives
+        self._claim(room_id, create or exists, self._enter, out, room_id, out=out)
+
+    def _enter(self, owner: Optional[str], out, room_id: str) -> None:
+        self.leave(out)
+
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self._new_room(room_id, owner)
+                self.rooms[room_id] = room
+            players = room.add(out)
+            out.room = room
+
+        metrics.log("join", f"    {out.name} → room {room_id}", player=out.name, room=room_id)
+        if players is not None:
+            send(out, P.room(room_id, players))
+
+    def leave(self, out) -> None:
+        if getattr(out, "watching", None) is not None:
+            self.unwatch(out)
+        room = getattr(out, "room", None)
+        if room is None:
+            return
+        out.room = None
+
+        with self.lock:
+            if not room.remove(out):
+                return
+            keep = self._keep(room)
+        self._closed(room, keep)
+
+    def watch(self, out, room_id: str, binary: bool) -> None:
+        """
+        A spectator connection (its first line was watch(room)): it gets the
+        room's questions, answer tallies and leaderboard deltas, but never
+        plays and is never a round player. Watching a room that doesn't
+        exist yet creates it, the spectator waits for players to come.
+        """
+        out.binary = binary
+        out.name = "spectator"
+        self._ensure_local("watch", room_id)
+        self._claim(room_id, True, self._watch, out, room_id, out=out)
+
+    def _watch(self, owner: str, out, room_id: str) -> None:
+        binary = out.binary
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = self._new_room(room_id, owner)
+            players, view = room.watch(out)
+            out.watching = room
+        metrics.spectators.inc()
+
+        # always JSON, like a welcome; the chosen encoding starts after it
+        encoding = P.ENCODING_BINARY if binary else P.ENCODING_JSON
+        out.put(P.encode(P.watching(room_id, players, view, encoding)))
+        metrics.log("watch", f"    spectator → room {room_id}", room=room_id)
+
+    def unwatch(self, out) -> None:
+        room = out.watching
+        out.watching = None
+        metrics.spectators.inc(-1)
+        with self.lock:
+            if not room.unwatch(out):
+                return
+            keep = self._keep(room)
+        self._closed(room, keep)
+
+    def _keep(self, room) -> bool:
+        # with self.lock held, the room just lost its last player: a watched
+        # room stays (its spectators wait for the next game), others go
+        if room.watched():
+            return True
+        if self.rooms.get(room.id) is room:
+            del self.rooms[room.id]
+        return False
+
+    def drop(self, out) -> None:
+        """Connection gone: a player with a session keeps its seat for the grace window."""
+        if not self.sessions.park(out):
+            self.leave(out)
+
+    def resume(self, out, token: str, binary: bool) -> bool:
+        """
+        Reattach a reconnecting player (its first line was resume(token)) to
+        its seat: welcome, room and the open question again. On an unknown
+        or expired token the client gets an error and may send a hello line.
+        """
+        out.binary = binary
+        self._ensure_local("resume", token)
+
+        players = None
+        with self.lock:
+            taken = self.sessions.take(token, out)
+            if taken is not None:
+                out.name, old = taken
+                room, old.room = old.room, None
+                if room is not None:
+                    players = room.replace(old, out)
+                    out.room = room
+
+        # always JSON up to and including the welcome
+        if taken is None:
+            out.binary = False
+            out.put(P.encode(P.error("session_expired")))
+            return False
+        encoding = P.ENCODING_BINARY if binary else P.ENCODING_JSON
+        out.put(P.encode(P.welcome(out.name, encoding, session=token, resumed=True)))
+        old.close()     # a half-open connection the client already gave up on
+        metrics.log("resume", f"    {out.name} resumed", player=out.name)
+
+        if out.room is None:
+            self.join(out, DEFAULT_ROOM, create=True)
+            return True
+        if players is not None:
+            send(out, P.room(out.room.id, players))
+        out.room.replay(out)
+        return True
+
+    def _closed(self, room, keep: bool = False) -> None:
+        """keep: the room only resets, it stays registered for its spectators"""
+        room.close()
+        if not keep and self.bus is not None and isinstance(room, Room):
+            self.bus.release(room.id, self.node)
+
+    def broadcast_all(self, msg: dict) -> int:
+        """Send msg to every member of every room; returns how many got it."""
+        with self.lock:
+            rooms = list(self.rooms.values())
+        members = []
+        for room in rooms:
+            with room.lock:
+                members.extend(room.members)
+        _fanout(members, msg)
+        return len(members)
+
+    # ---------- cluster ----------
+
+    def relay(self, node: str, msg: dict) -> None:
+        metrics.cluster_out.inc(label=msg["op"])
+        self.bus.send(node, msg)
+
+    def on_cluster(self, msg: dict) -> None:
+        """A message from the hub or another node; runs on the scheduler."""
+        op = msg["op"]
+        metrics.cluster_in.inc(label=op)
+        if op == cluster.NODE_DOWN:
+            self._node_down(msg["node"])
+            return
+        if op == cluster.HUB_LOST:
+            self._hub_lost()
+            return
+        if op == cluster.HUB_BACK:
+            self._hub_back()
+            return
+        if op in (cluster.MEMBER_JOIN, cluster.WATCH):
+            self._remote_join(msg)
+            return
+
+        with self.lock:
+            room = self.rooms.get(msg["room"])
+
+        # we own the room, a node with players in it reports
+        if isinstance(room, Room):
+            if op == cluster.ANSWER:
+                room.submit_remote(msg["node"], msg)
+            elif op == cluster.START:
+                room.start(msg["player"])
+            elif op == cluster.MEMBER_LEAVE:
+                with self.lock:
+                    if not room.remove_remote(msg["node"], msg["player"]):
+                        return
+                    keep = self._keep(room)
+                self._closed(room, keep)
+            elif op == cluster.UNWATCH:
+                with self.lock:
+                    if not room.remove_watcher(msg["node"]):
+                        return
+                    keep = self._keep(room)
+                self._closed(room, keep)
+
+        # we hold players of a room owned elsewhere, its owner reports
+        elif isinstance(room, RemoteRoom):
+            if op == cluster.FANOUT:
+                room.broadcast(msg["msg"])
+            elif op == cluster.RESULT:
+                room.broadcast_result(msg["shared"], msg["rows"])
+            elif op == cluster.TO_PLAYER:
+                room.to_player(msg["player"], msg["msg"])
+            elif op == cluster.SPECTATE:
+                room.spectate(msg["msg"])
+            elif op == cluster.MOVED:
+                room.move(msg["owner"])
+
+    def _remote_join(self, msg: dict) -> None:
+        """A node reports a player (MEMBER_JOIN) or its first spectator (WATCH)."""
+        with self.lock:
+            room = self.rooms.get(msg["room"])
+        if room is None:
+            # emptied and released here meanwhile: claim it again
+            self._claim(msg["room"], True, self._reclaimed, msg)
+        else:
+            self._add_remote(room, msg)
+
+    def _reclaimed(self, owner: str, msg: dict) -> None:
+        room_id = msg["room"]
+        if owner != self.node:
+            self.relay(msg["node"], {"op": cluster.MOVED, "room": room_id, "owner": owner})
+            return
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = self._new_room(room_id, self.node)
+        self._add_remote(room, msg)
+
+    def _add_remote(self, room, msg: dict) -> None:
+        room_id, node = room.id, msg["node"]
+        if isinstance(room, RemoteRoom):
+            self.relay(node, {"op": cluster.MOVED, "room": room_id, "owner": room.owner})
+            return
+
+        if msg["op"] == cluster.WATCH:
+            room.add_watcher(node)
+            return
+        player = msg["player"]
+        players = room.add_remote(node, player)
+        metrics.log("join", f"    {player}@{node} → room {room_id}", player=player, room=room_id)
+        self.relay(node, {"op": cluster.TO_PLAYER, "room": room_id, "player": player,
+                          "msg": P.room(room_id, players)})
+
+    def _node_down(self, node: str) -> None:
+        with self.lock:
+            rooms = list(self.rooms.values())
+        for room in rooms:
+            if isinstance(room, RemoteRoom):
+                if room.owner != node:
+                    continue
+                # the game died with its node: its players here start over
+                with self.lock:
+                    if self.rooms.get(room.id) is room:
+                        del self.rooms[room.id]
+                self._room_lost(room.evacuate())
+            else:
+                with self.lock:
+                    if not room.drop_node(node):
+                        continue
+                    keep = self._keep(room)
+                self._closed(room, keep)
+
+    def _room_lost(self, outs: list) -> None:
+        """Players of a room that is gone start over in the default room."""
+        for out in outs:
+            send(out, P.error("room_lost"))
+            if out.watching is not None:
+                # a spectator has nothing to play: it reconnects if it wants
+                out.watching = None
+                metrics.spectators.inc(-1)
+                out.close()
+                continue
+            out.room = None
+            self.join(out, DEFAULT_ROOM, create=True)
+
+    def _hub_lost(self) -> None:
+        """
+        Cut off from the hub, which tells every other node NODE_DOWN for us:
+        do the same from this side for every node we share a room with.
+        """
+        nodes = set()
+        with self.lock:
+            rooms = list(self.rooms.values())
+        for room in rooms:
+            with room.lock:
+                if isinstance(room, RemoteRoom):
+                    nodes.add(room.owner)
+                else:
+                    nodes.update(room.peers)
+                    nodes.update(room.watchers)
+        for node in nodes:
+            self._node_down(node)
+
+    def _hub_back(self) -> None:
+        """Reconnected: the registry forgot our rooms, claim them again."""
+        with self.lock:
+            rooms = [room for room in self.rooms.values() if isinstance(room, Room)]
+        for room in rooms:
+            self._claim(room.id, True, self._reclaim, room)
+
+    def _reclaim(self, owner: Optional[str], room: Room) -> None:
+        if owner == self.node:
+            return
+        # the id went to another node while we were away: ours starts over
+        with self.lock:
+            if self.rooms.get(room.id) is not room:
+                return
+            del self.rooms[room.id]
+            with room.lock:
+                outs = list(room.members) + list(room.spectators)
+        room.close()
+        self._room_lost(outs)
+
+    def adopt(self, out, action: str, room_id: str) -> None:
+        """Finish a Handoff on the worker that owns the room (or the session)."""
+        if action == "resume":
+            self.resume(out, room_id, out.binary)
+            return
+        if action == "watch":
+            self.watch(out, room_id, out.binary)
+            return
+        # a token from the first worker wouldn't route back here
+        send(out, P.session(self.sessions.issue(out)))
+        if action == "create":
+            self.handle(out, P.create(room_id))
+        else:
+            self.join(out, room_id, create=(action == "enter"))
+
+    # ---------- message dispatch (shared by both engines) ----------
+
+    def handle(self, out, msg: dict) -> None:
+        t = msg["type"]
+        room = out.room
+        metrics.messages_in.inc(label=t)
+
+        if t not in (P.PONG, P.TOP) and getattr(out, "watching", None) is not None:
+            send(out, P.error("spectator"))     # watching only, nothing to play
+            return
+
+        if t == P.ANSWER:
+            if room is None:
+                send(out, P.error("not_in_room"))
+                return
+            if self.answer_limit is not None and not self.answer_limit.allow(out):
+                metrics.rate_limited.inc()
+                send(out, P.answer_ack(False, reason="rate_limited"))
+                return
+            t0 = time.perf_counter()
+            room.submit_answer(out, msg, latency.compensation(out))
+            metrics.answer_ack.observe(time.perf_counter() - t0)
+
+        elif t == P.TOP:
+            k = msg.get("k", 10)
+            if type(k) is not int:      # (bool is an int too)
+                send(out, P.error("invalid_k"))
+                return
+            k = max(1, min(k, persistence.TOP_CACHE))
+            send(out, P.all_time(self.scores.top(k) if self.scores else []))
+
+        elif t == P.PONG:
+            if self.pinger is not None:
+                self.pinger.pong(out, msg["id"])
+
+        elif t == P.START:
+            if room is not None:
+                room.start(out.name)
+
+        elif t == P.JOIN:
+            self.join(out, msg["room"])
+
+        elif t == P.CREATE:
+            self.create(msg.get("room"), out)
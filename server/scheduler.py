@@ -0,0 +1,100 @@
+# scheduler.py
+#
+# One timer thread for every room's round timers (instead of one quiz_loop
+# thread per game). The asyncio engine uses LoopScheduler, same interface
+# on top of loop.call_later.
+import heapq
+import itertools
+import threading
+import time
+
+
+class Timer:
+    __slots__ = ("due", "fn", "args", "cancelled")
+
+    def __init__(self, due: float, fn, args: tuple):
+        self.due = due
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """Min-heap of timers ordered by due time, run by a single thread."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()   # tie-break, keeps FIFO for equal due
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self) -> "Scheduler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def call_later(self, delay: float, fn, *args) -> Timer:
+        timer = Timer(time.monotonic() + max(0.0, delay), fn, args)
+        with self._cond:
+            heapq.heappush(self._heap, (timer.due, next(self._seq), timer))
+            # wake the runner only if this became the earliest timer
+            if self._heap[0][2] is timer:
+                self._cond.notify()
+        return timer
+
+    def call_soon(self, fn, *args) -> Timer:
+        return self.call_later(0, fn, *args)
+
+    def call_threadsafe(self, fn, *args) -> Timer:
+        # every call here is thread-safe already
+        return self.call_later(0, fn, *args)
+
+    def may_block(self) -> bool:
+        """True on a client thread; the timer thread must not wait on I/O."""
+        return threading.current_thread() is not self._thread
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, _, timer = self._heap[0]
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(wait)
+
+            if timer.cancelled:
+                continue
+            try:
+                timer.fn(*timer.args)
+            except Exception as e:
+                print("Timer error:", e)
+
+
+class LoopScheduler:
+    """Scheduler interface for the asyncio engine (runs on the event loop)."""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def call_later(self, delay: float, fn, *args):
+        return self.loop.call_later(max(0.0, delay), fn, *args)
+
+    def call_soon(self, fn, *args):
+        return self.loop.call_soon(fn, *args)
+
+    def call_threadsafe(self, fn, *args):
+        """call_soon from another thread (e.g. the cluster bus reader)"""
+        return self.loop.call_soon_threadsafe(fn, *args)
+
+    def may_block(self) -> bool:
+        """Never: everything here runs on the event loop."""
+        return False
@@ -0,0 +1,91 @@
+# scoring.py
+#
+# Batched round scoring over the RoundAnswers arrays: correctness, speed
+# bonus, points and winner for every answer at once. Answers are already
+# mapped to choice codes at submit time, so nothing is normalized here.
+# Uses NumPy when it is installed and the round is big enough to pay for the
+# conversion; the pure-Python path gives the same results.
+from typing import List, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:   # optional dependency
+    np = None
+
+NUMPY_MIN = 256          # answers per round before NumPy is worth it
+
+
+class RoundScores(NamedTuple):
+    correct: List[bool]    # per answer row
+    bonus: List[int]
+    points: List[int]
+    winner: Optional[int]  # row of the fastest on-time correct answer
+
+
+def score_round(answers, correct_code: int, time_limit: float,
+                base_score: int, bonus_max: int,
+                use_numpy: Optional[bool] = None) -> RoundScores:
+    """
+    correct_code: answers.choice code of the correct answer (-1 if nobody
+    could match it). Bonus = bonus_max * (1 - elapsed / time_limit), rounded,
+    clamped to [0, bonus_max]; late answers never score.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and len(answers) >= NUMPY_MIN
+    if use_numpy:
+        return _score_numpy(answers, correct_code, time_limit, base_score, bonus_max)
+    return _score_python(answers, correct_code, time_limit, base_score, bonus_max)
+
+
+def _score_python(answers, correct_code, time_limit, base_score, bonus_max) -> RoundScores:
+    choice, elapsed, late = answers.choice, answers.elapsed, answers.late
+    n = len(choice)
+    correct = [False] * n
+    bonus = [0] * n
+    points = [0] * n
+    winner = None
+    best = 0.0
+
+    for i in range(n):
+        if choice[i] != correct_code:
+            continue
+        correct[i] = True
+        if late[i]:
+            continue
+
+        e = elapsed[i]
+        if e <= 0:
+            b = bonus_max
+        elif e >= time_limit:
+            b = 0
+        else:
+            b = int(round(bonus_max * (1 - e / time_limit)))
+        bonus[i] = b
+        points[i] = base_score + b
+
+        if winner is None or e < best:
+            winner, best = i, e
+
+    return RoundScores(correct, bonus, points, winner)
+
+
+def _score_numpy(answers, correct_code, time_limit, base_score, bonus_max) -> RoundScores:
+    choice = np.frombuffer(answers.choice, dtype=np.intc)
+    elapsed = np.frombuffer(answers.elapsed, dtype=np.float64)
+    late = np.frombuffer(answers.late, dtype=np.uint8).astype(bool)
+
+    correct = choice == correct_code
+    scored = correct & ~late
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = np.round(bonus_max * (1 - elapsed / time_limit))
+    bonus = np.where(elapsed <= 0, bonus_max, np.where(elapsed >= time_limit, 0, raw))
+    bonus = np.where(scored, bonus, 0).astype(np.int64)
+    points = np.where(scored, base_score + bonus, 0)
+
+    winner = None
+    if scored.any():
+        # argmin keeps the first of equal times, like the stable sort did
+        winner = int(np.argmin(np.where(scored, elapsed, np.inf)))
+
+    return RoundScores(correct.tolist(), bonus.tolist(), points.tolist(), winner)
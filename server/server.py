@@ -1,170 +1,231 @@
 # server.py
+import select
 import socket
 import threading
-import json
 import sys
+import time
 
-from server.quiz_logic import QuizGame
+from server import admission, metrics, workers
+from server.outbox import Outbox, SEND_QUEUE_MAX, LAG_POLICY
+from server.rooms import DEFAULT_ROOM, Handoff, RoomManager, RoomSettings
+from server.scheduler import Scheduler
+from framing import FrameReader, FrameTooLarge
 import protocol_message as P
 
-HOST = "0.0.0.0"
-PORT = 5555
-TEST_MODE = "--test" in sys.argv  # 👈 turn ON for bot tests
 
+def _arg(flag, default):
+    """Value following `flag` on the command line, e.g. --engine asyncio"""
+    if flag in sys.argv:
+        i = sys.argv.index(flag)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
 
 
-game = QuizGame("server/questions.json")
-clients = {}          # sock -> player_name
-lock = threading.Lock()
-game_started = False
+HOST = "0.0.0.0"
+PORT = int(_arg("--port", 5555))
+TEST_MODE = "--test" in sys.argv  # 👈 turn ON for bot tests
+ENGINE = _arg("--engine", "threads")  # threads | asyncio
+SEND_QUEUE = int(_arg("--send-queue", SEND_QUEUE_MAX))
+LAG = _arg("--lag-policy", LAG_POLICY)  # drop | lag
+RESULT_MODE = _arg("--round-result", "auto")  # full | compact | auto
+WORKERS = int(_arg("--workers", 1))   # >1: forked SO_REUSEPORT workers
+QUESTIONS = _arg("--questions", "server/questions.json")  # .json or compiled .qbank
+PING = float(_arg("--ping", 0))   # seconds between RTT pings, 0 = off
+DB = _arg("--db", None)   # all-time scores in this SQLite file
+METRICS_PORT = int(_arg("--metrics-port", 0))   # /metrics over HTTP, 0 = off
+LOG_SAMPLE = _arg("--log-sample", None)   # JSON-line log rate instead of printing every message
+RESUME_GRACE = float(_arg("--resume-grace", 30))   # seconds a dropped player keeps its seat, 0 = off
+CLUSTER = _arg("--cluster", None)   # bus url, e.g. tcp://127.0.0.1:5600 (see server/cluster.py)
+NODE = _arg("--node", None)   # this node's name in the cluster
+ANSWER_RATE = float(_arg("--answer-rate", admission.ANSWER_RATE))   # answers/sec per client, 0 = off
+SPECTATE = float(_arg("--spectate-interval", 1.0))   # seconds between spectator updates
+
+limits = admission.Limits(
+    max_connections=int(_arg("--max-conns", admission.MAX_CONNECTIONS)),
+    max_per_ip=int(_arg("--max-per-ip", admission.MAX_PER_IP)),
+    handshake_timeout=float(_arg("--handshake-timeout", admission.HANDSHAKE_TIMEOUT)),
+    idle_timeout=float(_arg("--idle-timeout", admission.IDLE_TIMEOUT)),
+    max_frame=int(_arg("--max-frame", admission.MAX_FRAME)),
+)
+
+
+settings = RoomSettings(
+    questions_path=QUESTIONS,
+    test_mode=TEST_MODE,
+    result_mode=RESULT_MODE,
+    ping_interval=PING,
+    db_path=DB,
+    resume_grace=RESUME_GRACE,
+    answer_rate=ANSWER_RATE,
+    spectate_interval=SPECTATE,
+    cluster=CLUSTER,
+    node_id=NODE,
+)
+scheduler = Scheduler()
+gate = admission.Admission(limits)
+# built by start() for the threads engine only (score store, pinger, cluster
+# bus); the asyncio engine builds its own manager
+rooms = None
 
 # ------------------ networking helpers ------------------
 
-def send(sock, msg):
-    P.validate(msg)
-    sock.sendall((json.dumps(msg) + "\n").encode())
-
-
-
-def broadcast(msg: dict):
-    with lock:
-        for sock in list(clients.keys()):
-            try:
-                send(sock, msg)
-            except:
-                sock.close()
-                clients.pop(sock, None)
-
-
-# ------------------ quiz loop ------------------
-
-def start_quiz_loop_if_needed():
-    global game_started
-
-    with lock:
-        if game.running or not game_started:
-            return
-        print("▶ Quiz loop started")
-        game.running = True
-        threading.Thread(target=quiz_loop, daemon=True).start()
-
-
-def quiz_loop():
-
-    QUESTION_WAIT = 0.5 if TEST_MODE else game.time_limit_sec
-    RESULT_WAIT = 0.3 if TEST_MODE else 3
-
-    while True:
-        with lock:
-            if not clients:
-                print("⏸ No players, stopping quiz")
-                game.running = False
-                return
-
-        if not game.has_next_question():
-            broadcast(P.game_over())
-            game.running = False
-            return
-
-        q = game.start_round()
-        
-        if TEST_MODE:
-            q["time_limit_sec"] = 1
-
-        broadcast(q)
-
-        threading.Event().wait(QUESTION_WAIT)
-
+def send(out, msg):
+    out.put(P.encode(msg, out.binary))
 
-        result = game.end_round_and_score()
-        broadcast(result)
-
-        threading.Event().wait(RESULT_WAIT)
 
+def _poller(sock):
+    """poll() for input on sock (select() can't go past fd 1024)"""
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    return poller
 
 
 # ------------------ client handler ------------------
 
-def handle_client(sock, addr):
-    global game_started
-
-    print(f"[+] {addr} connected")
+def handle_client(sock, addr, handoff=None):
+    """
+    handoff: header from another worker (name, action, room, buffer) when
+    the socket was passed over; the welcome was already sent there (except
+    for a resume, which the session's worker answers).
+    """
+    metrics.log_connection(addr, "connected")
 
-    buffer = ""
+    reader = FrameReader(max_frame=limits.max_frame)
     name = None
+    out = None
+    handed_off = False
+    workers.count_connection(1)
+    # the name line has to arrive within handshake_timeout, then every frame
+    # within `idle` of the previous one (whole frames: trickled bytes don't
+    # keep a connection open). Checked with poll() before recv: a socket
+    # timeout would also cut short the Outbox writer's sendall() to a slow reader.
+    idle = limits.idle_timeout or None
+    now = time.monotonic()
+    deadline = now + idle if idle else None     # for the next complete frame
+    if limits.handshake_timeout and handoff is None:
+        deadline = now + limits.handshake_timeout
+    framed = False
+    poller = _poller(sock)
 
     try:
-        name = sock.recv(1024).decode().split("\n", 1)[0].strip()
-        if not name:
-            return
-
-        with lock:
-            clients[sock] = name
-
-        print(f"    Player: {name}")
-        send(sock, P.welcome(name))
+        if handoff is not None:
+            name = handoff["name"]
+            out = Outbox(sock, name, SEND_QUEUE, LAG, handoff["binary"])
+            reader.feed(handoff["buffer"])
+            rooms.adopt(out, handoff["action"], handoff["room"])
+            name = out.name
+            reader.binary = out.binary
+            if out.watching is not None:
+                deadline = None
 
         while True:
-            data = sock.recv(4096)
-            if not data:
-                break
-
-            buffer += data.decode()
-
-            while "\n" in buffer:
-                line, buffer = buffer.split("\n", 1)
-                msg = json.loads(line)
+            for payload in reader.frames():
+                framed = True
+                if out is None or out.name is None:
+                    line = payload.decode()
+                    if out is None:
+                        out = Outbox(sock, None, SEND_QUEUE, LAG)
+
+                    resume = P.parse_resume(line)
+                    if resume is not None:
+                        # reconnect: take over the seat (and score) of a dropped connection
+                        rooms.resume(out, *resume)
+                        name = out.name
+                        reader.binary = out.binary
+                        continue
+
+                    watch = P.parse_watch(line)
+                    if watch is not None:
+                        # spectator: never sends anything, so no idle timeout
+                        rooms.watch(out, *watch)
+                        name = out.name
+                        reader.binary = out.binary
+                        deadline = None
+                        continue
+
+                    name, binary = P.parse_hello(line)
+                    if not name:
+                        return
+                    out.name = name
+
+                    metrics.log("hello", f"    Player: {name}", player=name)
+                    # welcome is always JSON, the chosen encoding starts after it
+                    send(out, P.welcome(name, P.ENCODING_BINARY if binary else P.ENCODING_JSON,
+                                        session=rooms.sessions.issue(out)))
+                    out.binary = reader.binary = binary
+                    rooms.join(out, DEFAULT_ROOM, create=True)
+                    continue
+
+                msg = P.decode(payload, out.binary)
                 P.validate(msg)
 
-                print(f"[{name}] {msg}")
+                metrics.log_message(name, msg)
 
-                if msg["type"] == P.ANSWER:
-                    resp = game.submit_answer(
-                        player=name,
-                        qid=msg["qid"],
-                        answer=msg["answer"]
-                    )
-                    send(sock, resp)
+                rooms.handle(out, msg)
 
-                elif msg["type"] == P.START:
-                    start = False
-                    with lock:
-                        if not game_started:
-                            print(f"🚀 Game started by {name}")
-                            game_started = True
-                            start = True
+            if framed and name is not None and out.watching is None:
+                deadline = time.monotonic() + idle if idle else None
+            framed = False
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0 or not poller.poll(left * 1000):
+                    raise socket.timeout
+            n = reader.recv(sock)
+            if not n:
+                break
+            metrics.bytes_in.inc(n)
 
-                    if start:
-                        start_quiz_loop_if_needed()
+    except Handoff as h:
+        # room lives in another worker: flush, pass the socket on, forget it
+        handed_off = True
+        rooms.leave(out)
+        rooms.sessions.forget(out)
+        out.detach()
+        if not workers.router.send(sock, h.action, h.room_id, name, out.binary, reader.pending()):
+            handed_off = False
+            admission.evicted(addr, "handoff_too_large")
 
+    except socket.timeout:
+        admission.evicted(addr, "handshake_timeout" if name is None else "idle_timeout")
 
+    except FrameTooLarge:
+        admission.evicted(addr, "frame_too_large")
 
     except Exception as e:
         print("Error:", e)
 
     finally:
-        with lock:
-            clients.pop(sock, None)
-
-            if not clients:
-                print("🔄 All players left — resetting game")
-                game.reset()
-                game_started = False
-
+        if out and not handed_off:
+            rooms.drop(out)
+            out.close()
         sock.close()
-        print(f"[-] {addr} disconnected")
+        gate.release(addr[0])
+        workers.count_connection(-1)
+        metrics.log_connection(addr, "handed off" if handed_off else "disconnected")
 
 
 # ------------------ server ------------------
 
-def start():
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((HOST, PORT))
-    server.listen()
+def start(server=None, router=None):
+    """router: workers.Router in a --workers process"""
+    global rooms
+    rooms = RoomManager(settings, scheduler, router)
+    if router is not None:
+        threading.Thread(target=receive_handoffs, args=(router,), daemon=True).start()
+    if server is None:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind((HOST, PORT))
+        server.listen()
     print(f"Server listening on {HOST}:{PORT}")
+    scheduler.start()
 
     while True:
         sock, addr = server.accept()
+        reason = gate.admit(addr[0])
+        if reason is not None:
+            admission.refuse(sock, reason)
+            continue
         threading.Thread(
             target=handle_client,
             args=(sock, addr),
@@ -172,5 +233,53 @@ def start():
         ).start()
 
 
+def receive_handoffs(router):
+    while True:
+        # one broken handoff must not stop this worker taking the next ones
+        try:
+            sock, header = router.receive()
+        except (OSError, ValueError) as e:
+            print("Handoff error:", e)
+            continue
+        try:
+            addr = sock.getpeername()
+        except OSError:
+            sock.close()     # the client went away while being passed over
+            continue
+        gate.admit(addr[0], force=True)    # accepted by the worker that handed it over
+        threading.Thread(
+            target=handle_client,
+            args=(sock, addr, header),
+            daemon=True
+        ).start()
+
+
+def run_worker(router):
+    """Body of one --workers process"""
+    server = workers.listen_socket(HOST, PORT)
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT + workers.index)
+
+    if ENGINE == "asyncio":
+        from server import async_server
+        async_server.start(settings, HOST, PORT, SEND_QUEUE, LAG,
+                           server=server, router=router, limits=limits)
+        return
+
+    start(server, router)
+
+
 if __name__ == "__main__":
-    start()
+    if CLUSTER and WORKERS > 1:
+        sys.exit("--cluster runs one process per node, start more nodes instead of --workers")
+    metrics.configure_log(None if LOG_SAMPLE is None else float(LOG_SAMPLE))
+    if METRICS_PORT and WORKERS <= 1:
+        metrics.serve(METRICS_PORT)
+
+    if WORKERS > 1:
+        workers.launch(WORKERS, run_worker)
+    elif ENGINE == "asyncio":
+        from server import async_server
+        async_server.start(settings, HOST, PORT, SEND_QUEUE, LAG, limits=limits)
+    else:
+        start()
@@ -0,0 +1,95 @@
+# sessions.py
+#
+# Resume tokens. Every player gets one in its welcome; when the connection
+# drops, the player is parked instead of leaving: it stays in its room (its
+# closed outbox just discards frames), keeps its score and stays a round
+# player, so the room neither resets nor forgets it. A new connection that
+# sends resume(token) within the grace window takes the seat over; after
+# the window the player leaves for real.
+#
+#   python -m server.server --resume-grace 30     # 0 = leave at once, as before
+import secrets
+import threading
+from typing import Callable, Dict, Optional
+
+RESUME_GRACE = 30.0      # seconds a dropped player keeps its seat
+
+
+class Session:
+    __slots__ = ("token", "name", "out", "timer")
+
+    def __init__(self, token: str, name: str, out):
+        self.token = token
+        self.name = name
+        self.out = out            # current outbox; closed while parked
+        self.timer = None         # expiry, set while parked
+
+
+class Sessions:
+    """token -> Session. Parking and expiry run on the rooms' scheduler."""
+
+    def __init__(self, scheduler, grace: float = RESUME_GRACE,
+                 on_expire: Optional[Callable] = None, owns: Optional[Callable] = None):
+        self.scheduler = scheduler
+        self.grace = grace
+        self.on_expire = on_expire    # on_expire(out): the player leaves for real
+        self.owns = owns              # owns(token): this process can resume it
+        self.sessions: Dict[str, Session] = {}
+        self.lock = threading.Lock()
+
+    def _token(self) -> str:
+        while True:
+            token = secrets.token_urlsafe(12)
+            if self.owns is None or self.owns(token):
+                return token
+
+    def issue(self, out) -> str:
+        token = self._token()
+        with self.lock:
+            self.sessions[token] = Session(token, out.name, out)
+        out.session = token
+        return token
+
+    def forget(self, out) -> None:
+        with self.lock:
+            token = getattr(out, "session", None)
+            out.session = None
+            session = self.sessions.get(token)
+            if session is not None and session.out is out:
+                del self.sessions[token]
+
+    def park(self, out) -> bool:
+        """Hold the seat of a dropped connection; False if it should just leave."""
+        if self.grace <= 0 or getattr(out, "room", None) is None:
+            self.forget(out)
+            return False
+        with self.lock:
+            session = self.sessions.get(getattr(out, "session", None))
+            if session is None or session.out is not out:
+                return False
+            token = session.token
+            session.timer = self.scheduler.call_later(self.grace, self._expire, token, out)
+        return True
+
+    def take(self, token: str, out):
+        """Move a session onto a new connection: (name, previous outbox) or None."""
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            if session.timer is not None:
+                session.timer.cancel()
+                session.timer = None
+            old, session.out = session.out, out
+            old.session = None
+            out.session = token
+        return session.name, old
+
+    def _expire(self, token: str, out) -> None:
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None or session.out is not out:
+                return     # resumed meanwhile
+            del self.sessions[token]
+            out.session = None
+        self.on_expire(out)
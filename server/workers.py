@@ -0,0 +1,180 @@
+# workers.py
+#
+# Multi-process launcher (Linux): N forked workers share the listening port
+# via SO_REUSEPORT, so the kernel spreads new connections across them. Every
+# room belongs to exactly one worker (hash of the room id); a client that
+# asks for a room owned by another worker has its socket handed over on a
+# unix socket (SCM_RIGHTS), so QuizGame state always stays process-local.
+#
+#   python -m server.server --workers 4 [--engine asyncio]
+import base64
+import json
+import multiprocessing
+import signal
+import socket
+import time
+import uuid
+import zlib
+
+from server import metrics
+
+REPORT_EVERY = 5.0       # seconds between per-worker stats lines
+HANDOFF_MAX = 65536      # bytes of handoff header (name + leftover input, base64)
+
+# per-worker process state, set in the child by _worker_main()
+router = None
+stats = None             # shared Array: [connections, rounds] per worker
+index = 0
+
+CONNECTIONS, ROUNDS = 0, 1
+
+
+# ------------------ stats ------------------
+
+def count_connection(delta: int = 1) -> None:
+    metrics.connections_open.inc(delta)
+    if delta > 0:
+        metrics.connections.inc()
+    _count(CONNECTIONS, delta)
+
+
+def count_round() -> None:
+    metrics.rounds.inc()
+    _count(ROUNDS, 1)
+
+
+def _count(field: int, delta: int) -> None:
+    if stats is None:
+        return
+    with stats.get_lock():
+        stats[index * 2 + field] += delta
+
+
+# ------------------ routing ------------------
+
+class Router:
+    """Room → worker affinity and socket handoff between workers."""
+
+    def __init__(self, index: int, channels):
+        self.index = index
+        self.count = len(channels)
+        self.channels = channels     # per worker: (send end, receive end)
+
+    def owner(self, room_id: str) -> int:
+        return zlib.crc32(room_id.encode()) % self.count
+
+    def is_local(self, room_id: str) -> bool:
+        return self.owner(room_id) == self.index
+
+    def local_room_id(self) -> str:
+        """Fresh random room id that this worker owns."""
+        while True:
+            room_id = uuid.uuid4().hex[:6]
+            if self.is_local(room_id):
+                return room_id
+
+    @property
+    def inbox(self) -> socket.socket:
+        return self.channels[self.index][1]
+
+    def send(self, sock: socket.socket, action: str, room_id: str,
+             name: str, binary: bool, buffer: bytes) -> bool:
+        """
+        Pass a connected client to the room's owner. Caller closes its copy.
+        False if the header wouldn't fit HANDOFF_MAX (the client is dropped
+        here rather than lost in transit).
+        """
+        header = json.dumps({
+            "action": action,
+            "room": room_id,
+            "name": name,
+            "binary": binary,
+            "buffer": base64.b64encode(buffer).decode(),   # raw bytes, any encoding
+        }).encode()
+        if len(header) > HANDOFF_MAX:
+            return False
+        target = self.channels[self.owner(room_id)][0]
+        socket.send_fds(target, [header], [sock.fileno()])
+        return True
+
+    def receive(self):
+        """
+        (socket, header) of one handed-over client. ValueError for a broken
+        handoff (truncated or unreadable header), its socket closed.
+        """
+        data, fds, flags, _ = socket.recv_fds(self.inbox, HANDOFF_MAX, 1)
+        if not fds:
+            raise ValueError("handoff without a socket")
+        sock = socket.socket(fileno=fds[0])
+        try:
+            if flags & socket.MSG_TRUNC:
+                raise ValueError("handoff header truncated")
+            header = json.loads(data)
+            header["buffer"] = base64.b64decode(header["buffer"], validate=True)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            sock.close()
+            raise ValueError(f"bad handoff: {e}") from None
+        return sock, header
+
+
+def listen_socket(host: str, port: int) -> socket.socket:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server.bind((host, port))
+    server.listen()
+    return server
+
+
+# ------------------ launcher ------------------
+
+def _worker_main(i: int, channels, shared, run) -> None:
+    global router, stats, index
+
+    index = i
+    stats = shared
+    router = Router(i, channels)
+    run(router)
+
+
+def launch(count: int, run) -> None:
+    """
+    Fork `count` workers, each calling run(router), and print per-worker
+    connections and rounds/sec until interrupted.
+    """
+    ctx = multiprocessing.get_context("fork")
+    channels = [
+        socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for _ in range(count)
+    ]
+    shared = ctx.Array("l", count * 2)
+
+    procs = [
+        ctx.Process(target=_worker_main, args=(i, channels, shared, run), daemon=True)
+        for i in range(count)
+    ]
+    for p in procs:
+        p.start()
+    print(f"🧵 {count} workers started")
+
+    # `kill` stops the workers too, same as Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    last = [0] * count
+    try:
+        while True:
+            time.sleep(REPORT_EVERY)
+            with shared.get_lock():
+                snap = list(shared)
+            parts = []
+            for i in range(count):
+                conns, rounds = snap[i * 2], snap[i * 2 + 1]
+                rate = (rounds - last[i]) / REPORT_EVERY
+                last[i] = rounds
+                alive = "" if procs[i].is_alive() else " (dead)"
+                parts.append(f"w{i}: {conns} conns {rate:.1f} rounds/s{alive}")
+            print("📊 " + " | ".join(parts))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()